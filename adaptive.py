@@ -0,0 +1,69 @@
+"""
+Question selection for the adaptive quiz.
+
+Difficulties and abilities live on the same Rasch (one-parameter IRT) logit
+scale: a player of ability theta answers a question of difficulty b correctly
+with probability 1 / (1 + exp(b - theta)). A question is most informative
+when b is close to theta, so the next question is drawn at random from those
+within ADAPTIVE_WINDOW logits of the player's estimated ability, found by
+bisecting the category's difficulty-sorted index.
+"""
+
+import math
+import random
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Optional, Set, Tuple
+from quiz_index import AnswerKey
+
+ADAPTIVE_WINDOW = 0.5
+ABILITY_PRIOR_SD = 1.0
+
+
+def estimate_ability(responses: Iterable[Tuple[float, bool]]) -> float:
+    """MAP ability estimate from (difficulty, answered correctly) pairs.
+
+    The standard normal prior keeps the estimate finite when every answer so
+    far was right (or wrong).
+    """
+    responses = list(responses)
+    ability = 0.0
+    for _ in range(25):
+        gradient = -ability / ABILITY_PRIOR_SD ** 2
+        information = 1 / ABILITY_PRIOR_SD ** 2
+        for difficulty, correct in responses:
+            probability = 1 / (1 + math.exp(difficulty - ability))
+            gradient += correct - probability
+            information += probability * (1 - probability)
+        step = gradient / information
+        ability += step
+        if abs(step) < 1e-6:
+            break
+    return ability
+
+
+def pick_question(answer_key: AnswerKey, ability: float, exclude: Set[int], rng=random) -> Optional[int]:
+    """Pick an unanswered question near the given ability, or None if all are answered"""
+    difficulties, ids = answer_key.by_difficulty()
+
+    # A random question within the window, skipping answered ones
+    low = bisect_left(difficulties, ability - ADAPTIVE_WINDOW)
+    high = bisect_right(difficulties, ability + ADAPTIVE_WINDOW)
+    if high > low:
+        for _ in range(min(high - low, len(exclude) + 8)):
+            question_id = ids[rng.randrange(low, high)]
+            if question_id not in exclude:
+                return question_id
+
+    # Otherwise the unanswered question closest in difficulty
+    left = bisect_left(difficulties, ability) - 1
+    right = left + 1
+    while left >= 0 or right < len(ids):
+        if right >= len(ids) or (left >= 0 and ability - difficulties[left] <= difficulties[right] - ability):
+            if ids[left] not in exclude:
+                return ids[left]
+            left -= 1
+        else:
+            if ids[right] not in exclude:
+                return ids[right]
+            right += 1
+    return None
@@ -0,0 +1,142 @@
+"""
+Write-behind persistence of quiz attempts.
+
+submit_quiz grades in memory and hands the attempt to an in-process buffer
+instead of committing on the request path. A background task drains the
+buffer and writes attempts and their answers with batched INSERTs, flushing
+when a batch fills up or the oldest buffered attempt has waited
+ATTEMPT_FLUSH_INTERVAL_SECONDS. When the buffer is full, submits wait for
+room and are rejected with 503 after ATTEMPT_ENQUEUE_TIMEOUT_SECONDS. The
+buffer is drained on shutdown; attempts still buffered when the process dies
+are lost.
+"""
+
+import asyncio
+import time
+from typing import List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from config import settings
+from database import AsyncSessionLocal
+from models import QuizAttempt, AttemptAnswer
+
+WRITE_RETRIES = 3
+
+
+class AttemptWriter:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._written = 0
+        self._batches = 0
+        self._rejected = 0
+        self._dropped = 0
+        self._last_error = None
+        self._flush_seconds = 0.0
+
+    def start(self):
+        """Start the flush task on the running event loop"""
+        if self._task is None or self._task.done():
+            # Queues bind to the loop they are created on
+            self._queue = asyncio.Queue(maxsize=settings.attempt_queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, attempt: dict, answers: List[dict]):
+        """Buffer an attempt row and its answer rows for the next flush"""
+        self.start()
+        try:
+            await asyncio.wait_for(
+                self._queue.put((attempt, answers)),
+                timeout=settings.attempt_enqueue_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many quiz submissions, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+    async def _run(self):
+        while not (self._closing and self._queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._write(batch)
+
+    async def _collect(self) -> list:
+        """Wait for an attempt, then gather more until the batch is full or
+        the flush interval has passed"""
+        loop = asyncio.get_running_loop()
+        item = await self._queue.get()
+        if item is None:
+            return []
+        batch = [item]
+        deadline = loop.time() + settings.attempt_flush_interval_seconds
+        while len(batch) < settings.attempt_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    async def _write(self, batch: list):
+        attempts = [attempt for attempt, _ in batch]
+        answers = [answer for _, attempt_answers in batch for answer in attempt_answers]
+        for retry in range(WRITE_RETRIES):
+            start = time.perf_counter()
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(insert(QuizAttempt), attempts)
+                    if answers:
+                        await db.execute(insert(AttemptAnswer), answers)
+                    await db.commit()
+            except Exception as exc:
+                self._last_error = f"{type(exc).__name__}: {exc}"
+                if retry + 1 < WRITE_RETRIES:
+                    await asyncio.sleep(settings.attempt_flush_interval_seconds)
+                continue
+            self._flush_seconds = time.perf_counter() - start
+            self._written += len(attempts)
+            self._batches += 1
+            return
+        self._dropped += len(attempts)
+
+    async def stop(self):
+        """Flush everything still buffered and stop the flush task"""
+        if self._task is None:
+            return
+        self._closing = True
+        try:
+            # Wake the task if it is waiting on an empty queue
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+        await self._task
+        self._task = None
+        self._closing = False
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() if self._task is not None else 0,
+            "queue_limit": settings.attempt_queue_size,
+            "written": self._written,
+            "batches": self._batches,
+            "rejected": self._rejected,
+            "dropped": self._dropped,
+            "last_flush_ms": round(self._flush_seconds * 1000, 2),
+            "last_error": self._last_error,
+        }
+
+
+attempt_writer = AttemptWriter()
@@ -1,16 +1,32 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
+from invalidation import ADMIN_USER, invalidation_bus
 from models import AdminUser
 from schemas import TokenData
 from config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the configured work factor makes hashes created with any
+# other factor "need update", so they are re-hashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
@@ -22,12 +38,134 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(AdminUser).filter(AdminUser.username == username).first()
+def verify_and_update_password(plain_password, hashed_password):
+    """Verify a password; also return a new hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _timed_call(fn, *args):
+    # Runs inside the worker so the reported latency excludes queueing
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHashPool:
+    """Runs bcrypt on a bounded worker pool so it never blocks the event loop"""
+
+    def __init__(self):
+        self._executor = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._hash_seconds = deque(maxlen=1000)
+        self._wait_seconds = deque(maxlen=1000)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if settings.password_hash_executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.password_hash_workers,
+                    thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, fn, *args):
+        # Only the event loop thread touches the counters, so no lock is needed
+        if self._in_flight >= settings.password_hash_queue_size:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        future = self._get_executor().submit(_timed_call, fn, *args)
+        self._in_flight += 1
+
+        def finished(_):
+            # A hash that timed out keeps its worker busy, so it stays in
+            # flight until it really ends; runs on the worker thread
+            try:
+                loop.call_soon_threadsafe(self._finished)
+            except RuntimeError:
+                pass  # the loop is closed
+
+        future.add_done_callback(finished)
+        try:
+            result, hash_seconds = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=settings.password_hash_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication timed out, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        self._completed += 1
+        self._hash_seconds.append(hash_seconds)
+        self._wait_seconds.append(time.perf_counter() - start - hash_seconds)
+        return result
+
+    def _finished(self):
+        self._in_flight -= 1
+
+    def stats(self) -> dict:
+        def summary(samples):
+            if not samples:
+                return {"avg_ms": 0.0, "max_ms": 0.0}
+            return {
+                "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2),
+            }
+
+        return {
+            "executor": settings.password_hash_executor,
+            "workers": settings.password_hash_workers,
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - settings.password_hash_workers),
+            "queue_limit": settings.password_hash_queue_size,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts,
+            "hash_latency": summary(self._hash_seconds),
+            "queue_wait": summary(self._wait_seconds),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHashPool()
+
+
+async def get_password_hash_async(password):
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await db.scalar(select(AdminUser).where(AdminUser.username == username))
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.run(
+        verify_and_update_password, password, user.hashed_password
+    )
+    if not valid:
         return False
+    if new_hash:
+        # Work factor changed since this hash was created; caller commits
+        user.hashed_password = new_hash
     return user
 
 
@@ -37,7 +175,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
@@ -62,12 +200,77 @@ def verify_refresh_token(token: str):
         return None
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+class PrincipalCache:
+    """Short-lived cache of resolved admin users, keyed by token subject and iat"""
+
+    def __init__(self):
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self, username: str) -> int:
+        return self._generations.get(username, 0)
+
+    def get(self, username: str, issued_at) -> Optional[AdminUser]:
+        entry = self._entries.get((username, issued_at))
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, username: str, issued_at, user: AdminUser, generation: int):
+        with self._lock:
+            # Skip the store if the user was invalidated while we were loading it
+            if self._generations.get(username, 0) != generation:
+                return
+            if len(self._entries) >= settings.principal_cache_max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            expires_at = time.monotonic() + settings.principal_cache_ttl_seconds
+            self._entries[(username, issued_at)] = (expires_at, user)
+
+    def invalidate(self, username: str):
+        """Forget every cached token of a user, e.g. after a role or password change"""
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+            for key in [key for key in self._entries if key[0] == username]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for username in {key[0] for key in self._entries}:
+                self._generations[username] = self._generations.get(username, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "ttl_seconds": settings.principal_cache_ttl_seconds,
+        }
+
+
+principal_cache = PrincipalCache()
+invalidation_bus.subscribe(ADMIN_USER, principal_cache.invalidate, principal_cache.clear)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _token_subject(token: str):
+    """(username, iat) of a valid access token; raises 401 otherwise"""
+    credentials_exception = _credentials_exception()
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         username: str = payload.get("sub")
@@ -76,13 +279,51 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(AdminUser).filter(AdminUser.username == token_data.username).first()
+    return token_data.username, payload.get("iat")
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    username, issued_at = _token_subject(token)
+    user = principal_cache.get(username, issued_at)
+    if user is not None:
+        return user
+    
+    generation = principal_cache.generation(username)
+    user = await db.scalar(select(AdminUser).where(AdminUser.username == username))
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    # Detach the instance so it can be shared read-only across requests
+    db.expunge(user)
+    principal_cache.put(username, issued_at, user, generation)
     return user
 
 
-async def get_current_active_user(current_user: AdminUser = Depends(get_current_user)):
+def get_current_user_sync(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """get_current_user for sync routes; shares the route's get_db session, so
+    a request holds one pooled connection rather than a sync and an async one"""
+    username, issued_at = _token_subject(token)
+    user = principal_cache.get(username, issued_at)
+    if user is not None:
+        return user
+
+    generation = principal_cache.generation(username)
+    user = db.scalar(select(AdminUser).where(AdminUser.username == username))
+    if user is None:
+        raise _credentials_exception()
+    db.expunge(user)
+    principal_cache.put(username, issued_at, user, generation)
+    return user
+
+
+def _require_active(current_user: AdminUser) -> AdminUser:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+async def get_current_active_user(current_user: AdminUser = Depends(get_current_user)):
+    return _require_active(current_user)
+
+
+def get_current_active_user_sync(current_user: AdminUser = Depends(get_current_user_sync)):
+    return _require_active(current_user)
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the quiz application
+
+Each benchmark seeds its own data into a scratch database (a temporary
+SQLite file unless --database-url is given) and prints timings. Point
+--database-url at a throwaway Postgres database to get production-like
+numbers; the seeded rows are removed again when the benchmark finishes.
+
+The load benchmark instead drives a running server over HTTP; start it
+with a single worker (uvicorn main:app --workers 1) so the numbers show how
+far one event loop scales with concurrency, on a database filled by
+generate_data.py so that runs are comparable.
+
+Usage:
+    python benchmark.py random-sampling --sizes 10000 100000 1000000
+    python benchmark.py export --rows 1000000
+    python benchmark.py serialize --rows 1000 --repeat 50
+    python benchmark.py load --url http://localhost:8000 --concurrency 1 8 32 64
+    python benchmark.py leaderboard --entries 10000000
+    python benchmark.py search --rows 1000000
+    python benchmark.py near-duplicates --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from generate_data import TextGenerator
+from models import Base, Category, Question
+
+
+def _make_session_factory(database_url):
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _seed_category(db, size, batch_size=10000, make_fields=None):
+    """Create a benchmark category holding `size` questions.
+    
+    make_fields(n) may return column values overriding the defaults of the nth question.
+    """
+    category = Category(name=f"benchmark-{size}-{time.time_ns()}", question_count=size)
+    db.add(category)
+    db.commit()
+
+    for start in range(0, size, batch_size):
+        db.execute(insert(Question), [
+            {
+                "question_text": f"Benchmark question {n}?",
+                "option_a": "Option A",
+                "option_b": "Option B",
+                "option_c": "Option C",
+                "option_d": "Option D",
+                "correct_answer": "ABCD"[n % 4],
+                "category_id": category.id,
+                **(make_fields(n) if make_fields else {}),
+            }
+            for n in range(start, min(start + batch_size, size))
+        ])
+        db.commit()
+    return category.id
+
+
+def _drop_category(db, category_id):
+    db.execute(delete(Question).where(Question.category_id == category_id))
+    db.execute(delete(Category).where(Category.id == category_id))
+    db.commit()
+
+
+def _time_calls(fn, repeat):
+    """Run fn `repeat` times and return per-call latencies in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label, timings):
+    print(
+        f"   {label:<28} mean {statistics.mean(timings):8.2f} ms"
+        f"   p95 {statistics.quantiles(timings, n=20)[-1]:8.2f} ms"
+    )
+
+
+def bench_random_sampling(args):
+    """ORDER BY random() LIMIT k versus the in-memory ID index"""
+    from quiz_index import QuestionIndex
+
+    engine, SessionLocal = _make_session_factory(args.database_url)
+    db = SessionLocal()
+    try:
+        for size in args.sizes:
+            print(f"📦 Seeding {size:,} questions...")
+            category_id = _seed_category(db, size)
+            try:
+                def order_by_random():
+                    db.query(Question).filter(
+                        Question.category_id == category_id
+                    ).order_by(func.random()).limit(args.limit).all()
+
+                index = QuestionIndex()
+                start = time.perf_counter()
+                index.get_ids(db, category_id)
+                build_ms = (time.perf_counter() - start) * 1000
+
+                def index_sample():
+                    ids = index.sample(db, category_id, args.limit)
+                    db.query(Question).filter(Question.id.in_(ids)).all()
+
+                print(f"⏱️  {size:,} rows, limit={args.limit}, {args.repeat} calls")
+                _report("ORDER BY random()", _time_calls(order_by_random, args.repeat))
+                _report("index sample + PK fetch", _time_calls(index_sample, args.repeat))
+                print(f"   {'index build (one-off)':<28} {build_ms:8.2f} ms")
+            finally:
+                _drop_category(db, category_id)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _current_rss_mb():
+    """Resident set size right now (Linux), falling back to the peak"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+
+def bench_export(args):
+    """Memory profile of the streaming question export"""
+    from routers.admin import iter_question_export
+
+    engine, SessionLocal = _make_session_factory(args.database_url)
+    db = SessionLocal()
+    try:
+        print(f"📦 Seeding {args.rows:,} questions...")
+        category_id = _seed_category(db, args.rows)
+        try:
+            for file_format in args.formats:
+                baseline = _current_rss_mb()
+                peak_before = _peak_rss_mb()
+                samples = []
+                exported_bytes = 0
+                start = time.perf_counter()
+                for n, chunk in enumerate(iter_question_export(SessionLocal, file_format, category_id)):
+                    exported_bytes += len(chunk)
+                    if n % 100 == 0:
+                        samples.append(_current_rss_mb())
+                elapsed = time.perf_counter() - start
+
+                print(f"⏱️  {file_format}: {args.rows / elapsed:,.0f} rows/s, {exported_bytes / 2**20:,.1f} MiB written")
+                print(f"   RSS before {baseline:8.1f} MiB   max during {max(samples):8.1f} MiB   growth {max(samples) - baseline:6.1f} MiB")
+                if _peak_rss_mb() > peak_before:
+                    print(f"   process peak RSS rose to {_peak_rss_mb():.1f} MiB")
+        finally:
+            _drop_category(db, category_id)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def bench_serialize(args):
+    """Rows/s of ORM + Pydantic quiz serialization versus the column-projected path"""
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+    from quiz_payloads import public_questions_select, serialize_questions
+    from schemas import QuizQuestion
+
+    engine, SessionLocal = _make_session_factory(args.database_url)
+    db = SessionLocal()
+    try:
+        print(f"📦 Seeding {args.rows:,} questions...")
+        category_id = _seed_category(db, args.rows)
+        try:
+            def orm_path():
+                # What the endpoints did before: hydrate entities, copy into
+                # Pydantic models, then let FastAPI encode the response
+                db.expire_all()
+                category = db.query(Category).filter(Category.id == category_id).first()
+                questions = db.query(Question).filter(Question.category_id == category_id).all()
+                models = [
+                    QuizQuestion(
+                        id=question.id,
+                        question_text=question.question_text,
+                        option_a=question.option_a,
+                        option_b=question.option_b,
+                        option_c=question.option_c,
+                        option_d=question.option_d,
+                        category_name=category.name
+                    )
+                    for question in questions
+                ]
+                JSONResponse(jsonable_encoder(models))
+
+            def projected_path():
+                rows = db.execute(
+                    public_questions_select().where(Question.category_id == category_id)
+                ).all()
+                serialize_questions(rows)
+
+            print(f"⏱️  {args.rows:,} rows per call, {args.repeat} calls")
+            for label, fn in (("ORM + Pydantic", orm_path), ("Core select + bytes", projected_path)):
+                timings = _time_calls(fn, args.repeat)
+                _report(label, timings)
+                print(f"   {'':<28} {args.rows / (statistics.mean(timings) / 1000):,.0f} rows/s")
+        finally:
+            _drop_category(db, category_id)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _login(base_url, username, password):
+    data = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    with urllib.request.urlopen(f"{base_url}/auth/token", data=data) as response:
+        return json.load(response)["access_token"]
+
+
+def bench_load(args):
+    """Concurrent HTTP load against a running single-worker server"""
+    base_url = args.url.rstrip("/")
+    headers = {}
+    paths = list(args.paths)
+    if args.username:
+        token = _login(base_url, args.username, args.password)
+        headers["Authorization"] = f"Bearer {token}"
+        paths.append("/auth/me")
+
+    def fetch(n):
+        request = urllib.request.Request(base_url + paths[n % len(paths)], headers=headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+            ok = True
+        except OSError:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    print(f"🎯 {base_url} {', '.join(paths)}")
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        timings = [latency for latency, ok in results]
+        errors = sum(1 for _, ok in results if not ok)
+        print(f"⏱️  concurrency {concurrency:>3}: {args.requests / elapsed:8.1f} req/s, {errors} errors")
+        _report("latency", timings)
+
+
+def bench_leaderboard(args):
+    """Insert, rank and top-N cost of the in-memory leaderboard"""
+    from leaderboard import SCORE_BUCKETS, ScoreBoard
+
+    board = ScoreBoard(args.size)
+    rng = random.Random(42)
+    baseline = _current_rss_mb()
+
+    print(f"📦 Recording {args.entries:,} attempts...")
+    start = time.perf_counter()
+    for n in range(args.entries):
+        board.add(rng.randrange(SCORE_BUCKETS), float(n), f"attempt-{n}")
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {args.entries / elapsed:,.0f} inserts/s ({elapsed * 1e6 / args.entries:.2f} us each)")
+    print(f"   RSS growth {_current_rss_mb() - baseline:8.1f} MiB")
+
+    # These are far below a millisecond, so report microseconds
+    ranks = iter([rng.randrange(SCORE_BUCKETS) for _ in range(args.repeat)])
+    for label, fn in (
+        ("rank lookup", lambda: board.count_above(next(ranks))),
+        (f"top {args.size}", lambda: list(board.top)),
+        ("insert", lambda: board.add(rng.randrange(SCORE_BUCKETS), 0.0, "extra")),
+    ):
+        timings = _time_calls(fn, args.repeat)
+        print(
+            f"   {label:<28} mean {statistics.mean(timings) * 1000:8.2f} us"
+            f"   p95 {statistics.quantiles(timings, n=20)[-1] * 1000:8.2f} us"
+        )
+
+    start = time.perf_counter()
+    snapshot = board.to_bytes()
+    print(f"   {'checkpoint encode':<28} {(time.perf_counter() - start) * 1000:8.2f} ms   {len(snapshot) / 1024:,.0f} KiB")
+
+
+def bench_search(args):
+    """Latency of admin question search (tsvector on Postgres, inverted index elsewhere)"""
+    from question_search import QuestionSearch
+
+    # The queries below cover very common, mid-frequency and rare terms
+    text = TextGenerator(7)
+    vocabulary, sentence = text.vocabulary, text.sentence
+
+    def make_fields(n):
+        return {
+            "question_text": sentence(12) + "?",
+            "option_a": sentence(2), "option_b": sentence(2), "option_c": sentence(2), "option_d": sentence(2),
+            "explanation": sentence(20),
+        }
+
+    engine, SessionLocal = _make_session_factory(args.database_url)
+    db = SessionLocal()
+    try:
+        print(f"📦 Seeding {args.rows:,} questions...")
+        category_id = _seed_category(db, args.rows, make_fields=make_fields)
+        try:
+            search = QuestionSearch()
+            start = time.perf_counter()
+            search.search(db, vocabulary[0])
+            print(f"   {'first query (builds index)':<28} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+            queries = {
+                "common term": vocabulary[5],
+                "mid-frequency term": vocabulary[500],
+                "rare term": vocabulary[15000],
+                "two terms": f"{vocabulary[5]} {vocabulary[200]}",
+                "prefix": vocabulary[50][:3],
+            }
+            print(f"⏱️  {args.rows:,} rows, limit={args.limit}, {args.repeat} calls")
+            for label, text in queries.items():
+                hits = search.search(db, text, limit=args.limit)
+                _report(f"{label} ({len(hits)} hits)", _time_calls(lambda: search.search(db, text, limit=args.limit), args.repeat))
+        finally:
+            _drop_category(db, category_id)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def bench_near_duplicates(args):
+    """Near-duplicate check latency against a MinHash-LSH indexed question bank"""
+    from models import QuestionLshBucket, QuestionSignature
+    from near_duplicates import find_near_duplicates, index_missing, question_signatures
+
+    text = TextGenerator(11)
+    vocabulary, sentence = text.vocabulary, text.sentence
+
+    def make_fields(n):
+        return {
+            "question_text": sentence(12) + "?",
+            "option_a": sentence(2), "option_b": sentence(2), "option_c": sentence(2), "option_d": sentence(2),
+        }
+
+    engine, SessionLocal = _make_session_factory(args.database_url)
+    db = SessionLocal()
+    try:
+        print(f"📦 Seeding {args.rows:,} questions...")
+        category_id = _seed_category(db, args.rows, make_fields=make_fields)
+        try:
+            start = time.perf_counter()
+            index_missing(db, batch_size=10000)
+            elapsed = time.perf_counter() - start
+            print(f"   signed and indexed in {elapsed:.1f}s ({args.rows / elapsed:,.0f} questions/s)")
+
+            existing = db.query(Question).filter(Question.category_id == category_id).order_by(Question.id).limit(args.repeat).all()
+            reworded = [
+                {
+                    "question_text": question.question_text.replace(" ", "  ", 1)[:-1] + " " + vocabulary[-1] + "?",
+                    "option_a": question.option_b, "option_b": question.option_a,
+                    "option_c": question.option_c, "option_d": question.option_d,
+                }
+                for question in existing
+            ]
+            fresh = [make_fields(n) for n in range(args.repeat)]
+            found = sum(bool(matches) for matches in find_near_duplicates(
+                db, question_signatures(reworded), args.threshold
+            ))
+
+            print(f"⏱️  {args.rows:,} indexed questions, threshold {args.threshold}, {args.repeat} calls")
+            print(f"   reworded copies flagged: {found}/{len(reworded)}")
+            for label, candidates in (("reworded copy", reworded), ("new question", fresh)):
+                values = iter(candidates)
+                _report(label, _time_calls(
+                    lambda: find_near_duplicates(db, question_signatures([next(values)]), args.threshold), len(candidates)
+                ))
+            batch = [make_fields(n) for n in range(1000)]
+            _report("import batch of 1000", _time_calls(
+                lambda: find_near_duplicates(db, question_signatures(batch), args.threshold), 3
+            ))
+        finally:
+            question_ids = select(Question.id).where(Question.category_id == category_id)
+            db.execute(delete(QuestionLshBucket).where(QuestionLshBucket.question_id.in_(question_ids)))
+            db.execute(delete(QuestionSignature).where(QuestionSignature.question_id.in_(question_ids)))
+            _drop_category(db, category_id)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz application benchmarks")
+    parser.add_argument(
+        "--database-url",
+        help="Scratch database to benchmark against (default: temporary SQLite file)"
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    random_parser = subparsers.add_parser("random-sampling", help=bench_random_sampling.__doc__)
+    random_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    random_parser.add_argument("--limit", type=int, default=10)
+    random_parser.add_argument("--repeat", type=int, default=50)
+    random_parser.set_defaults(func=bench_random_sampling)
+
+    export_parser = subparsers.add_parser("export", help=bench_export.__doc__)
+    export_parser.add_argument("--rows", type=int, default=1000000)
+    export_parser.add_argument("--formats", nargs="+", default=["jsonl", "csv"])
+    export_parser.set_defaults(func=bench_export)
+
+    serialize_parser = subparsers.add_parser("serialize", help=bench_serialize.__doc__)
+    serialize_parser.add_argument("--rows", type=int, default=1000)
+    serialize_parser.add_argument("--repeat", type=int, default=50)
+    serialize_parser.set_defaults(func=bench_serialize)
+
+    load_parser = subparsers.add_parser("load", help=bench_load.__doc__)
+    load_parser.add_argument("--url", default="http://localhost:8000")
+    load_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    load_parser.add_argument("--requests", type=int, default=500)
+    load_parser.add_argument(
+        "--paths", nargs="+",
+        default=["/quiz/categories/", "/quiz/random/1?limit=10", "/quiz/questions/1?limit=10"]
+    )
+    load_parser.add_argument("--username", help="Also load /auth/me as this admin user")
+    load_parser.add_argument("--password")
+    load_parser.set_defaults(func=bench_load, uses_database=False)
+
+    leaderboard_parser = subparsers.add_parser("leaderboard", help=bench_leaderboard.__doc__)
+    leaderboard_parser.add_argument("--entries", type=int, default=10000000)
+    leaderboard_parser.add_argument("--size", type=int, default=100)
+    leaderboard_parser.add_argument("--repeat", type=int, default=1000)
+    leaderboard_parser.set_defaults(func=bench_leaderboard, uses_database=False)
+
+    search_parser = subparsers.add_parser("search", help=bench_search.__doc__)
+    search_parser.add_argument("--rows", type=int, default=1000000)
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.add_argument("--repeat", type=int, default=20)
+    search_parser.set_defaults(func=bench_search)
+
+    duplicates_parser = subparsers.add_parser("near-duplicates", help=bench_near_duplicates.__doc__)
+    duplicates_parser.add_argument("--rows", type=int, default=1000000)
+    duplicates_parser.add_argument("--threshold", type=float, default=0.7)
+    duplicates_parser.add_argument("--repeat", type=int, default=50)
+    duplicates_parser.set_defaults(func=bench_near_duplicates)
+
+    args = parser.parse_args()
+
+    temp_path = None
+    if getattr(args, "uses_database", True) and not args.database_url:
+        fd, temp_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        args.database_url = f"sqlite:///{temp_path}"
+
+    print(f"🚀 Running {args.benchmark} benchmark")
+    print("=" * 50)
+    try:
+        args.func(args)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+
+if __name__ == "__main__":
+    main()
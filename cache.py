@@ -0,0 +1,532 @@
+"""
+Two-tier cache with request coalescing and stale-while-revalidate.
+
+A Cache is a namespace of values produced by a caller-supplied loader.
+Lookups try an in-process LRU tier, then the shared tier (when
+CACHE_SHARED_URL is set, so workers reuse each other's loads), and only then
+the loader:
+- Concurrent misses on a key are coalesced: one caller runs the loader and
+  the others wait for its result, so a cold key costs one database load
+  however many requests arrive at once.
+- An entry is fresh for ttl_seconds and stale for stale_seconds after that.
+  A stale entry is served at once while a single background refresh reloads
+  it; past that it is a miss.
+- Each namespace counts hits, misses, coalesced waits, loads and evictions,
+  reported under "caches" in /metrics.
+
+Loaders run outside the request that triggered them (a background refresh
+outlives it), so they open their own database sessions. Values must be
+JSON-serializable when a shared tier is configured.
+
+CACHE_SHARED_URL takes redis://[user:password@]host[:port][/db] for any
+Redis-protocol server, or memory:// for an in-process stand-in used by tests
+and single-worker runs. Shared tier failures count as misses, never as
+request errors. Invalidations run on the event loop (see invalidation.py),
+so their shared tier deletes are handed to a background thread and the key
+skips the shared tier until the delete is done.
+"""
+
+import asyncio
+import json
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import unquote, urlparse
+from config import settings
+
+SHARED_RETRY_SECONDS = 5.0  # after a failed connection, the shared tier is skipped this long
+
+
+class MemoryTier:
+    """In-process stand-in for a shared tier"""
+
+    blocking = False
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            if item[1] > time.time():
+                return item[0]
+            del self._values[key]
+            return None
+
+    def set(self, key: str, value: bytes, ttl_seconds: float):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl_seconds)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._values if key.startswith(prefix)]:
+                del self._values[key]
+
+
+class RespError(Exception):
+    pass
+
+
+class RespTier:
+    """Shared tier on a Redis-protocol (RESP2) server: Redis, Valkey, KeyDB, ..."""
+
+    blocking = True
+
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self._address = (parsed.hostname or "localhost", parsed.port or 6379)
+        self._username = unquote(parsed.username) if parsed.username else None
+        self._password = unquote(parsed.password) if parsed.password else None
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self._timeout = timeout
+        self._socket = None
+        self._reader = None
+        self._retry_at = 0.0
+        # One connection; commands are sub-millisecond, so requests take turns
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._socket = socket.create_connection(self._address, timeout=self._timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile("rb")
+        try:
+            if self._password:
+                self._send(("AUTH", self._username, self._password) if self._username else ("AUTH", self._password))
+                self._read()
+            if self._db:
+                self._send(("SELECT", self._db))
+                self._read()
+        except RespError:
+            self._close()
+            raise
+
+    def _close(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+        self._socket = self._reader = None
+
+    def _send(self, args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._socket.sendall(b"".join(parts))
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Cache server closed the connection")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RespError(body.decode(errors="replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Cache server closed the connection")
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RespError(f"Unexpected reply {line[:40]!r}")
+
+    def command(self, *args):
+        with self._lock:
+            try:
+                if self._socket is None:
+                    if time.monotonic() < self._retry_at:
+                        raise ConnectionError("Shared cache unavailable, retrying later")
+                    self._retry_at = time.monotonic() + SHARED_RETRY_SECONDS
+                    self._connect()
+                    self._retry_at = 0.0
+                self._send(args)
+                return self._read()
+            except OSError:
+                # A timeout may leave a reply in flight; start over on a new connection
+                self._close()
+                raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float):
+        self.command("SET", key, value, "PX", max(1, int(ttl_seconds * 1000)))
+
+    def delete(self, key: str):
+        self.command("DEL", key)
+
+    def delete_prefix(self, prefix: str):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        cursor = b"0"
+        while True:
+            cursor, keys = self.command("SCAN", cursor, "MATCH", pattern, "COUNT", 1000)
+            if keys:
+                self.command("DEL", *keys)
+            if cursor == b"0":
+                return
+
+
+def shared_tier_from_url(url: Optional[str]):
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return MemoryTier()
+    if scheme == "redis":
+        return RespTier(url, settings.cache_shared_timeout_seconds)
+    raise ValueError(f"Unsupported CACHE_SHARED_URL scheme: {scheme}")
+
+
+shared_tier = shared_tier_from_url(settings.cache_shared_url)
+# One thread keeps shared tier deletes in the order they were requested
+_shared_deletes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-shared-delete")
+_caches: Dict[str, "Cache"] = {}
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class Cache:
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        stale_seconds: float = 0.0,
+        max_entries: int = 1024,
+        shared: bool = True
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.shared = shared_tier if shared else None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._tasks = set()
+        # Loads that started before an invalidation must not store their result
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        # Keys whose shared tier delete has not run yet, and pending clears
+        self._pending_deletes: Dict[str, int] = {}
+        self._pending_clears = 0
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ("hits", "shared_hits", "stale_hits", "misses", "coalesced", "loads",
+             "load_errors", "refreshes", "evictions", "shared_errors"),
+            0
+        )
+        self._last_error = None
+        _caches[namespace] = self
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def _shared_key(self, key: str) -> str:
+        return f"{settings.cache_key_prefix}{self.namespace}:{key}"
+
+    def _token(self, key: str):
+        return (self._epoch, self._generations.get(key, 0))
+
+    # Local tier
+    def _local_get(self, key: str, now: float) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _local_put(self, key: str, entry: _Entry, token=None) -> bool:
+        with self._lock:
+            if token is not None and token != self._token(key):
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts["evictions"] += 1
+            return True
+
+    # Shared tier
+    def _shared_failed(self, exc: Exception):
+        with self._lock:
+            self._counts["shared_errors"] += 1
+            self._last_error = f"{type(exc).__name__}: {exc}"
+
+    def _shared_get(self, key: str, now: float) -> Optional[_Entry]:
+        try:
+            data = self.shared.get(self._shared_key(key))
+        except (OSError, RespError) as exc:
+            self._shared_failed(exc)
+            return None
+        if data is None:
+            return None
+        try:
+            envelope = json.loads(data)
+            entry = _Entry(envelope["value"], envelope["fresh_until"], envelope["stale_until"])
+        except (ValueError, KeyError, TypeError) as exc:
+            self._shared_failed(exc)
+            return None
+        if entry.stale_until <= now:
+            return None
+        self._local_put(key, entry)
+        return entry
+
+    def _shared_put(self, key: str, entry: _Entry):
+        envelope = {"value": entry.value, "fresh_until": entry.fresh_until, "stale_until": entry.stale_until}
+        try:
+            self.shared.set(self._shared_key(key), json.dumps(envelope).encode(), entry.stale_until - time.time())
+        except (OSError, RespError) as exc:
+            self._shared_failed(exc)
+
+    def _shared_readable(self, key: str) -> bool:
+        """False while an invalidation of key has not reached the shared tier"""
+        with self._lock:
+            return not self._pending_clears and key not in self._pending_deletes
+
+    def _shared_delete(self, key: Optional[str] = None):
+        """Delete key, or the whole namespace, from the shared tier without blocking the caller"""
+        with self._lock:
+            if key is None:
+                self._pending_clears += 1
+            else:
+                self._pending_deletes[key] = self._pending_deletes.get(key, 0) + 1
+
+        def delete():
+            try:
+                if key is None:
+                    self.shared.delete_prefix(self._shared_key(""))
+                else:
+                    self.shared.delete(self._shared_key(key))
+            except (OSError, RespError) as exc:
+                self._shared_failed(exc)
+            finally:
+                with self._lock:
+                    if key is None:
+                        self._pending_clears -= 1
+                    elif self._pending_deletes[key] == 1:
+                        del self._pending_deletes[key]
+                    else:
+                        self._pending_deletes[key] -= 1
+
+        if self.shared.blocking:
+            _shared_deletes.submit(delete)
+        else:
+            delete()
+
+    async def _in_executor(self, function, *args):
+        if not self.shared.blocking:
+            return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    def _new_entry(self, value) -> _Entry:
+        now = time.time()
+        return _Entry(value, now + self.ttl_seconds, now + self.ttl_seconds + self.stale_seconds)
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        """The usable entry of key, local first; None on a miss"""
+        now = time.time()
+        entry = self._local_get(key, now)
+        if entry is not None and now < entry.fresh_until:
+            self._count("hits")
+            return entry
+        if self.shared is not None and self._shared_readable(key):
+            # Another worker may have refreshed what is stale here
+            shared_entry = self._shared_get(key, now)
+            if shared_entry is not None and (entry is None or shared_entry.fresh_until > entry.fresh_until):
+                entry = shared_entry
+                if now < entry.fresh_until:
+                    self._count("shared_hits")
+                    return entry
+        if entry is not None:
+            self._count("stale_hits")
+        return entry
+
+    # Synchronous callers (threadpool endpoints)
+    def get_or_load(self, key, loader: Callable[[], Any]) -> Any:
+        """The cached value of key, loading it with loader() on a miss"""
+        if self.ttl_seconds <= 0:
+            self._count("misses")
+            return loader()
+        key = str(key)
+        entry = self._lookup(key)
+        if entry is not None:
+            if time.time() >= entry.fresh_until:
+                self._start_refresh(key, loader)
+            return entry.value
+        self._count("misses")
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                token = self._token(key)
+            else:
+                self._counts["coalesced"] += 1
+        if not leader:
+            return future.result()
+        return self._run_load(key, loader, future, token)
+
+    def _run_load(self, key: str, loader: Callable[[], Any], future: Future, token):
+        try:
+            value = loader()
+        except BaseException as exc:
+            self._load_failed(exc)
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        self._count("loads")
+        entry = self._new_entry(value)
+        if self._local_put(key, entry, token) and self.shared is not None:
+            self._shared_put(key, entry)
+        future.set_result(value)
+        return value
+
+    def _start_refresh(self, key: str, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._inflight:
+                return
+            future = self._inflight[key] = Future()
+            token = self._token(key)
+            self._counts["refreshes"] += 1
+
+        def refresh():
+            try:
+                self._run_load(key, loader, future, token)
+            except Exception:
+                pass  # counted in load_errors; the stale value keeps being served
+
+        threading.Thread(target=refresh, name=f"cache-refresh-{self.namespace}", daemon=True).start()
+
+    # Asynchronous callers (event loop endpoints)
+    async def get_or_load_async(self, key, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """The cached value of key, loading it with await loader() on a miss"""
+        if self.ttl_seconds <= 0:
+            self._count("misses")
+            return await loader()
+        key = str(key)
+        entry = self._local_get(key, time.time())
+        if entry is not None and time.time() < entry.fresh_until:
+            self._count("hits")
+            return entry.value
+        entry = self._lookup(key) if self.shared is None else await self._in_executor(self._lookup, key)
+        if entry is not None:
+            if time.time() >= entry.fresh_until:
+                self._start_refresh_async(key, loader)
+            return entry.value
+        self._count("misses")
+        future = self._inflight_async.get(key)
+        if future is not None:
+            self._count("coalesced")
+            # shield: a cancelled waiter must not cancel the load the others wait for
+            return await asyncio.shield(future)
+        future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        return await self._run_load_async(key, loader, future, self._token(key))
+
+    async def _run_load_async(self, key: str, loader, future: asyncio.Future, token):
+        try:
+            value = await loader()
+        except BaseException as exc:
+            self._load_failed(exc)
+            future.set_exception(exc)
+            future.exception()  # retrieved: nobody may be waiting
+            raise
+        finally:
+            self._inflight_async.pop(key, None)
+        self._count("loads")
+        future.set_result(value)
+        entry = self._new_entry(value)
+        if self._local_put(key, entry, token) and self.shared is not None:
+            await self._in_executor(self._shared_put, key, entry)
+        return value
+
+    def _start_refresh_async(self, key: str, loader):
+        if key in self._inflight_async:
+            return
+        future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        token = self._token(key)
+        self._count("refreshes")
+
+        async def refresh():
+            try:
+                await self._run_load_async(key, loader, future, token)
+            except Exception:
+                pass  # counted in load_errors; the stale value keeps being served
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _load_failed(self, exc: BaseException):
+        with self._lock:
+            self._counts["load_errors"] += 1
+            self._last_error = f"{type(exc).__name__}: {exc}"
+
+    def invalidate(self, key):
+        """Drop key from both tiers"""
+        key = str(key)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self._shared_delete(key)
+
+    def clear(self):
+        """Drop every key of the namespace from both tiers"""
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._entries.clear()
+        if self.shared is not None:
+            self._shared_delete()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+        served = counts["hits"] + counts["shared_hits"] + counts["stale_hits"]
+        return {
+            "entries": entries,
+            **counts,
+            "hit_rate": round(served / (served + counts["misses"]), 4) if served + counts["misses"] else 0.0,
+            "last_error": self._last_error,
+        }
+
+
+def cache_stats() -> dict:
+    """Stats of every cache namespace, for /metrics"""
+    return {
+        "shared_tier": type(shared_tier).__name__ if shared_tier is not None else None,
+        "namespaces": {namespace: cache.stats() for namespace, cache in _caches.items()},
+    }
@@ -0,0 +1,24 @@
+"""
+Shared test setup
+
+The app reads its settings once, at import, so every test module runs
+against the same throwaway SQLite files standing in for the primary and the
+replica. They are configured here, before any test module imports the app.
+Test modules that also run as scripts import this module first.
+"""
+
+import os
+import tempfile
+
+# Kept in the environment so a test module run as a script, which pytest
+# imports a second time, sees the same files
+if "QUIZ_TEST_DIR" not in os.environ:
+    os.environ["QUIZ_TEST_DIR"] = tempfile.mkdtemp(prefix="quiz-tests-")
+TEST_DIR = os.environ["QUIZ_TEST_DIR"]
+PRIMARY = os.path.join(TEST_DIR, "primary.db")
+REPLICA = os.path.join(TEST_DIR, "replica.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["REPLICA_DATABASE_URL"] = f"sqlite:///{REPLICA}"
+os.environ["REPLICA_HEALTH_CHECK_SECONDS"] = "3600"  # the tests run the checks themselves
+os.environ["CATALOG_CACHE_SECONDS"] = "0"  # every catalog read reaches a database
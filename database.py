@@ -1,17 +1,95 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from db_pool import InstrumentedAsyncPool, InstrumentedQueuePool
 
-engine = create_engine(settings.database_url)
+
+def engine_options(database_url: str, poolclass) -> dict:
+    """Pool and statement timeout settings for an engine on database_url"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and (url.database in (None, "", ":memory:") or url.get_driver_name() == "aiosqlite"):
+        # In-memory databases live in their connection and every aiosqlite
+        # connection owns a thread; keep SQLAlchemy's default pools for both
+        return {}
+    options = {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_statement_timeout_ms and url.get_backend_name() == "postgresql":
+        timeout = str(settings.db_statement_timeout_ms)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+engine = create_engine(settings.database_url, **engine_options(settings.database_url, InstrumentedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# asyncio driver for each sync driver we accept in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Derive the asyncio driver URL from a sync DATABASE_URL"""
+    url = make_url(database_url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+async_database_url = settings.async_database_url or get_async_database_url(settings.database_url)
+async_engine = create_async_engine(async_database_url, **engine_options(async_database_url, InstrumentedAsyncPool))
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Optional read replica; see replica.py for how reads are routed to it
+replica_async_engine = None
+ReplicaSessionLocal = None
+if settings.replica_database_url:
+    _replica_database_url = get_async_database_url(settings.replica_database_url)
+    replica_async_engine = create_async_engine(
+        _replica_database_url, **engine_options(_replica_database_url, InstrumentedAsyncPool)
+    )
+    ReplicaSessionLocal = async_sessionmaker(
+        replica_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
+def pool_stats() -> dict:
+    """Occupancy and checkout wait metrics of the connection pools"""
+    engines = [("sync", engine), ("async", async_engine.sync_engine)]
+    if replica_async_engine is not None:
+        engines.append(("replica", replica_async_engine.sync_engine))
+    return {
+        name: pool.stats() if hasattr(pool, "stats") else {"status": pool.status()}
+        for name, pool in ((name, engine.pool) for name, engine in engines)
+    }
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Generate a large synthetic dataset for load and performance testing
+
+Creates categories, questions, admin users, invitations and optionally quiz
+attempts with their answers, written with batched bulk INSERTs. Question
+texts use a Zipf-distributed vocabulary with log-normal lengths, categories
+differ in size, and attempts answer according to the Rasch model (player
+ability against question difficulty), so the data behaves like a real bank
+for search, near-duplicate checks, adaptive quizzes and leaderboards.
+
+Every table draws from its own random stream derived from --seed, so the
+same seed and counts produce the same rows on SQLite and Postgres (only the
+bcrypt salt of the shared password differs), and changing one table's count
+leaves the other tables' rows alone. Timestamps count back from
+--end-date (default: today); pin it to reproduce them exactly. Generated
+category names and usernames are fixed, so run it against an empty database
+(--drop empties it first). Every generated admin gets the password
+--admin-password, hashed once.
+
+Usage:
+    python generate_data.py --categories 50 --questions 1000000 --attempts 200000
+    python generate_data.py --database-url sqlite:///loadtest.db --drop --sign
+"""
+
+import argparse
+import base64
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+import numpy as np
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from config import settings
+from models import AdminInvitation, AdminUser, AttemptAnswer, Base, Category, Question, QuizAttempt
+
+# Independent random streams, so one table's count never shifts another's rows
+TEXT_STREAM, CATEGORY_STREAM, QUESTION_STREAM, ADMIN_STREAM, INVITATION_STREAM, ATTEMPT_STREAM = range(1, 7)
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pa", "qui", "dor", "ben", "gal", "hux")
+ADMIN_ROLES = (["admin", "moderator", "super_admin"], [0.8, 0.15, 0.05])
+INVITATION_ROLES = (["admin", "moderator"], [0.7, 0.3])
+INVITATION_DAYS = 7  # as in POST /auth/invite
+
+
+class TextGenerator:
+    """Synthetic words whose frequencies follow a Zipf distribution;
+    vocabulary[0] is the most common word"""
+
+    def __init__(self, seed: int, vocabulary_size: int = 20000):
+        self._rng = np.random.default_rng([seed, TEXT_STREAM])
+        words = set()
+        while len(words) < vocabulary_size:
+            syllables = self._rng.integers(0, len(SYLLABLES), int(self._rng.integers(2, 5)))
+            words.add("".join(SYLLABLES[i] for i in syllables))
+        self.vocabulary = sorted(words)
+        self._rng.shuffle(self.vocabulary)
+        self._words = np.array(self.vocabulary, dtype=object)
+        weights = 1.0 / np.arange(1, vocabulary_size + 1)
+        self._cdf = np.cumsum(weights) / weights.sum()
+
+    def sentences(self, lengths: Sequence[int], rng=None) -> List[str]:
+        """One sentence of each given word count, drawn with rng (default: the generator's own)"""
+        lengths = np.asarray(lengths, dtype=np.int64)
+        rng = rng if rng is not None else self._rng
+        picks = np.searchsorted(self._cdf, rng.random(int(lengths.sum())), side="right")
+        words = self._words[np.minimum(picks, len(self._words) - 1)]
+        ends = np.cumsum(lengths).tolist()
+        return [" ".join(words[end - length:end]) for length, end in zip(lengths.tolist(), ends)]
+
+    def sentence(self, words: int) -> str:
+        return self.sentences([words])[0]
+
+
+def _lengths(rng, size: int, median: float, sigma: float, low: int, high: int) -> np.ndarray:
+    """Log-normal word counts, the usual shape of text lengths"""
+    return np.clip(np.rint(rng.lognormal(np.log(median), sigma, size)), low, high).astype(np.int64)
+
+
+def _timestamps(rng, size: int, end: datetime, days: int) -> List[datetime]:
+    return [end - timedelta(seconds=offset) for offset in rng.uniform(0, days * 86400, size).tolist()]
+
+
+def _token(rng) -> str:
+    return base64.urlsafe_b64encode(rng.bytes(32)).decode().rstrip("=")
+
+
+def generate_categories(db: Session, text: TextGenerator, seed: int, count: int, questions: int, end: datetime, days: int) -> List[int]:
+    """Insert `count` categories of skewed sizes holding `questions` in total; return their IDs"""
+    if not count:
+        return []
+    rng = np.random.default_rng([seed, CATEGORY_STREAM])
+    weights = rng.lognormal(0, 1, count)
+    sizes = rng.multinomial(questions, weights / weights.sum()).tolist()
+    names = text.sentences(rng.integers(1, 4, count), rng)
+    descriptions = text.sentences(_lengths(rng, count, 12, 0.4, 4, 40), rng)
+    created = sorted(_timestamps(rng, count, end, days))
+    category_ids = db.execute(
+        insert(Category).returning(Category.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": f"{name.title()} {n + 1}",
+                "description": description.capitalize() + ".",
+                "question_count": size,
+                "created_at": created[n],
+            }
+            for n, (name, description, size) in enumerate(zip(names, descriptions, sizes))
+        ]
+    ).scalars().all()
+    db.commit()
+    return list(category_ids)
+
+
+def generate_questions(
+    db: Session, text: TextGenerator, seed: int, category_ids: Sequence[int], end: datetime, days: int, batch_size: int
+) -> int:
+    """Insert every category's question_count questions, interleaved across
+    categories as admins would add them; return how many were written"""
+    rng = np.random.default_rng([seed, QUESTION_STREAM])
+    sizes = dict(db.execute(select(Category.id, Category.question_count).where(Category.id.in_(category_ids))).all())
+    owners = np.repeat(np.asarray(category_ids, dtype=np.int64), [sizes[category_id] for category_id in category_ids])
+    rng.shuffle(owners)
+    # Questions were added over the period, in ID order
+    offsets = np.sort(rng.uniform(0, days * 86400, len(owners)))[::-1].tolist()
+    for start in range(0, len(owners), batch_size):
+        batch = owners[start:start + batch_size].tolist()
+        size = len(batch)
+        texts = text.sentences(_lengths(rng, size, 11, 0.45, 3, 60), rng)
+        options = text.sentences(_lengths(rng, size * 4, 2, 0.6, 1, 12), rng)
+        has_explanation = rng.random(size) < 0.6
+        explanations = iter(text.sentences(_lengths(rng, int(has_explanation.sum()), 22, 0.5, 5, 120), rng))
+        answers = rng.integers(0, 4, size).tolist()
+        difficulties = np.round(rng.normal(0, 1, size), 3).tolist()
+        db.execute(insert(Question.__table__), [
+            {
+                "question_text": texts[n].capitalize() + "?",
+                "option_a": options[4 * n],
+                "option_b": options[4 * n + 1],
+                "option_c": options[4 * n + 2],
+                "option_d": options[4 * n + 3],
+                "correct_answer": "ABCD"[answers[n]],
+                "explanation": next(explanations).capitalize() + "." if has_explanation[n] else None,
+                "difficulty": difficulties[n],
+                "category_id": batch[n],
+                "created_at": end - timedelta(seconds=offsets[start + n]),
+            }
+            for n in range(size)
+        ])
+        db.commit()
+    return len(owners)
+
+
+def generate_admins(db: Session, text: TextGenerator, seed: int, count: int, password: str, end: datetime, days: int) -> List[int]:
+    """Insert admin users sharing one password; return their IDs"""
+    from auth import get_password_hash
+
+    if not count:
+        return []
+    rng = np.random.default_rng([seed, ADMIN_STREAM])
+    hashed_password = get_password_hash(password)
+    first_names = text.sentences(np.ones(count, dtype=np.int64), rng)
+    last_names = text.sentences(np.ones(count, dtype=np.int64), rng)
+    roles = rng.choice(ADMIN_ROLES[0], count, p=ADMIN_ROLES[1]).tolist()
+    active = (rng.random(count) < 0.95).tolist()
+    logged_in = (rng.random(count) < 0.8).tolist()
+    last_logins = _timestamps(rng, count, end, days)
+    created = _timestamps(rng, count, end - timedelta(days=days), days)
+    admin_ids = db.execute(
+        insert(AdminUser).returning(AdminUser.id, sort_by_parameter_order=True),
+        [
+            {
+                "username": f"loadtest_{n + 1}",
+                "email": f"loadtest_{n + 1}@example.com",
+                "hashed_password": hashed_password,
+                "first_name": first_names[n].capitalize(),
+                "last_name": last_names[n].capitalize(),
+                "role": roles[n],
+                "is_active": active[n],
+                "is_email_verified": True,
+                "last_login": last_logins[n] if logged_in[n] else None,
+                "created_at": created[n],
+            }
+            for n in range(count)
+        ]
+    ).scalars().all()
+    db.commit()
+    return list(admin_ids)
+
+
+def generate_invitations(db: Session, seed: int, count: int, admin_ids: Sequence[int], end: datetime, days: int, batch_size: int):
+    """Insert invitations from the generated admins, some used and some expired"""
+    if not count:
+        return
+    rng = np.random.default_rng([seed, INVITATION_STREAM])
+    roles = rng.choice(INVITATION_ROLES[0], count, p=INVITATION_ROLES[1]).tolist()
+    inviters = rng.choice(admin_ids, count).tolist() if admin_ids else [None] * count
+    used = (rng.random(count) < 0.3).tolist()
+    sent = _timestamps(rng, count, end, days)
+    rows = [
+        {
+            "invitation_id": _token(rng),
+            "email": f"invitee_{n + 1}@example.com",
+            "role": roles[n],
+            "invited_by": inviters[n],
+            "is_used": used[n],
+            "expires_at": sent[n] + timedelta(days=INVITATION_DAYS),
+            "created_at": sent[n],
+        }
+        for n in range(count)
+    ]
+    for start in range(0, count, batch_size):
+        db.execute(insert(AdminInvitation.__table__), rows[start:start + batch_size])
+        db.commit()
+
+
+def generate_attempts(
+    db: Session,
+    seed: int,
+    count: int,
+    answers_per_attempt: int,
+    category_ids: Sequence[int],
+    end: datetime,
+    days: int,
+    batch_size: int
+):
+    """Insert quiz attempts and their answers; players of normally distributed
+    ability answer each question correctly with the Rasch probability"""
+    rng = np.random.default_rng([seed, ATTEMPT_STREAM])
+    questions = db.execute(
+        select(Question.category_id, Question.id, Question.correct_answer, Question.difficulty)
+        .where(Question.category_id.in_(category_ids))
+        .order_by(Question.category_id, Question.id)
+    ).all()
+    if not count or not questions:
+        return
+    owners = np.array([question.category_id for question in questions], dtype=np.int64)
+    question_ids = np.array([question.id for question in questions], dtype=np.int64)
+    correct = np.array(["ABCD".index(question.correct_answer) for question in questions], dtype=np.int64)
+    difficulty = np.array([question.difficulty for question in questions])
+    categories, starts, sizes = np.unique(owners, return_index=True, return_counts=True)
+
+    # Bigger categories get more attempts
+    picks = rng.choice(len(categories), count, p=sizes / sizes.sum())
+    abilities = rng.normal(0, 1, count)
+    submitted = _timestamps(rng, count, end, days)
+    attempts, answers = [], []
+    for n in range(count):
+        category = picks[n]
+        total = min(answers_per_attempt, int(sizes[category]))
+        rows = starts[category] + rng.choice(int(sizes[category]), total, replace=False)
+        is_correct = rng.random(total) < 1 / (1 + np.exp(difficulty[rows] - abilities[n]))
+        selected = np.where(is_correct, correct[rows], (correct[rows] + rng.integers(1, 4, total)) % 4)
+        attempt_id = str(uuid.UUID(bytes=rng.bytes(16), version=4))
+        right = int(is_correct.sum())
+        attempts.append({
+            "id": attempt_id,
+            "category_id": int(categories[category]),
+            "total_questions": total,
+            "correct_answers": right,
+            "score_percentage": right / total * 100,
+            "submitted_at": submitted[n],
+        })
+        answers.extend(
+            {"attempt_id": attempt_id, "question_id": question_id, "selected_answer": "ABCD"[answer], "is_correct": hit}
+            for question_id, answer, hit in zip(question_ids[rows].tolist(), selected.tolist(), is_correct.tolist())
+        )
+        if len(attempts) >= batch_size or n == count - 1:
+            db.execute(insert(QuizAttempt.__table__), attempts)
+            db.execute(insert(AttemptAnswer.__table__), answers)
+            db.commit()
+            attempts, answers = [], []
+
+
+def generate(
+    db: Session,
+    seed: int = 42,
+    categories: int = 20,
+    questions: int = 100000,
+    admins: int = 50,
+    invitations: int = 100,
+    attempts: int = 0,
+    answers_per_attempt: int = 10,
+    admin_password: str = "LoadTest123!",
+    end_date: Optional[date] = None,
+    days: int = 90,
+    batch_size: int = 10000
+) -> dict:
+    """Generate a complete dataset; return the generated category IDs and row counts"""
+    end_date = end_date or datetime.now(timezone.utc).date()
+    end = datetime(end_date.year, end_date.month, end_date.day, tzinfo=timezone.utc)
+    text = TextGenerator(seed)
+    timings = {}
+
+    def timed(name, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings[name] = time.perf_counter() - start
+        return result
+
+    category_ids = timed("categories", generate_categories, db, text, seed, categories, questions, end, days)
+    written = timed("questions", generate_questions, db, text, seed, category_ids, end, days, batch_size)
+    admin_ids = timed("admins", generate_admins, db, text, seed, admins, admin_password, end, days)
+    timed("invitations", generate_invitations, db, seed, invitations, admin_ids, end, days, batch_size)
+    timed("attempts", generate_attempts, db, seed, attempts, answers_per_attempt, category_ids, end, days, batch_size)
+    return {
+        "category_ids": category_ids,
+        "counts": {
+            "categories": len(category_ids),
+            "questions": written,
+            "admins": len(admin_ids),
+            "invitations": invitations,
+            "attempts": attempts if written else 0,
+        },
+        "seconds": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic dataset with bulk inserts")
+    parser.add_argument("--database-url", default=settings.database_url, help="Target database (default: DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=42, help="Same seed and counts, same rows")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=100000, help="Spread over the categories with skewed sizes")
+    parser.add_argument("--admins", type=int, default=50)
+    parser.add_argument("--invitations", type=int, default=100)
+    parser.add_argument("--attempts", type=int, default=0, help="Quiz attempts with their answers")
+    parser.add_argument("--answers-per-attempt", type=int, default=10)
+    parser.add_argument("--admin-password", default="LoadTest123!", help="Password of every generated admin")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Latest timestamp date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--days", type=int, default=90, help="Timestamps spread over this many days before --end-date")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per INSERT batch and transaction")
+    parser.add_argument("--drop", action="store_true", help="Drop and recreate every table first")
+    parser.add_argument("--sign", action="store_true", help="Build the near-duplicate index of the new questions")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.drop:
+        print("🗑️  Dropping all tables...")
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        print(f"🔄 Generating data with seed {args.seed}...")
+        result = generate(
+            db,
+            seed=args.seed,
+            categories=args.categories,
+            questions=args.questions,
+            admins=args.admins,
+            invitations=args.invitations,
+            attempts=args.attempts,
+            answers_per_attempt=max(1, args.answers_per_attempt),
+            admin_password=args.admin_password,
+            end_date=args.end_date,
+            days=max(1, args.days),
+            batch_size=max(1, args.batch_size),
+        )
+        if args.sign:
+            from near_duplicates import index_missing
+
+            print("🔄 Signing questions for the near-duplicate index...")
+            start = time.perf_counter()
+            index_missing(db, args.batch_size)
+            result["seconds"]["signatures"] = time.perf_counter() - start
+    except Exception as e:
+        print(f"❌ Generation failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        engine.dispose()
+
+    for table, count in result["counts"].items():
+        seconds = result["seconds"][table]
+        print(f"   {table:<12} {count:>12,} rows in {seconds:6.1f}s")
+    if "signatures" in result["seconds"]:
+        print(f"   {'signatures':<12} {'':>12} built in {result['seconds']['signatures']:6.1f}s")
+    print("✅ Dataset generated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Build near-duplicate signatures for questions that have none
+
+The admin question endpoints keep question_signatures and
+question_lsh_buckets up to date, but questions written before those tables
+existed (or by manual SQL) are not indexed and so never show up as near
+duplicates. This script signs them in batches; --rebuild signs every question
+again, which is needed after changing the MinHash settings.
+
+Usage:
+    python index_near_duplicates.py [--batch-size 5000] [--rebuild]
+"""
+
+import argparse
+from sqlalchemy import delete
+from database import SessionLocal
+from models import QuestionLshBucket, QuestionSignature
+from near_duplicates import index_missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build near-duplicate signatures for unindexed questions")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Questions signed per transaction")
+    parser.add_argument("--rebuild", action="store_true", help="Drop every stored signature and sign all questions")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            db.execute(delete(QuestionLshBucket))
+            db.execute(delete(QuestionSignature))
+            db.commit()
+            print("🗑️  Dropped stored signatures")
+        print("🔄 Signing questions...")
+        indexed = index_missing(db, max(1, args.batch_size))
+    except Exception as e:
+        print(f"❌ Indexing failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if indexed:
+        print(f"✅ Signed {indexed:,} questions")
+    else:
+        print("✅ Every question already has a signature")
+
+
+if __name__ == "__main__":
+    main()
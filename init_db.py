@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 from models import Base, Category, Question, AdminUser
 from auth import get_password_hash
+from near_duplicates import index_missing
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -117,19 +118,23 @@ def init_db():
             }
         ]
         
+        category_by_id = {category.id: category for category in categories}
         for question_data in sample_questions:
             question = Question(**question_data)
             db.add(question)
+            category_by_id[question_data["category_id"]].question_count += 1
         
         # Create a default admin user
         admin_user = AdminUser(
             username="admin",
             email="admin@quizapp.com",
-            hashed_password=get_password_hash("admin123")
+            hashed_password=get_password_hash("admin123"),
+            role="super_admin"
         )
         db.add(admin_user)
         
         db.commit()
+        index_missing(db)
         print("Database initialized successfully!")
         print("Default admin credentials:")
         print("Username: admin")
@@ -0,0 +1,166 @@
+"""
+Cross-worker invalidation of the in-process caches.
+
+Each worker keeps category quiz indexes and payloads, resolved admin users
+and unflushed answer statistics in memory. A write that changes them calls publish(db, entity, keys)
+inside its transaction. When the transaction commits, the event goes to this
+process's handlers, and on Postgres it is also sent with pg_notify from the
+same transaction, so it reaches the other workers only if the commit
+succeeds. Each worker runs a LISTEN task (started in the lifespan) that hands
+the events of other workers to the same handlers. Events are dropped on
+rollback.
+
+A listener that loses its connection may miss events, so after every
+(re)connect it clears the subscribed caches. Without Postgres only local
+delivery happens, which is all a single process needs.
+"""
+
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+from typing import Callable, Hashable, Iterable, Optional
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from config import settings
+from database import async_database_url
+
+CATEGORY = "category"
+ADMIN_USER = "admin_user"
+QUESTION_STATS = "question_stats"
+
+PENDING_KEY = "invalidation_events"
+NOTIFY_KEYS_PER_EVENT = 200  # keeps payloads well under Postgres' 8000 byte limit
+
+
+class InvalidationBus:
+    def __init__(self, listen_url: Optional[str] = async_database_url):
+        self.origin = uuid.uuid4().hex  # skips this worker's own notifications
+        self._listen_url = listen_url
+        self._handlers = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._listening = False
+        self._published = 0
+        self._received = 0
+        self._resets = 0
+        self._last_error = None
+
+    @property
+    def uses_postgres(self) -> bool:
+        return self._listen_url is not None and make_url(self._listen_url).get_backend_name() == "postgresql"
+
+    def subscribe(self, entity: str, evict: Callable[[Hashable], None], clear: Callable[[], None]):
+        """Call evict(key) for every changed key of entity, clear() when events may have been missed"""
+        self._handlers[entity].append((evict, clear))
+
+    def publish(self, db, entity: str, keys: Iterable[Hashable]):
+        """Queue an invalidation to be sent when db's transaction commits"""
+        keys = list(dict.fromkeys(keys))
+        if keys:
+            session = getattr(db, "sync_session", db)  # AsyncSession wraps a Session
+            session.info.setdefault(PENDING_KEY, []).append((entity, keys))
+
+    def dispatch(self, entity: str, keys):
+        for evict, _ in self._handlers.get(entity, ()):
+            for key in keys:
+                evict(key)
+
+    def reset(self):
+        """Clear every subscribed cache"""
+        self._resets += 1
+        for handlers in self._handlers.values():
+            for _, clear in handlers:
+                clear()
+
+    # Session hooks, registered for every Session below
+    def _before_commit(self, session: Session):
+        pending = session.info.get(PENDING_KEY)
+        if not pending or session.get_bind().dialect.name != "postgresql":
+            return
+        for entity, keys in pending:
+            for start in range(0, len(keys), NOTIFY_KEYS_PER_EVENT):
+                payload = json.dumps({"origin": self.origin, "entity": entity, "keys": keys[start:start + NOTIFY_KEYS_PER_EVENT]})
+                session.execute(select(func.pg_notify(settings.invalidation_channel, payload)))
+
+    def _after_commit(self, session: Session):
+        for entity, keys in session.info.pop(PENDING_KEY, ()):
+            self._published += 1
+            self.dispatch(entity, keys)
+
+    def _after_rollback(self, session: Session):
+        session.info.pop(PENDING_KEY, None)
+
+    # LISTEN task
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") == self.origin:
+            return
+        self._received += 1
+        self.dispatch(message.get("entity"), message.get("keys") or ())
+
+    async def _listen(self):
+        import asyncpg
+
+        dsn = make_url(self._listen_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(settings.invalidation_channel, self._on_notification)
+                self._listening = True
+                # Whatever happened while we were not listening is unknown
+                self.reset()
+                while not self._stopping.is_set():
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=settings.invalidation_check_seconds)
+                    except asyncio.TimeoutError:
+                        # Notices a dead connection, which asyncpg would not report while idle
+                        await connection.fetchval("SELECT 1")
+            except Exception as e:
+                self._last_error = f"{type(e).__name__}: {e}"
+            finally:
+                self._listening = False
+                if connection is not None:
+                    try:
+                        await asyncio.wait_for(connection.close(), timeout=5)
+                    except Exception:
+                        connection.terminate()
+            if not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.invalidation_check_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self.uses_postgres and (self._task is None or self._task.done()):
+            self._stopping = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "transport": "postgres" if self.uses_postgres else "local",
+            "listening": self._listening,
+            "published": self._published,
+            "received": self._received,
+            "resets": self._resets,
+            "last_error": self._last_error,
+        }
+
+
+invalidation_bus = InvalidationBus()
+
+event.listen(Session, "before_commit", invalidation_bus._before_commit)
+event.listen(Session, "after_commit", invalidation_bus._after_commit)
+event.listen(Session, "after_rollback", invalidation_bus._after_rollback)
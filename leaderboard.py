@@ -0,0 +1,348 @@
+"""
+In-memory per-category quiz leaderboards.
+
+Scores are percentages with two decimals, so each category keeps a Fenwick
+tree over the 10001 possible scores in hundredths of a percent. Recording an
+attempt and counting the attempts that beat a score are both O(log 10001)
+however many attempts there are, and memory does not grow with them. The
+best LEADERBOARD_SIZE attempts are kept alongside in a sorted list.
+
+Boards are derived from the quiz_attempts table up to a watermark that trails
+the clock by LEADERBOARD_SETTLE_SECONDS. A background task advances the
+watermark by replaying attempts; attempts submitted to this process are
+overlaid until the replay picks them up. A row can land after the watermark
+passed its submitted_at (a retried or slow batch, another worker's buffer),
+so each replay re-reads the last LEADERBOARD_LOOKBACK_SECONDS before the
+watermark and skips the attempt IDs it already applied. Boards are
+checkpointed to leaderboard_snapshots together with those IDs, so startup
+loads the last snapshot and only replays the attempts after it.
+"""
+
+import asyncio
+import heapq
+import json
+import sys
+from array import array
+from bisect import insort
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from config import settings
+from database import AsyncSessionLocal
+from models import LeaderboardSnapshot, QuizAttempt
+
+SCORE_BUCKETS = 10001  # 0.00% to 100.00%
+
+
+def score_bucket(score_percentage: float) -> int:
+    return min(max(int(round(score_percentage * 100)), 0), SCORE_BUCKETS - 1)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps; they are stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class ScoreBoard:
+    """Fenwick tree of attempt counts per score bucket plus the best entries.
+
+    Entries are (-bucket, submitted_at timestamp, attempt_id) tuples, so the
+    best attempt sorts first and ties go to the earlier submission.
+    """
+
+    __slots__ = ("tree", "total", "top", "size")
+
+    def __init__(self, size: int, tree: Optional[list] = None, total: int = 0, top: Optional[list] = None):
+        self.tree = tree if tree is not None else [0] * (SCORE_BUCKETS + 1)
+        self.total = total
+        self.top = top if top is not None else []
+        self.size = size
+
+    def add(self, bucket: int, submitted_at: float, attempt_id: str, delta: int = 1):
+        position = bucket + 1
+        while position <= SCORE_BUCKETS:
+            self.tree[position] += delta
+            position += position & -position
+        self.total += delta
+
+        if delta > 0 and self.size:
+            entry = (-bucket, submitted_at, attempt_id)
+            if len(self.top) < self.size or entry < self.top[-1]:
+                insort(self.top, entry)
+                del self.top[self.size:]
+
+    def count_above(self, bucket: int) -> int:
+        """Number of attempts scoring strictly higher than bucket"""
+        at_most = 0
+        position = bucket + 1
+        while position > 0:
+            at_most += self.tree[position]
+            position -= position & -position
+        return self.total - at_most
+
+    def to_bytes(self) -> bytes:
+        tree = array("q", self.tree)
+        if sys.byteorder == "big":
+            tree.byteswap()
+        return tree.tobytes()
+
+    @classmethod
+    def from_snapshot(cls, size: int, snapshot: LeaderboardSnapshot) -> "ScoreBoard":
+        tree = array("q")
+        tree.frombytes(snapshot.score_tree)
+        if sys.byteorder == "big":
+            tree.byteswap()
+        top = sorted(tuple(entry) for entry in json.loads(snapshot.top_entries))
+        return cls(size, tree.tolist(), snapshot.total_attempts, top[:size])
+
+
+class CategoryLeaderboard:
+    def __init__(
+        self,
+        size: int,
+        base: Optional[ScoreBoard] = None,
+        watermark: Optional[datetime] = None,
+        floor: Optional[float] = None,
+        recent: Optional[dict] = None,
+    ):
+        self.base = base or ScoreBoard(size)
+        self.watermark = watermark
+        # Attempts submitted up to the floor timestamp are final; the IDs of
+        # applied attempts after it are kept to skip them on the next replay
+        self.floor = floor
+        self.recent = recent if recent is not None else {}
+        # Attempts submitted here, until the replay reaches them
+        self.pending = {}
+        self.pending_counts = ScoreBoard(0)
+
+    @classmethod
+    def from_snapshot(cls, size: int, snapshot: LeaderboardSnapshot) -> "CategoryLeaderboard":
+        watermark = _as_utc(snapshot.watermark)
+        if snapshot.recent_attempts is None:
+            # Written before applied IDs were saved: nothing before the watermark is replayed
+            floor, recent = watermark.timestamp(), {}
+        else:
+            state = json.loads(snapshot.recent_attempts)
+            floor, recent = state["floor"], state["attempts"]
+        return cls(size, ScoreBoard.from_snapshot(size, snapshot), watermark, floor, recent)
+
+    @property
+    def total(self) -> int:
+        return self.base.total + self.pending_counts.total
+
+    def rank(self, bucket: int) -> int:
+        """Competition rank of a score: one more than the attempts that beat it"""
+        return 1 + self.base.count_above(bucket) + self.pending_counts.count_above(bucket)
+
+    def add_pending(self, attempt_id: str, bucket: int, submitted_at: datetime):
+        if attempt_id in self.recent:
+            return
+        timestamp = submitted_at.timestamp()
+        self.pending[attempt_id] = (bucket, timestamp)
+        self.pending_counts.add(bucket, timestamp, attempt_id)
+
+    def replay(self, attempt_id: str, bucket: int, timestamp: float, next_floor: float):
+        """Add a stored attempt unless an earlier replay already did"""
+        if attempt_id in self.recent or (self.floor is not None and timestamp <= self.floor):
+            return
+        self.base.add(bucket, timestamp, attempt_id)
+        # Nothing at or below the floor settle() moves to is read again
+        if timestamp > next_floor:
+            self.recent[attempt_id] = timestamp
+
+    def settle(self, watermark: datetime, lookback: float):
+        """Advance the watermark and floor, dropping pending attempts the replay covered"""
+        self.watermark = watermark
+        floor = watermark.timestamp() - lookback
+        if self.floor is None or floor > self.floor:
+            self.floor = floor
+            self.recent = {attempt_id: timestamp for attempt_id, timestamp in self.recent.items() if timestamp > floor}
+        for attempt_id, (bucket, timestamp) in list(self.pending.items()):
+            # Attempts whose row never showed up within the lookback are given up
+            if attempt_id in self.recent or timestamp <= self.floor:
+                del self.pending[attempt_id]
+                self.pending_counts.add(bucket, timestamp, attempt_id, -1)
+
+    def top(self, limit: int) -> list:
+        pending = [(-bucket, timestamp, attempt_id) for attempt_id, (bucket, timestamp) in self.pending.items()]
+        return heapq.nsmallest(limit, self.base.top + pending)
+
+
+class Leaderboards:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._boards = {}
+        self._watermark: Optional[datetime] = None
+        self._floor: Optional[float] = None  # lowest floor of any board
+        self._task: Optional[asyncio.Task] = None
+        self._last_checkpoint: Optional[datetime] = None
+        self._last_error = None
+
+    def _board(self, category_id: int) -> CategoryLeaderboard:
+        board = self._boards.get(category_id)
+        if board is None:
+            board = self._boards[category_id] = CategoryLeaderboard(
+                settings.leaderboard_size, watermark=self._watermark, floor=self._floor
+            )
+        return board
+
+    def record(self, category_id: int, attempt_id: str, score_percentage: float, submitted_at: datetime) -> int:
+        """Add an attempt submitted to this process and return its current rank"""
+        bucket = score_bucket(score_percentage)
+        board = self._board(category_id)
+        board.add_pending(attempt_id, bucket, submitted_at)
+        return board.rank(bucket)
+
+    def rank(self, category_id: int, score_percentage: float) -> tuple:
+        """(rank, total attempts) of a score in a category"""
+        board = self._boards.get(category_id)
+        if board is None:
+            return 1, 0
+        return board.rank(score_bucket(score_percentage)), board.total
+
+    def pending_score(self, category_id: int, attempt_id: str) -> Optional[float]:
+        board = self._boards.get(category_id)
+        if board is None or attempt_id not in board.pending:
+            return None
+        return board.pending[attempt_id][0] / 100
+
+    def top(self, category_id: int, limit: int) -> tuple:
+        """(entries, total attempts) for a category's best attempts"""
+        board = self._boards.get(category_id)
+        if board is None:
+            return [], 0
+        entries = [
+            {
+                "rank": board.rank(-negative_bucket),
+                "attempt_id": attempt_id,
+                "score_percentage": -negative_bucket / 100,
+                "submitted_at": datetime.fromtimestamp(timestamp, timezone.utc),
+            }
+            for negative_bucket, timestamp, attempt_id in board.top(limit)
+        ]
+        return entries, board.total
+
+    async def load(self):
+        """Restore the boards from their snapshots and replay newer attempts"""
+        async with self._session_factory() as db:
+            snapshots = (await db.scalars(select(LeaderboardSnapshot))).all()
+        for snapshot in snapshots:
+            self._boards[snapshot.category_id] = CategoryLeaderboard.from_snapshot(settings.leaderboard_size, snapshot)
+        if snapshots:
+            self._watermark = min(board.watermark for board in self._boards.values())
+            self._floor = min(board.floor for board in self._boards.values())
+        await self.refresh(serving=False)
+        await self.checkpoint()
+
+    async def refresh(self, serving: bool = True):
+        """Replay attempts submitted after the floor into the boards.
+        
+        While the boards are served, the rows are read first and applied
+        without awaiting, so readers never see a half-replayed board. The
+        startup replay, which may cover the whole table, applies them as
+        they stream in instead.
+        """
+        watermark = datetime.now(timezone.utc) - timedelta(seconds=settings.leaderboard_settle_seconds)
+        lookback = settings.leaderboard_lookback_seconds
+        next_floor = watermark.timestamp() - lookback
+        query = select(
+            QuizAttempt.id, QuizAttempt.category_id, QuizAttempt.score_percentage, QuizAttempt.submitted_at
+        ).where(QuizAttempt.submitted_at <= watermark)
+        if self._floor is not None:
+            query = query.where(QuizAttempt.submitted_at > datetime.fromtimestamp(self._floor, timezone.utc))
+
+        rows = []
+        async with self._session_factory() as db:
+            result = await db.stream(query.execution_options(yield_per=10000))
+            if serving:
+                rows = [row async for row in result]
+            else:
+                async for partition in result.partitions():
+                    self._replay(partition, next_floor)
+        self._replay(rows, next_floor)
+        for board in self._boards.values():
+            board.settle(watermark, lookback)
+        self._watermark = watermark
+        self._floor = min(
+            (board.floor for board in self._boards.values()), default=next_floor
+        )
+
+    def _replay(self, rows, next_floor: float):
+        for attempt_id, category_id, score_percentage, submitted_at in rows:
+            self._board(category_id).replay(
+                attempt_id, score_bucket(score_percentage), _as_utc(submitted_at).timestamp(), next_floor
+            )
+
+    async def checkpoint(self):
+        """Save every board as of its watermark"""
+        snapshots = [
+            LeaderboardSnapshot(
+                category_id=category_id,
+                score_tree=board.base.to_bytes(),
+                top_entries=json.dumps(board.base.top),
+                total_attempts=board.base.total,
+                watermark=board.watermark,
+                recent_attempts=json.dumps({"floor": board.floor, "attempts": board.recent}),
+            )
+            for category_id, board in self._boards.items()
+            if board.watermark is not None
+        ]
+        async with self._session_factory() as db:
+            for snapshot in snapshots:
+                await db.merge(snapshot)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker inserted the same snapshot rows first
+                await db.rollback()
+        self._last_checkpoint = datetime.now(timezone.utc)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.leaderboard_refresh_seconds)
+            try:
+                await self.refresh()
+                due = self._last_checkpoint + timedelta(seconds=settings.leaderboard_checkpoint_seconds)
+                if datetime.now(timezone.utc) >= due:
+                    await self.checkpoint()
+            except Exception as exc:
+                # Keep serving the current boards; the next cycle retries
+                self._last_error = f"{type(exc).__name__}: {exc}"
+
+    def start(self):
+        if self._task is None or self._task.done():
+            if self._last_checkpoint is None:
+                self._last_checkpoint = datetime.now(timezone.utc)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop refreshing and write a final checkpoint"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.refresh()
+            await self.checkpoint()
+        except Exception as exc:
+            # Startup replays from the previous snapshot instead
+            self._last_error = f"{type(exc).__name__}: {exc}"
+
+    def stats(self) -> dict:
+        return {
+            "categories": len(self._boards),
+            "attempts": sum(board.total for board in self._boards.values()),
+            "pending": sum(len(board.pending) for board in self._boards.values()),
+            "recent": sum(len(board.recent) for board in self._boards.values()),
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            "last_checkpoint": self._last_checkpoint.isoformat() if self._last_checkpoint else None,
+            "last_error": self._last_error,
+        }
+
+
+leaderboards = Leaderboards()
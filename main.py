@@ -1,8 +1,17 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from database import engine
+from database import engine, async_engine, replica_async_engine, pool_stats
+from attempt_writer import attempt_writer
+from auth import password_hasher, principal_cache
+from leaderboard import leaderboards
+from question_stats import question_stats
 from models import Base
+from quiz_payloads import payload_cache
+from invalidation import invalidation_bus
+from cache import cache_stats
+from replica import replica_router
 from routers import admin, quiz, auth, admin_web
 
 # Create database tables
@@ -11,10 +20,32 @@ Base.metadata.create_all(bind=engine)
 # Define OAuth2 scheme for Swagger UI
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    attempt_writer.start()
+    await leaderboards.load()
+    leaderboards.start()
+    question_stats.start()
+    replica_router.start()
+    invalidation_bus.start()
+    yield
+    await invalidation_bus.stop()
+    await attempt_writer.stop()
+    await leaderboards.stop()
+    await question_stats.stop()
+    await replica_router.stop()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    if replica_async_engine is not None:
+        await replica_async_engine.dispose()
+
+
 app = FastAPI(
     title="Quiz Application API",
     description="A comprehensive quiz application with admin dashboard and public quiz functionality",
     version="1.0.0",
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "authentication",
@@ -42,6 +73,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate"],
 )
 
 # Include routers
@@ -64,3 +96,19 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "password_hashing": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "quiz_payload_cache": payload_cache.stats(),
+        "attempt_writer": attempt_writer.stats(),
+        "leaderboards": leaderboards.stats(),
+        "question_stats": question_stats.stats(),
+        "read_replica": replica_router.stats(),
+        "cache_invalidation": invalidation_bus.stats(),
+        "caches": cache_stats(),
+        "database_pools": pool_stats()
+    }
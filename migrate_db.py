@@ -6,6 +6,7 @@ Database migration script to add new fields for enhanced admin registration
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from config import settings
+from models import QUESTION_SEARCH_VECTOR
 import re
 
 def get_connection():
@@ -99,6 +100,120 @@ def migrate_database():
         else:
             print("⏭️  admin_invitations table already exists")
         
+        # Denormalized question counter on categories
+        cursor.execute("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = 'categories' 
+            AND column_name = 'question_count'
+        """)
+        
+        if cursor.fetchone() is None:
+            print("🔢 Adding question_count to categories...")
+            cursor.execute("ALTER TABLE categories ADD COLUMN question_count INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("""
+                UPDATE categories 
+                SET question_count = (
+                    SELECT COUNT(*) FROM questions WHERE questions.category_id = categories.id
+                )
+            """)
+            print("✅ Added and backfilled column: question_count")
+        else:
+            print("⏭️  Column question_count already exists")
+        
+        # Content version used for quiz ETags
+        cursor.execute("ALTER TABLE categories ADD COLUMN IF NOT EXISTS content_version INTEGER NOT NULL DEFAULT 1")
+        print("✅ Ensured column: content_version")
+        
+        # Rasch difficulty estimates used by the adaptive quiz
+        cursor.execute("ALTER TABLE questions ADD COLUMN IF NOT EXISTS difficulty DOUBLE PRECISION NOT NULL DEFAULT 0")
+        print("✅ Ensured column: difficulty")
+        
+        # Composite index backing keyset pagination over questions
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_questions_category_id_id ON questions (category_id, id)")
+        print("✅ Ensured index: ix_questions_category_id_id")
+        
+        # Full-text search vector behind /admin/questions/search
+        cursor.execute(f"""
+            ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector 
+            GENERATED ALWAYS AS ({QUESTION_SEARCH_VECTOR}) STORED
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)")
+        print("✅ Ensured column and GIN index: search_vector")
+        
+        # Quiz attempt history written by the attempt buffer
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_attempts (
+                id VARCHAR(36) PRIMARY KEY,
+                category_id INTEGER NOT NULL,
+                total_questions INTEGER NOT NULL,
+                correct_answers INTEGER NOT NULL,
+                score_percentage DOUBLE PRECISION NOT NULL,
+                submitted_at TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_quiz_attempts_category_id_submitted_at 
+            ON quiz_attempts (category_id, submitted_at)
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attempt_answers (
+                id SERIAL PRIMARY KEY,
+                attempt_id VARCHAR(36) NOT NULL REFERENCES quiz_attempts(id),
+                question_id INTEGER NOT NULL,
+                selected_answer VARCHAR(1) NOT NULL,
+                is_correct BOOLEAN NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_attempt_answers_attempt_id ON attempt_answers (attempt_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_attempt_answers_question_id ON attempt_answers (question_id)")
+        print("✅ Ensured tables: quiz_attempts, attempt_answers")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+                category_id INTEGER PRIMARY KEY,
+                score_tree BYTEA NOT NULL,
+                top_entries TEXT NOT NULL,
+                total_attempts INTEGER NOT NULL,
+                watermark TIMESTAMP WITH TIME ZONE NOT NULL,
+                recent_attempts TEXT,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("ALTER TABLE leaderboard_snapshots ADD COLUMN IF NOT EXISTS recent_attempts TEXT")
+        print("✅ Ensured table: leaderboard_snapshots")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS question_stats (
+                question_id INTEGER PRIMARY KEY,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                picked_a INTEGER NOT NULL DEFAULT 0,
+                picked_b INTEGER NOT NULL DEFAULT 0,
+                picked_c INTEGER NOT NULL DEFAULT 0,
+                picked_d INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        print("✅ Ensured table: question_stats")
+        
+        # MinHash signatures and LSH buckets for near-duplicate detection
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS question_signatures (
+                question_id INTEGER PRIMARY KEY,
+                signature BYTEA NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS question_lsh_buckets (
+                bucket BIGINT NOT NULL,
+                question_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, question_id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_question_lsh_buckets_question_id ON question_lsh_buckets (question_id)")
+        print("✅ Ensured tables: question_signatures, question_lsh_buckets (run index_near_duplicates.py to fill them)")
+        
         # Update existing admin user to have proper role
         cursor.execute("""
             UPDATE admin_users 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Float, Index, LargeBinary, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -10,6 +10,8 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
+    question_count = Column(Integer, nullable=False, default=0, server_default="0")  # maintained by admin question writes
+    content_version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every content change
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -27,11 +29,39 @@ class Question(Base):
     option_d = Column(String(500), nullable=False)
     correct_answer = Column(String(1), nullable=False)  # 'A', 'B', 'C', or 'D'
     explanation = Column(Text, nullable=True)
+    difficulty = Column(Float, nullable=False, default=0.0, server_default="0")  # Rasch logits, set by recalibrate_difficulty.py
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     category = relationship("Category", back_populates="questions")
+    
+    __table_args__ = (
+        # Keyset pagination and per-category scans walk (category_id, id)
+        Index("ix_questions_category_id_id", "category_id", "id"),
+    )
+
+
+# Postgres keeps a weighted full-text vector of every question, generated from
+# its text, options and explanation, for /admin/questions/search
+QUESTION_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', question_text), 'A') || "
+    "setweight(to_tsvector('english', option_a || ' ' || option_b || ' ' || option_c || ' ' || option_d), 'B') || "
+    "setweight(to_tsvector('english', coalesce(explanation, '')), 'C')"
+)
+event.listen(
+    Question.__table__,
+    "after_create",
+    DDL(
+        f"ALTER TABLE questions ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({QUESTION_SEARCH_VECTOR}) STORED"
+    ).execute_if(dialect="postgresql")
+)
+event.listen(
+    Question.__table__,
+    "after_create",
+    DDL("CREATE INDEX ix_questions_search_vector ON questions USING GIN (search_vector)").execute_if(dialect="postgresql")
+)
 
 
 class AdminUser(Base):
@@ -66,4 +96,79 @@ class AdminInvitation(Base):
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    inviter = relationship("AdminUser", foreign_keys=[invited_by]) 
\ No newline at end of file
+    inviter = relationship("AdminUser", foreign_keys=[invited_by])
+
+
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+    
+    # Generated at submit time so the ID can be returned before the row is written
+    id = Column(String(36), primary_key=True)
+    # No foreign keys: attempt history outlives deleted categories and questions
+    category_id = Column(Integer, nullable=False)
+    total_questions = Column(Integer, nullable=False)
+    correct_answers = Column(Integer, nullable=False)
+    score_percentage = Column(Float, nullable=False)
+    submitted_at = Column(DateTime(timezone=True), nullable=False)
+    
+    answers = relationship("AttemptAnswer", back_populates="attempt")
+    
+    __table_args__ = (
+        Index("ix_quiz_attempts_category_id_submitted_at", "category_id", "submitted_at"),
+    )
+
+
+class AttemptAnswer(Base):
+    __tablename__ = "attempt_answers"
+    
+    id = Column(Integer, primary_key=True)
+    attempt_id = Column(String(36), ForeignKey("quiz_attempts.id"), nullable=False, index=True)
+    question_id = Column(Integer, nullable=False, index=True)
+    selected_answer = Column(String(1), nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+    
+    attempt = relationship("QuizAttempt", back_populates="answers")
+
+
+class LeaderboardSnapshot(Base):
+    __tablename__ = "leaderboard_snapshots"
+    
+    category_id = Column(Integer, primary_key=True, autoincrement=False)
+    score_tree = Column(LargeBinary, nullable=False)  # Fenwick tree of counts per score, int64 little-endian
+    top_entries = Column(Text, nullable=False)  # JSON list of [-score bucket, submitted_at timestamp, attempt_id]
+    total_attempts = Column(Integer, nullable=False)
+    watermark = Column(DateTime(timezone=True), nullable=False)  # covers attempts submitted up to here
+    recent_attempts = Column(Text)  # JSON {"floor": timestamp, "attempts": {attempt_id: timestamp}} replayed after the floor
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuestionStat(Base):
+    __tablename__ = "question_stats"
+    
+    # No foreign key, like quiz attempts; the admin question endpoints delete
+    # the row when its question is deleted or its content changes
+    question_id = Column(Integer, primary_key=True, autoincrement=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    picked_a = Column(Integer, nullable=False, default=0)
+    picked_b = Column(Integer, nullable=False, default=0)
+    picked_c = Column(Integer, nullable=False, default=0)
+    picked_d = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuestionSignature(Base):
+    __tablename__ = "question_signatures"
+    
+    # MinHash signature for near-duplicate detection (see near_duplicates.py);
+    # written and deleted by the admin question endpoints
+    question_id = Column(Integer, primary_key=True, autoincrement=False)
+    signature = Column(LargeBinary, nullable=False)  # uint32 little-endian per hash function
+
+
+class QuestionLshBucket(Base):
+    __tablename__ = "question_lsh_buckets"
+    
+    # One row per LSH band of each signature; questions sharing a bucket are candidates
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    question_id = Column(Integer, primary_key=True, autoincrement=False, index=True)
@@ -0,0 +1,215 @@
+"""
+Near-duplicate question detection with MinHash and locality-sensitive hashing.
+
+A question is reduced to the set of 5-byte shingles of its normalized text
+and options (options sorted, so reordering them changes nothing). Its MinHash
+signature holds MINHASH_PERMUTATIONS minimums of random hash functions over
+that set; the fraction of equal positions in two signatures estimates the
+Jaccard similarity of the questions. Signatures are cut into LSH_BANDS bands
+and each band is hashed to a bucket, so questions sharing any bucket become
+candidates; with 20 bands of 5 rows, pairs above 0.7 similarity are found
+about 97% of the time while pairs below 0.3 rarely collide.
+
+Signatures and buckets are stored in question_signatures and
+question_lsh_buckets and written in the same transaction as the question,
+so a check is a few indexed bucket lookups whatever the size of the bank.
+The hash functions come from a fixed seed; changing MINHASH_SEED or the
+band layout requires rebuilding the stored signatures.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from models import Question, QuestionLshBucket, QuestionSignature
+
+SHINGLE_SIZE = 5
+LSH_BANDS = 20
+LSH_ROWS = 5
+MINHASH_PERMUTATIONS = LSH_BANDS * LSH_ROWS
+MINHASH_SEED = 1
+MAX_NEAR_DUPLICATES = 5
+BUCKET_LOOKUP_CHUNK = 500
+SIGNATURE_CHUNK = 256  # questions hashed per NumPy pass, bounds the working array
+
+_FOLD = np.uint64(0x9E3779B97F4A7C15)
+_MIX = np.uint64(0xFF51AFD7ED558CCD)
+_SHIFT = np.uint64(32)
+# Multiply-shift hash functions: the top 32 bits of (a * x + b) mod 2**64 with
+# odd a, which NumPy computes with wrapping uint64 arithmetic and no division
+_random = np.random.RandomState(MINHASH_SEED)
+_A = _random.randint(0, 1 << 63, size=(MINHASH_PERMUTATIONS, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _random.randint(0, 1 << 63, size=(MINHASH_PERMUTATIONS, 1), dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join(_WORD.findall(text.lower())) if text else ""
+
+
+def _question_text(question) -> str:
+    if isinstance(question, dict):
+        text, options = question["question_text"], [question[f"option_{letter}"] for letter in "abcd"]
+    else:
+        text, options = question.question_text, [question.option_a, question.option_b, question.option_c, question.option_d]
+    return " | ".join([_normalize(text)] + sorted(_normalize(option) for option in options))
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hash of every SHINGLE_SIZE-byte window of the UTF-8 text.
+
+    Repeated shingles are harmless: a minimum over a multiset is the same as
+    over the set.
+    """
+    data = np.frombuffer(text.encode(), dtype=np.uint8).astype(np.uint64)
+    if len(data) < SHINGLE_SIZE:
+        data = np.concatenate([data, np.zeros(SHINGLE_SIZE - len(data), dtype=np.uint64)])
+    count = len(data) - SHINGLE_SIZE + 1
+    windows = data[:count].copy()
+    for offset in range(1, SHINGLE_SIZE):
+        windows |= data[offset:offset + count] << np.uint64(8 * offset)
+    # Multiplicative hashing folds the 40-bit windows into their top 32 bits
+    return (windows * _FOLD) >> _SHIFT
+
+
+def question_signatures(questions: Sequence) -> np.ndarray:
+    """MinHash signatures (one uint32 row each) of Question rows or dicts of question values"""
+    signatures = np.empty((len(questions), MINHASH_PERMUTATIONS), dtype="<u4")
+    for start in range(0, len(questions), SIGNATURE_CHUNK):
+        hashes = [_shingle_hashes(_question_text(question)) for question in questions[start:start + SIGNATURE_CHUNK]]
+        offsets = np.cumsum([0] + [len(h) for h in hashes[:-1]])
+        values = (_A * np.concatenate(hashes) + _B) >> _SHIFT
+        signatures[start:start + len(hashes)] = np.minimum.reduceat(values, offsets, axis=1).T
+    return signatures
+
+
+def band_buckets(signatures: np.ndarray) -> np.ndarray:
+    """Signed 64-bit bucket key of every band of every signature, shape
+    (signatures, LSH_BANDS); the band number is part of the key"""
+    signatures = np.atleast_2d(signatures).astype(np.uint64)
+    keys = np.empty((len(signatures), LSH_BANDS), dtype=np.uint64)
+    for band in range(LSH_BANDS):
+        key = np.full(len(signatures), band + 1, dtype=np.uint64) * _FOLD
+        for column in range(band * LSH_ROWS, (band + 1) * LSH_ROWS):
+            key = (key ^ signatures[:, column]) * _MIX
+        keys[:, band] = key ^ (key >> np.uint64(29))
+    return keys.view(np.int64)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(first == second)) / MINHASH_PERMUTATIONS
+
+
+def _load_signature(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4")
+
+
+def find_near_duplicates(
+    db: Session,
+    signatures: np.ndarray,
+    threshold: float,
+    exclude: Sequence[Optional[int]] = (),
+) -> List[List[Tuple[int, float]]]:
+    """For each signature, the stored questions at or above threshold as
+    (question_id, similarity) pairs, most similar first. exclude[i] is a
+    question ID to leave out for signature i (the question itself)."""
+    rows_by_bucket = defaultdict(list)
+    for row, buckets in enumerate(band_buckets(signatures).tolist()):
+        for bucket in buckets:
+            rows_by_bucket[bucket].append(row)
+
+    candidates = defaultdict(set)
+    buckets = list(rows_by_bucket)
+    for start in range(0, len(buckets), BUCKET_LOOKUP_CHUNK):
+        chunk = buckets[start:start + BUCKET_LOOKUP_CHUNK]
+        for bucket, question_id in db.execute(
+            select(QuestionLshBucket.bucket, QuestionLshBucket.question_id).where(QuestionLshBucket.bucket.in_(chunk))
+        ):
+            for row in rows_by_bucket[bucket]:
+                candidates[row].add(question_id)
+    for row, question_id in enumerate(exclude):
+        if question_id is not None:
+            candidates[row].discard(question_id)
+
+    stored = {}
+    candidate_ids = list(set().union(*candidates.values())) if candidates else []
+    for start in range(0, len(candidate_ids), BUCKET_LOOKUP_CHUNK):
+        # The join skips signatures left behind by questions deleted out of band
+        stored.update(db.execute(
+            select(QuestionSignature.question_id, QuestionSignature.signature)
+            .join(Question, Question.id == QuestionSignature.question_id)
+            .where(QuestionSignature.question_id.in_(candidate_ids[start:start + BUCKET_LOOKUP_CHUNK]))
+        ).all())
+
+    results = []
+    for row, signature in enumerate(signatures):
+        matches = []
+        for question_id in candidates.get(row, ()):
+            if question_id in stored:
+                score = similarity(signature, _load_signature(stored[question_id]))
+                if score >= threshold:
+                    matches.append((question_id, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        results.append(matches[:MAX_NEAR_DUPLICATES])
+    return results
+
+
+def find_within(signatures: np.ndarray, threshold: float) -> Dict[int, List[Tuple[int, float]]]:
+    """Near duplicates among the signatures themselves: {row: [(earlier row, similarity)]}"""
+    rows_by_bucket = defaultdict(list)
+    matches = defaultdict(dict)
+    for row, buckets in enumerate(band_buckets(signatures).tolist()):
+        for bucket in buckets:
+            for earlier in rows_by_bucket[bucket]:
+                if earlier not in matches[row]:
+                    score = similarity(signatures[row], signatures[earlier])
+                    if score >= threshold:
+                        matches[row][earlier] = score
+            rows_by_bucket[bucket].append(row)
+    return {row: sorted(found.items(), key=lambda match: (-match[1], match[0])) for row, found in matches.items() if found}
+
+
+def index_questions(db: Session, question_ids: Sequence[int], signatures: np.ndarray):
+    """Store the signatures of questions in the caller's transaction"""
+    if not len(question_ids):
+        return
+    signature_rows, bucket_rows = [], []
+    for question_id, signature, buckets in zip(question_ids, signatures, band_buckets(signatures).tolist()):
+        signature_rows.append({"question_id": question_id, "signature": signature.tobytes()})
+        bucket_rows.extend({"bucket": bucket, "question_id": question_id} for bucket in set(buckets))
+    # Core inserts: these rows never need ORM identities
+    db.execute(insert(QuestionSignature.__table__), signature_rows)
+    db.execute(insert(QuestionLshBucket.__table__), bucket_rows)
+
+
+def remove_questions(db: Session, question_ids: Sequence[int]):
+    """Drop stored signatures in the caller's transaction"""
+    db.execute(delete(QuestionLshBucket).where(QuestionLshBucket.question_id.in_(question_ids)))
+    db.execute(delete(QuestionSignature).where(QuestionSignature.question_id.in_(question_ids)))
+
+
+def index_missing(db: Session, batch_size: int = 5000) -> int:
+    """Sign every question without a stored signature; return how many were signed"""
+    indexed = 0
+    last_id = 0
+    while True:
+        questions = db.execute(
+            select(
+                Question.id, Question.question_text,
+                Question.option_a, Question.option_b, Question.option_c, Question.option_d
+            )
+            .outerjoin(QuestionSignature, QuestionSignature.question_id == Question.id)
+            .where(QuestionSignature.question_id.is_(None), Question.id > last_id)
+            .order_by(Question.id)
+            .limit(batch_size)
+        ).all()
+        if not questions:
+            return indexed
+        index_questions(db, [question.id for question in questions], question_signatures(questions))
+        db.commit()
+        indexed += len(questions)
+        last_id = questions[-1].id
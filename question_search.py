@@ -0,0 +1,223 @@
+"""
+Full-text search over the question bank for the admin API.
+
+On Postgres every question has a generated, weighted tsvector column with a
+GIN index (see models.py): question text weighs most, then the options, then
+the explanation. Queries match every term as a prefix and are ranked with
+ts_rank_cd. Other databases, such as the SQLite files used for tests and
+benchmarks, get the same semantics from an in-process inverted index. It is
+built once, then every CATEGORY invalidation marks that category dirty and
+the next search reloads only the dirty categories' questions. A bus reset
+rebuilds it from scratch.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.orm import Session
+from invalidation import CATEGORY, invalidation_bus
+from models import Question
+
+# Same relative weights as Postgres' default ts_rank weights for A, B and C
+TEXT_WEIGHT = 1.0
+OPTION_WEIGHT = 0.4
+EXPLANATION_WEIGHT = 0.2
+
+_TOKEN = re.compile(r"\w+")
+ID_CHUNK_SIZE = 500  # dirty categories reloaded per query
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _postgres_search(db: Session, terms, category_id, skip, limit) -> List[Tuple[int, float]]:
+    vector = literal_column("questions.search_vector")
+    tsquery = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+    rank = func.ts_rank_cd(vector, tsquery)
+    query = select(Question.id, rank.label("rank")).where(vector.op("@@")(tsquery))
+    if category_id is not None:
+        query = query.where(Question.category_id == category_id)
+    return db.execute(query.order_by(rank.desc(), Question.id).offset(skip).limit(limit)).all()
+
+
+class InvertedIndex:
+    """Token -> {question_id: weight} postings with a sorted vocabulary for prefix lookups"""
+
+    def __init__(self, rows=()):
+        self._postings = {}
+        self._vocabulary = []
+        self._categories = {}
+        self._tokens = {}  # question_id -> its tokens, to unindex it again
+        self._members = {}  # category_id -> question ids
+        self.add(rows)
+
+    def add(self, rows):
+        """Index rows, replacing any question that is already indexed"""
+        added, emptied = set(), []
+        for question_id, category_id, question_text, option_a, option_b, option_c, option_d, explanation in rows:
+            if question_id in self._categories:
+                self._remove_question(question_id, emptied)
+            weights = {}
+            for weight, text in (
+                (TEXT_WEIGHT, question_text),
+                (OPTION_WEIGHT, f"{option_a} {option_b} {option_c} {option_d}"),
+                (EXPLANATION_WEIGHT, explanation),
+            ):
+                for token in tokenize(text):
+                    weights[token] = weights.get(token, 0.0) + weight
+            for token, weight in weights.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    added.add(token)
+                posting[question_id] = weight
+            self._categories[question_id] = category_id
+            self._members.setdefault(category_id, set()).add(question_id)
+            self._tokens[question_id] = list(weights)
+        self._update_vocabulary(added, emptied)
+
+    def remove_categories(self, category_ids):
+        """Unindex every question of the given categories"""
+        emptied = []
+        for category_id in category_ids:
+            for question_id in list(self._members.get(category_id, ())):
+                self._remove_question(question_id, emptied)
+        self._update_vocabulary((), emptied)
+
+    def _remove_question(self, question_id: int, emptied: list):
+        category_id = self._categories.pop(question_id)
+        members = self._members[category_id]
+        members.discard(question_id)
+        if not members:
+            del self._members[category_id]
+        for token in self._tokens.pop(question_id):
+            posting = self._postings[token]
+            del posting[question_id]
+            if not posting:
+                del self._postings[token]
+                emptied.append(token)
+
+    def _update_vocabulary(self, added, emptied):
+        if len(added) + len(emptied) > len(self._vocabulary) // 8:
+            # Cheaper to sort again than to shift the list once per token
+            self._vocabulary = sorted(self._postings)
+            return
+        for token in emptied:
+            position = bisect_left(self._vocabulary, token)
+            if token not in self._postings and self._vocabulary[position:position + 1] == [token]:
+                del self._vocabulary[position]
+        for token in added:
+            position = bisect_left(self._vocabulary, token)
+            if token in self._postings and self._vocabulary[position:position + 1] != [token]:
+                self._vocabulary.insert(position, token)
+
+    def _prefix_matches(self, term: str) -> dict:
+        """{question_id: weight} over every token starting with term (read-only)"""
+        start = end = bisect_left(self._vocabulary, term)
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(term):
+            end += 1
+        if end - start == 1:
+            return self._postings[self._vocabulary[start]]
+        matches = {}
+        for token in self._vocabulary[start:end]:
+            for question_id, weight in self._postings[token].items():
+                matches[question_id] = matches.get(question_id, 0.0) + weight
+        return matches
+
+    def search(self, terms, category_id=None, skip=0, limit=20) -> List[Tuple[int, float]]:
+        # Rarest term first keeps the intersections small
+        matches = sorted((self._prefix_matches(term) for term in terms), key=len)
+        scores = matches[0]
+        for term_matches in matches[1:]:
+            scores = {
+                question_id: score + term_matches[question_id]
+                for question_id, score in scores.items()
+                if question_id in term_matches
+            }
+        if category_id is not None:
+            scores = {
+                question_id: score for question_id, score in scores.items()
+                if self._categories[question_id] == category_id
+            }
+        # Only the requested page needs ordering, not every match
+        ranked = heapq.nsmallest(skip + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[skip:]
+
+
+class QuestionSearch:
+    def __init__(self):
+        self._index: Optional[InvertedIndex] = None
+        self._lock = threading.Lock()
+        # Written by bus handlers, which must not wait for a running refresh
+        self._pending_lock = threading.Lock()
+        self._rebuild = True
+        self._dirty = set()
+
+    def invalidate_category(self, category_id: int):
+        with self._pending_lock:
+            self._dirty.add(category_id)
+
+    def clear(self):
+        with self._pending_lock:
+            self._rebuild = True
+            self._dirty.clear()
+
+    def _rows(self, db: Session, category_ids=None):
+        query = select(
+            Question.id, Question.category_id, Question.question_text,
+            Question.option_a, Question.option_b, Question.option_c, Question.option_d,
+            Question.explanation
+        )
+        if category_ids is None:
+            return db.execute(query).yield_per(10000)
+        return db.execute(query.where(Question.category_id.in_(category_ids))).all()
+
+    def _refresh(self, db: Session):
+        """Bring the index up to date; the caller holds self._lock"""
+        with self._pending_lock:
+            rebuild, dirty = self._rebuild, self._dirty
+            self._rebuild, self._dirty = False, set()
+        try:
+            if rebuild:
+                self._index = InvertedIndex(self._rows(db))
+            elif dirty:
+                # A moved question is in both categories' events, so it leaves
+                # the old one and joins the new one
+                dirty = sorted(dirty)
+                for start in range(0, len(dirty), ID_CHUNK_SIZE):
+                    chunk = dirty[start:start + ID_CHUNK_SIZE]
+                    rows = self._rows(db, chunk)
+                    self._index.remove_categories(chunk)
+                    self._index.add(rows)
+        except BaseException:
+            # A partly refreshed index cannot be trusted
+            self.clear()
+            raise
+
+    def search(
+        self,
+        db: Session,
+        text: str,
+        category_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> List[Tuple[int, float]]:
+        """(question_id, rank) pairs for questions containing every term of
+        text as a prefix, best first"""
+        terms = tokenize(text)
+        if not terms:
+            return []
+        if db.get_bind().dialect.name == "postgresql":
+            return _postgres_search(db, terms, category_id, skip, limit)
+        # Searches run in the threadpool, and a refresh changes the index in place
+        with self._lock:
+            self._refresh(db)
+            return self._index.search(terms, category_id, skip, limit)
+
+
+question_search = QuestionSearch()
+invalidation_bus.subscribe(CATEGORY, question_search.invalidate_category, question_search.clear)
@@ -0,0 +1,160 @@
+"""
+Per-question answer statistics aggregated from quiz submissions.
+
+submit_quiz tallies each graded answer into in-memory counters (attempts,
+correct answers and picks per option). A background task merges them into
+the question_stats table every QUESTION_STATS_FLUSH_SECONDS with one batched
+upsert that adds to the stored counters, so any number of workers can flush
+into the same rows. Counters that fail to flush are kept for the next run.
+
+Resetting a question's statistics publishes a QUESTION_STATS event, and every
+worker then drops the counters it buffered for the question so the next
+flush does not write the old tallies back.
+"""
+
+import asyncio
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from config import settings
+from database import AsyncSessionLocal
+from invalidation import QUESTION_STATS, invalidation_bus
+from models import QuestionStat
+
+OPTION_COLUMNS = {"A": "picked_a", "B": "picked_b", "C": "picked_c", "D": "picked_d"}
+COUNTER_COLUMNS = ("attempts", "correct", "picked_a", "picked_b", "picked_c", "picked_d")
+
+
+class QuestionStatsBuffer:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._counters = {}
+        self._flushing = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._flushes = 0
+        self._flushed_questions = 0
+        self._last_error = None
+
+    def record(self, question_id: int, selected_answer: str, is_correct: bool):
+        counters = self._counters.get(question_id)
+        if counters is None:
+            counters = self._counters[question_id] = dict.fromkeys(COUNTER_COLUMNS, 0)
+        counters["attempts"] += 1
+        if is_correct:
+            counters["correct"] += 1
+        option = OPTION_COLUMNS.get(selected_answer)
+        if option is not None:
+            counters[option] += 1
+
+    def discard(self, question_ids):
+        """Forget buffered counters, e.g. after the stored statistics were reset"""
+        for question_id in question_ids:
+            self._counters.pop(question_id, None)
+            # Also leaves the running flush's rows, unless already sent
+            self._flushing.pop(question_id, None)
+    
+    def _restore(self, counters: dict):
+        # Put back counters that could not be written, adding any new tallies
+        for question_id, values in counters.items():
+            current = self._counters.setdefault(question_id, dict.fromkeys(COUNTER_COLUMNS, 0))
+            for column, value in values.items():
+                current[column] += value
+
+    def _pending_rows(self) -> list:
+        # Read right before each write, so counters discarded by a reset
+        # while the flush was waiting on the database are left out
+        return [{"question_id": question_id, **values} for question_id, values in self._flushing.items()]
+
+    async def flush(self):
+        """Add the buffered counters to question_stats"""
+        if not self._counters:
+            return
+        counters, self._counters = self._counters, {}
+        self._flushing = counters
+        rows = []
+        try:
+            async with self._session_factory() as db:
+                dialect = (await db.connection()).dialect.name
+                if dialect in ("postgresql", "sqlite"):
+                    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                    statement = insert(QuestionStat)
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[QuestionStat.question_id],
+                        set_={
+                            **{
+                                column: getattr(QuestionStat, column) + getattr(statement.excluded, column)
+                                for column in COUNTER_COLUMNS
+                            },
+                            "updated_at": func.now(),
+                        },
+                    )
+                    rows = self._pending_rows()
+                    if rows:
+                        await db.execute(statement, rows)
+                else:
+                    # No portable upsert: update existing rows, insert the rest
+                    existing = set(await db.scalars(
+                        select(QuestionStat.question_id).where(QuestionStat.question_id.in_(counters))
+                    ))
+                    rows = self._pending_rows()
+                    for row in rows:
+                        if row["question_id"] in existing:
+                            await db.execute(
+                                update(QuestionStat)
+                                .where(QuestionStat.question_id == row["question_id"])
+                                .values({
+                                    column: getattr(QuestionStat, column) + row[column]
+                                    for column in COUNTER_COLUMNS
+                                })
+                            )
+                        else:
+                            db.add(QuestionStat(**row))
+                await db.commit()
+        except Exception as exc:
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            self._restore(counters)
+            raise
+        finally:
+            self._flushing = {}
+        self._flushes += 1
+        self._flushed_questions += len(rows)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.question_stats_flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                # Counters were restored; the next run retries
+                continue
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stopping = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Write what is still buffered and stop the flush task"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "buffered_questions": len(self._counters),
+            "flushes": self._flushes,
+            "flushed_questions": self._flushed_questions,
+            "last_error": self._last_error,
+        }
+
+
+question_stats = QuestionStatsBuffer()
+# A missed reset cannot be told apart from fresh answers, so a listener
+# reconnect keeps the buffer rather than dropping every question's tallies
+invalidation_bus.subscribe(QUESTION_STATS, lambda question_id: question_stats.discard([question_id]), lambda: None)
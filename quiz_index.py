@@ -0,0 +1,156 @@
+"""
+In-process per-category question indexes for the public quiz API.
+
+Each category's question IDs are kept in a sorted compact array, with the
+correct answer letters stored alongside as a bytes buffer. Random quizzes are
+drawn from the ID array in O(k) and fetched by primary key instead of sorting
+the whole category with ORDER BY random(), and submissions are graded against
+the answer key without loading any Question rows. Indexes are built lazily on
+first use and dropped by the admin question endpoints after every write.
+Each index records the category content version it was built from, and a
+reader that has seen a newer version rebuilds it, so writes made through
+other processes are picked up as well.
+
+Each key also carries the questions' difficulty estimates, from which a
+difficulty-sorted view is built on first use by the adaptive quiz.
+"""
+
+import random
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from invalidation import CATEGORY, invalidation_bus
+from models import Category, Question
+
+
+class AnswerKey:
+    """Sorted question IDs with their correct letters in a parallel buffer"""
+
+    __slots__ = ("ids", "answers", "version", "difficulties", "_by_difficulty")
+
+    def __init__(self, ids: array, answers: bytes, version: int = 0, difficulties: Optional[array] = None):
+        self.ids = ids
+        self.answers = answers
+        self.version = version
+        self.difficulties = difficulties if difficulties is not None else array("d", bytes(8 * len(ids)))
+        self._by_difficulty = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, question_id: int) -> Optional[str]:
+        """Return the correct letter for a question, or None if it is not in the key"""
+        position = bisect_left(self.ids, question_id)
+        if position < len(self.ids) and self.ids[position] == question_id:
+            return chr(self.answers[position])
+        return None
+
+    def difficulty(self, question_id: int) -> Optional[float]:
+        position = bisect_left(self.ids, question_id)
+        if position < len(self.ids) and self.ids[position] == question_id:
+            return self.difficulties[position]
+        return None
+
+    def by_difficulty(self) -> tuple:
+        """(difficulties ascending, question IDs in the same order)"""
+        if self._by_difficulty is None:
+            # Stable sort, so equal difficulties stay in ID order
+            order = sorted(range(len(self.ids)), key=self.difficulties.__getitem__)
+            self._by_difficulty = (
+                array("d", (self.difficulties[i] for i in order)),
+                array("i", (self.ids[i] for i in order)),
+            )
+        return self._by_difficulty
+
+
+class QuestionIndex:
+    def __init__(self):
+        self._keys = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, category_id: int) -> tuple:
+        return self._epoch, self._generations.get(category_id, 0)
+
+    def _cached(self, category_id: int, min_version: int) -> Optional[AnswerKey]:
+        key = self._keys.get(category_id)
+        if key is not None and key.version >= min_version:
+            return key
+        return None
+
+    def get_answer_key(self, db: Session, category_id: int, min_version: int = 0) -> AnswerKey:
+        """Return the category's answer key, building it if it is missing or
+        older than min_version"""
+        key = self._cached(category_id, min_version)
+        if key is not None:
+            return key
+
+        generation = self._generation(category_id)
+        # Read the version before the rows so the key never claims to be newer
+        # than its contents
+        version = db.scalar(select(Category.content_version).where(Category.id == category_id)) or 0
+        ids = array("i")
+        answers = bytearray()
+        difficulties = array("d")
+        for question_id, correct_answer, difficulty in db.execute(
+            select(Question.id, Question.correct_answer, Question.difficulty)
+            .where(Question.category_id == category_id)
+            .order_by(Question.id)
+        ):
+            ids.append(question_id)
+            answers += correct_answer.encode("ascii")
+            difficulties.append(difficulty)
+        key = AnswerKey(ids, bytes(answers), version, difficulties)
+
+        with self._lock:
+            # Only publish the build if no write invalidated it meanwhile and
+            # a concurrent build has not already published a newer version
+            current = self._keys.get(category_id)
+            if self._generation(category_id) == generation and (current is None or current.version <= version):
+                self._keys[category_id] = key
+        return key
+
+    def get_ids(self, db: Session, category_id: int) -> array:
+        """Return the category's question IDs in ascending order"""
+        return self.get_answer_key(db, category_id).ids
+
+    @staticmethod
+    def _draw(ids: array, k: int) -> list:
+        k = max(0, min(k, len(ids)))
+        return [ids[i] for i in random.sample(range(len(ids)), k)]
+
+    def sample(self, db: Session, category_id: int, k: int) -> list:
+        """Draw up to k distinct question IDs uniformly at random"""
+        return self._draw(self.get_ids(db, category_id), k)
+
+    async def get_answer_key_async(self, db: AsyncSession, category_id: int, min_version: int = 0) -> AnswerKey:
+        """Async variant of get_answer_key; only a cold build touches the database"""
+        key = self._cached(category_id, min_version)
+        if key is None:
+            key = await db.run_sync(self.get_answer_key, category_id, min_version)
+        return key
+
+    async def sample_async(self, db: AsyncSession, category_id: int, k: int, min_version: int = 0) -> list:
+        """Async variant of sample"""
+        return self._draw((await self.get_answer_key_async(db, category_id, min_version)).ids, k)
+
+    def invalidate(self, category_id: int):
+        """Drop a category's index; the next read rebuilds it"""
+        with self._lock:
+            self._generations[category_id] = self._generations.get(category_id, 0) + 1
+            self._keys.pop(category_id, None)
+
+    def clear(self):
+        """Drop every category's index"""
+        with self._lock:
+            self._epoch += 1
+            self._keys.clear()
+
+
+question_index = QuestionIndex()
+invalidation_bus.subscribe(CATEGORY, question_index.invalidate, question_index.clear)
@@ -0,0 +1,184 @@
+"""
+Fast serialization of public quiz questions.
+
+The public quiz endpoints only ever expose seven columns of a question. They
+are selected directly with a Core statement and written out as JSON bytes
+with a fixed template, skipping ORM hydration and per-row Pydantic models.
+The output is byte-for-byte what FastAPI would render for List[QuizQuestion].
+
+Encoded questions are also kept in a byte-bounded LRU keyed by category
+content version, so hot quizzes are assembled by concatenating cached
+fragments. Every admin write bumps the version, so stale entries are never
+looked up again; the admin endpoints still drop them eagerly to free memory.
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+from json.encoder import encode_basestring
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from invalidation import CATEGORY, invalidation_bus
+from models import Category, Question
+
+PUBLIC_QUESTION_COLUMNS = (
+    Question.id,
+    Question.question_text,
+    Question.option_a,
+    Question.option_b,
+    Question.option_c,
+    Question.option_d,
+    Category.name.label("category_name"),
+)
+
+_QUESTION_TEMPLATE = (
+    '{"id":%d,"question_text":%s,"option_a":%s,"option_b":%s,'
+    '"option_c":%s,"option_d":%s,"category_name":%s}'
+)
+
+
+def public_questions_select():
+    """SELECT of the public question columns, joined to the category name"""
+    return select(*PUBLIC_QUESTION_COLUMNS).join(Category, Category.id == Question.category_id)
+
+
+def serialize_question(row) -> bytes:
+    """Encode one (id, text, a, b, c, d, category_name) row as a JSON object"""
+    question_id, question_text, option_a, option_b, option_c, option_d, category_name = row
+    return (_QUESTION_TEMPLATE % (
+        question_id,
+        encode_basestring(question_text),
+        encode_basestring(option_a),
+        encode_basestring(option_b),
+        encode_basestring(option_c),
+        encode_basestring(option_d),
+        encode_basestring(category_name),
+    )).encode("utf-8")
+
+
+def serialize_questions(rows) -> bytes:
+    """Encode rows as a JSON array"""
+    return join_fragments(serialize_question(row) for row in rows)
+
+
+class PayloadCache:
+    """LRU of encoded payloads bounded by their total size in bytes.
+
+    Keys are tuples of (kind, category_id, content_version, ...).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._keys_by_category = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = value
+            self._keys_by_category.setdefault(key[1], set()).add(key)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _discard(self, key: tuple):
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self._bytes -= len(value)
+            category_keys = self._keys_by_category[key[1]]
+            category_keys.discard(key)
+            if not category_keys:
+                del self._keys_by_category[key[1]]
+
+    def invalidate_category(self, category_id: int):
+        """Drop every cached payload of a category"""
+        with self._lock:
+            for key in list(self._keys_by_category.get(category_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_category.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "categories": len(self._keys_by_category),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+payload_cache = PayloadCache(settings.quiz_payload_cache_max_bytes)
+invalidation_bus.subscribe(CATEGORY, payload_cache.invalidate_category, payload_cache.clear)
+
+# Bodies smaller than this are not worth compressing (Starlette's GZip default)
+GZIP_MIN_BYTES = 500
+
+
+async def load_question_fragments(db: AsyncSession, category_id: int, version: int, question_ids) -> list:
+    """Encoded questions in question_ids order, selecting only cache misses.
+
+    IDs that no longer exist in the category are skipped.
+    """
+    fragments = {}
+    missing = []
+    for question_id in question_ids:
+        fragment = payload_cache.get(("question", category_id, version, question_id))
+        if fragment is None:
+            missing.append(question_id)
+        else:
+            fragments[question_id] = fragment
+
+    if missing:
+        result = await db.execute(
+            public_questions_select().where(
+                Question.category_id == category_id,
+                Question.id.in_(missing)
+            )
+        )
+        for row in result:
+            fragment = serialize_question(row)
+            payload_cache.put(("question", category_id, version, row.id), fragment)
+            fragments[row.id] = fragment
+
+    return [fragments[question_id] for question_id in question_ids if question_id in fragments]
+
+
+def join_fragments(fragments) -> bytes:
+    """Concatenate encoded questions into a JSON array"""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def gzipped_payload(key: tuple, body: bytes) -> bytes:
+    """Return body gzip-compressed, cached under key"""
+    compressed = payload_cache.get(key)
+    if compressed is None:
+        compressed = gzip.compress(body, compresslevel=6)
+        payload_cache.put(key, compressed)
+    return compressed
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Recalibrate question difficulties from recorded answers
+
+Fits a Rasch (one-parameter IRT) model to every answer in attempt_answers:
+each attempt gets an ability, each question a difficulty, and the chance of
+a correct answer is 1 / (1 + exp(difficulty - ability)). The fit alternates
+vectorized Newton steps for abilities and difficulties with NumPy, with
+standard normal priors on both so perfect and zero scores stay finite.
+Questions with at least --min-answers answers get their difficulty updated,
+and their categories' content versions are bumped. On Postgres a CATEGORY
+invalidation is sent with the commit, so running quiz servers rebuild their
+difficulty indexes right away.
+
+Usage:
+    python recalibrate_difficulty.py [--min-answers 10] [--since-days 90] [--dry-run]
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from database import SessionLocal
+from invalidation import CATEGORY, invalidation_bus
+from models import AttemptAnswer, Category, Question, QuizAttempt
+
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-4
+PRIOR_VARIANCE = 1.0
+ID_CHUNK_SIZE = 500  # under the 999 bound parameters of older SQLite builds
+
+
+def load_responses(db, since=None, batch_size=50000):
+    """(attempt index, question ID, correct) arrays for every recorded answer"""
+    query = select(AttemptAnswer.attempt_id, AttemptAnswer.question_id, AttemptAnswer.is_correct)
+    if since is not None:
+        query = query.join(QuizAttempt, QuizAttempt.id == AttemptAnswer.attempt_id).where(
+            QuizAttempt.submitted_at >= since
+        )
+    # Ordered by attempt so attempts can be numbered without a lookup table
+    query = query.order_by(AttemptAnswer.attempt_id)
+
+    attempts, questions, correct = [], [], []
+    attempt_index = -1
+    previous_attempt = None
+    for partition in db.execute(query.execution_options(yield_per=batch_size)).partitions():
+        batch_attempts = np.empty(len(partition), dtype=np.int32)
+        for n, (attempt_id, _, _) in enumerate(partition):
+            if attempt_id != previous_attempt:
+                attempt_index += 1
+                previous_attempt = attempt_id
+            batch_attempts[n] = attempt_index
+        attempts.append(batch_attempts)
+        questions.append(np.fromiter((row[1] for row in partition), dtype=np.int64, count=len(partition)))
+        correct.append(np.fromiter((row[2] for row in partition), dtype=np.float64, count=len(partition)))
+
+    if not attempts:
+        return np.empty(0, np.int32), np.empty(0, np.int64), np.empty(0, np.float64)
+    return np.concatenate(attempts), np.concatenate(questions), np.concatenate(correct)
+
+
+def fit_rasch(attempts, items, correct, n_attempts, n_items):
+    """Return (abilities, difficulties, iterations) for the given responses"""
+    abilities = np.zeros(n_attempts)
+    difficulties = np.zeros(n_items)
+
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        probability = 1 / (1 + np.exp(difficulties[items] - abilities[attempts]))
+        residual = correct - probability
+        information = probability * (1 - probability)
+        ability_step = (
+            (np.bincount(attempts, residual, n_attempts) - abilities / PRIOR_VARIANCE)
+            / (np.bincount(attempts, information, n_attempts) + 1 / PRIOR_VARIANCE)
+        )
+        abilities += np.clip(ability_step, -1, 1)
+
+        probability = 1 / (1 + np.exp(difficulties[items] - abilities[attempts]))
+        residual = probability - correct
+        information = probability * (1 - probability)
+        difficulty_step = (
+            (np.bincount(items, residual, n_items) - difficulties / PRIOR_VARIANCE)
+            / (np.bincount(items, information, n_items) + 1 / PRIOR_VARIANCE)
+        )
+        difficulties += np.clip(difficulty_step, -1, 1)
+
+        if max(np.abs(ability_step).max(), np.abs(difficulty_step).max()) < TOLERANCE:
+            break
+    return abilities, difficulties, iteration
+
+
+def recalibrate(db, min_answers: int = 10, since=None, dry_run: bool = False):
+    """Fit difficulties and store those of questions with enough answers"""
+    attempts, question_ids, correct = load_responses(db, since)
+    if not len(question_ids):
+        return {}
+
+    item_ids, items = np.unique(question_ids, return_inverse=True)
+    n_attempts = int(attempts[-1]) + 1
+    _, difficulties, iterations = fit_rasch(attempts, items, correct, n_attempts, len(item_ids))
+    answer_counts = np.bincount(items, minlength=len(item_ids))
+    print(f"📈 Fitted {len(correct):,} answers from {n_attempts:,} attempts in {iterations} iterations")
+
+    calibrated = {
+        int(question_id): round(float(difficulty), 4)
+        for question_id, difficulty, count in zip(item_ids, difficulties, answer_counts)
+        if count >= min_answers
+    }
+    if calibrated and not dry_run:
+        questions = Question.__table__
+        db.execute(
+            update(questions)
+            .where(questions.c.id == bindparam("question"))
+            # Keep updated_at for editorial changes
+            .values(difficulty=bindparam("estimate"), updated_at=questions.c.updated_at),
+            [{"question": question_id, "estimate": difficulty} for question_id, difficulty in calibrated.items()]
+        )
+        # Chunked: one bound parameter per question would pass SQLite's limit
+        question_ids = list(calibrated)
+        category_ids = set()
+        for start in range(0, len(question_ids), ID_CHUNK_SIZE):
+            category_ids.update(db.scalars(
+                select(Question.category_id).where(Question.id.in_(question_ids[start:start + ID_CHUNK_SIZE])).distinct()
+            ))
+        category_ids = sorted(category_ids)
+        for start in range(0, len(category_ids), ID_CHUNK_SIZE):
+            db.query(Category).filter(Category.id.in_(category_ids[start:start + ID_CHUNK_SIZE])).update(
+                {Category.content_version: Category.content_version + 1},
+                synchronize_session=False
+            )
+        # Running servers drop their cached quiz data of these categories at once
+        invalidation_bus.publish(db, CATEGORY, category_ids)
+        db.commit()
+    return calibrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalibrate question difficulties from recorded answers")
+    parser.add_argument("--min-answers", type=int, default=10, help="Answers a question needs to be updated")
+    parser.add_argument("--since-days", type=int, help="Only use attempts from the last N days")
+    parser.add_argument("--dry-run", action="store_true", help="Report the fit without saving it")
+    args = parser.parse_args()
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.since_days) if args.since_days else None
+    print("🔄 Recalibrating question difficulties...")
+
+    db = SessionLocal()
+    try:
+        calibrated = recalibrate(db, min_answers=args.min_answers, since=since, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Recalibration failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if not calibrated:
+        print("⏭️  No question has enough answers yet")
+        return
+    values = sorted(calibrated.values())
+    print(f"   difficulty min {values[0]:+.2f}   median {values[len(values) // 2]:+.2f}   max {values[-1]:+.2f}")
+    if args.dry_run:
+        print(f"📝 {len(calibrated)} questions would be updated (dry run, nothing changed)")
+    else:
+        print(f"✅ Updated {len(calibrated)} questions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Reconcile denormalized category counters
+
+Categories keep a question_count that the admin question endpoints update in
+the same transaction as the question write. Manual SQL, restores or bugs can
+still make it drift; this script recounts every category and fixes the ones
+that are off.
+"""
+
+import sys
+from sqlalchemy import func, select
+from database import SessionLocal
+from models import Category, Question
+
+
+def reconcile_question_counts(db, dry_run: bool = False):
+    """Recount questions per category and correct drifted counters"""
+    actual_counts = (
+        select(Question.category_id, func.count(Question.id).label("actual"))
+        .group_by(Question.category_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Category.id,
+            Category.name,
+            Category.question_count,
+            func.coalesce(actual_counts.c.actual, 0)
+        )
+        .outerjoin(actual_counts, actual_counts.c.category_id == Category.id)
+        .order_by(Category.id)
+    ).all()
+    
+    drifted = [row for row in rows if row[2] != row[3]]
+    for category_id, name, stored, actual in drifted:
+        print(f"⚠️  {name} (id={category_id}): stored {stored}, actual {actual}")
+    
+    if drifted and not dry_run:
+        # Recount inside the UPDATE so writes that land after the report
+        # above are not overwritten with a stale number
+        recount = (
+            select(func.count(Question.id))
+            .where(Question.category_id == Category.id)
+            .scalar_subquery()
+        )
+        db.query(Category).filter(
+            Category.id.in_([row[0] for row in drifted])
+        ).update(
+            {
+                Category.question_count: recount,
+                Category.content_version: Category.content_version + 1
+            },
+            synchronize_session=False
+        )
+        db.commit()
+    return drifted
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    print("🔄 Reconciling category question counts...")
+    
+    db = SessionLocal()
+    try:
+        drifted = reconcile_question_counts(db, dry_run=dry_run)
+    except Exception as e:
+        print(f"❌ Reconciliation failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    
+    if not drifted:
+        print("✅ All counters are in sync")
+    elif dry_run:
+        print(f"📝 {len(drifted)} categories drifted (dry run, nothing changed)")
+    else:
+        print(f"✅ Fixed {len(drifted)} categories")
+
+
+if __name__ == "__main__":
+    main()
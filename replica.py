@@ -0,0 +1,188 @@
+"""
+Routing of public quiz reads to an optional read replica.
+
+When REPLICA_DATABASE_URL is set, the read-only quiz endpoints get their
+session from get_read_db, which hands out replica sessions except when
+- an admin write went through this process less than
+  REPLICA_READ_YOUR_WRITES_SECONDS ago, or the client still carries the
+  cookie set on that write's response (so other workers honour the window
+  for the writer too), or
+- the replica is unhealthy: unreachable, failing queries, or on Postgres
+  replaying more than REPLICA_MAX_LAG_SECONDS behind the primary.
+In both cases reads go to the primary. A background task re-checks the
+replica every REPLICA_HEALTH_CHECK_SECONDS. Without a replica URL every
+read goes to the primary.
+
+Stale reads are safe for the quiz caches: they are keyed by the category
+content_version read in the same session, and never replace a newer entry.
+"""
+
+import asyncio
+import math
+from contextlib import asynccontextmanager
+import time
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from config import settings
+from database import AsyncSessionLocal, ReplicaSessionLocal
+from models import Category
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Replay lag in seconds; 0 when the replica has replayed all it received
+# (an idle primary makes the last replay timestamp old without any lag)
+POSTGRES_REPLICA_LAG = text(
+    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+)
+
+
+def _cookie_until(request: Optional[Request]) -> float:
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) if request is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, primary_factory=AsyncSessionLocal, replica_factory=ReplicaSessionLocal):
+        self.primary_factory = primary_factory
+        self.replica_factory = replica_factory
+        self._healthy = replica_factory is not None
+        self._primary_until = 0.0  # wall clock, comparable with the cookie
+        self._lag_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._replica_reads = 0
+        self._primary_reads = 0
+        self._read_your_writes = 0
+        self._fallbacks = 0
+        self._last_error = None
+
+    @property
+    def configured(self) -> bool:
+        return self.replica_factory is not None
+
+    def note_write(self) -> float:
+        """Send this process's reads to the primary for the read-your-writes window; return its end"""
+        until = time.time() + settings.replica_read_your_writes_seconds
+        self._primary_until = max(self._primary_until, until)
+        return until
+
+    def in_write_window(self, request: Optional[Request] = None) -> bool:
+        """Whether reads must see recent admin writes, so must not come from the replica or a cache"""
+        now = time.time()
+        return now < self._primary_until or now < _cookie_until(request)
+
+    def session_factory(self, request: Optional[Request] = None):
+        """Session factory for a read-only request"""
+        if not self.configured:
+            self._primary_reads += 1
+            return self.primary_factory
+        if self.in_write_window(request):
+            self._read_your_writes += 1
+            return self.primary_factory
+        if not self._healthy:
+            self._fallbacks += 1
+            return self.primary_factory
+        self._replica_reads += 1
+        return self.replica_factory
+
+    def mark_unhealthy(self, exc: Exception):
+        """Route reads to the primary until the next successful health check"""
+        self._healthy = False
+        self._last_error = f"{type(exc).__name__}: {exc}"
+
+    async def check(self) -> bool:
+        """Probe the replica, update its health and return it"""
+        if not self.configured:
+            return False
+        try:
+            async with self.replica_factory() as db:
+                # Read a table the quiz endpoints read, not just open a connection
+                await db.execute(select(Category.id).limit(1))
+                lag = 0.0
+                if (await db.connection()).dialect.name == "postgresql":
+                    lag = float(await db.scalar(POSTGRES_REPLICA_LAG))
+        except Exception as exc:
+            self.mark_unhealthy(exc)
+            return False
+        self._lag_seconds = lag
+        self._healthy = lag <= settings.replica_max_lag_seconds
+        if not self._healthy:
+            self._last_error = f"Replica is {lag:.1f}s behind the primary"
+        return self._healthy
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            await self.check()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.replica_health_check_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self.configured and (self._task is None or self._task.done()):
+            self._stopping = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "healthy": self._healthy,
+            "lag_seconds": self._lag_seconds,
+            "replica_reads": self._replica_reads,
+            "primary_reads": self._primary_reads,
+            "read_your_writes": self._read_your_writes,
+            "fallbacks": self._fallbacks,
+            "last_error": self._last_error,
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+@asynccontextmanager
+async def read_session(request: Optional[Request] = None):
+    """Read-only session routed by replica_router"""
+    factory = replica_router.session_factory(request)
+    async with factory() as db:
+        try:
+            yield db
+        except DBAPIError as exc:
+            # Reads cannot violate constraints, so any driver error here means
+            # the replica is down, corrupt or missing part of the schema
+            if factory is replica_router.replica_factory:
+                replica_router.mark_unhealthy(exc)
+            raise
+
+
+async def get_read_db(request: Request):
+    """Session for read-only quiz endpoints, routed by replica_router"""
+    async with read_session(request) as db:
+        yield db
+
+
+def track_admin_write(request: Request, response: Response):
+    """Admin router dependency: start the read-your-writes window on mutations"""
+    if request.method in SAFE_METHODS:
+        return
+    until = replica_router.note_write()
+    if replica_router.configured:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            f"{until:.3f}",
+            max_age=math.ceil(settings.replica_read_your_writes_seconds),
+            httponly=True,
+            samesite="lax",
+        )
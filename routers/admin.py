@@ -1,16 +1,172 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import csv
+import io
+import json
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import String, cast, func, insert, literal, or_, select, text, true, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Category, Question, AdminUser
+from typing import List, Optional, Tuple
+from database import get_db, SessionLocal
+from models import Category, Question, QuestionStat, AdminUser
 from schemas import (
     CategoryCreate, CategoryUpdate, Category as CategorySchema,
     QuestionCreate, QuestionUpdate, Question as QuestionSchema,
-    AdminUserCreate, AdminUserUpdate, AdminUser as AdminUserSchema
+    AdminUserCreate, AdminUserUpdate, AdminUser as AdminUserSchema,
+    AdminStats, CategoryStats, QuestionImportResult, QuestionImportError,
+    QuestionStats as QuestionStatsSchema, QuestionSearchResult,
+    NearDuplicate, QuestionCreateResult, ImportNearDuplicate,
+    BatchRequest, BatchResult, BatchOperationResult
 )
-from auth import get_current_active_user, get_password_hash
+from auth import get_current_active_user_sync, get_password_hash
+from cache import Cache
+from config import settings
+from invalidation import ADMIN_USER, CATEGORY, QUESTION_STATS, invalidation_bus
+from question_search import question_search
+from replica import track_admin_write
+from near_duplicates import (
+    MAX_NEAR_DUPLICATES, find_near_duplicates, find_within, index_questions, question_signatures, remove_questions
+)
+
+# Mutations keep the writer's quiz reads on the primary for a while (replica.py)
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(track_admin_write)])
+
+VALID_ANSWERS = ['A', 'B', 'C', 'D']
+VALID_ROLES = ['admin', 'moderator', 'super_admin']
+
+
+def _touch_category(db: Session, category_id: int, question_delta: int = 0):
+    """Record a content change on a category inside the caller's transaction.
+    
+    Shifts the denormalized question_count by question_delta and bumps
+    content_version, which the public quiz endpoints use as their ETag. Every
+    worker drops its cached quiz data of the category once the write commits.
+    """
+    db.query(Category).filter(Category.id == category_id).update(
+        {
+            Category.question_count: Category.question_count + question_delta,
+            Category.content_version: Category.content_version + 1
+        },
+        synchronize_session=False
+    )
+    invalidation_bus.publish(db, CATEGORY, [category_id])
+
+
+# Keyset pagination helpers
+def _encode_cursor(values) -> str:
+    """Opaque cursor for the sort key of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+
+def _decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _paginate(query, sort_columns, cursor: Optional[str], order: str, limit: int, skip: int = 0):
+    """Apply a keyset condition on sort_columns and fetch one page plus its next cursor"""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
+    if cursor:
+        key = tuple_(*sort_columns)
+        values = tuple_(*_decode_cursor(cursor, len(sort_columns)))
+        query = query.filter(key > values if order == "asc" else key < values)
+    
+    ordering = [column.desc() if order == "desc" else column for column in sort_columns]
+    query = query.order_by(*ordering)
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(getattr(last, column.key) for column in sort_columns)
+    return rows, next_cursor
+
+
+def _estimate_total(db: Session, query) -> Optional[int]:
+    """Planner row estimate for a query, without running COUNT(*)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    # Filter values stay bound parameters; only the compiled SQL is prefixed
+    compiled = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _set_page_headers(response: Response, next_cursor: Optional[str], total_estimate: Optional[int]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total_estimate is not None:
+        response.headers["X-Total-Estimate"] = str(total_estimate)
+
+
+# Dashboard statistics
+stats_cache = Cache("admin_stats", settings.admin_stats_cache_seconds, settings.admin_stats_stale_seconds, max_entries=1)
+
+
+def _load_stats(db: Session) -> AdminStats:
+    # One statement: the single-row user counts are joined onto every category
+    # row, and the outer join keeps that row even when there are no categories
+    user_counts = select(
+        func.count(AdminUser.id).label("total_users"),
+        func.count(AdminUser.id).filter(AdminUser.is_active.is_(True)).label("active_users")
+    ).subquery()
+    rows = db.execute(
+        select(
+            user_counts.c.total_users,
+            user_counts.c.active_users,
+            Category.id,
+            Category.name,
+            Category.question_count
+        )
+        .select_from(user_counts.outerjoin(Category, true()))
+        .order_by(Category.id)
+    ).all()
+    
+    categories = [
+        CategoryStats(id=row.id, name=row.name, question_count=row.question_count)
+        for row in rows if row.id is not None
+    ]
+    return AdminStats(
+        total_categories=len(categories),
+        total_questions=sum(category.question_count for category in categories),
+        total_users=rows[0].total_users,
+        active_users=rows[0].active_users,
+        categories=categories,
+        generated_at=datetime.utcnow()
+    )
+
+
+def _load_stats_snapshot() -> dict:
+    # Runs outside the request when a stale snapshot is refreshed
+    db = SessionLocal()
+    try:
+        return _load_stats(db).model_dump(mode="json")
+    finally:
+        db.close()
+
+
+@router.get("/stats", response_model=AdminStats)
+def get_stats(current_user: AdminUser = Depends(get_current_active_user_sync)):
+    """Dashboard counts, served from a short-lived snapshot"""
+    return stats_cache.get_or_load("all", _load_stats_snapshot)
 
 
 # Category endpoints
@@ -18,10 +174,13 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 def create_category(
     category: CategoryCreate,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     db_category = Category(**category.dict())
     db.add(db_category)
+    db.flush()
+    # The public catalog lists every category
+    invalidation_bus.publish(db, CATEGORY, [db_category.id])
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -30,7 +189,7 @@ def create_category(
 @router.get("/categories/", response_model=List[CategorySchema])
 def get_categories(
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     return db.query(Category).all()
 
@@ -39,7 +198,7 @@ def get_categories(
 def get_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
@@ -52,7 +211,7 @@ def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     db_category = db.query(Category).filter(Category.id == category_id).first()
     if not db_category:
@@ -61,6 +220,8 @@ def update_category(
     update_data = category_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_category, field, value)
+    db_category.content_version = Category.content_version + 1
+    invalidation_bus.publish(db, CATEGORY, [category_id])
     
     db.commit()
     db.refresh(db_category)
@@ -71,59 +232,520 @@ def update_category(
 def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     db_category = db.query(Category).filter(Category.id == category_id).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     db.delete(db_category)
+    invalidation_bus.publish(db, CATEGORY, [category_id])
     db.commit()
     return {"message": "Category deleted successfully"}
 
 
 # Question endpoints
-@router.post("/questions/", response_model=QuestionSchema)
+SIGNATURE_FIELDS = ("question_text", "option_a", "option_b", "option_c", "option_d")
+
+
+def _near_duplicates(matches) -> List[NearDuplicate]:
+    return [NearDuplicate(question_id=question_id, similarity=round(score, 3)) for question_id, score in matches]
+
+
+@router.post("/questions/", response_model=QuestionCreateResult)
 def create_question(
     question: QuestionCreate,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
+    """Create a question, listing existing questions that look like near duplicates of it"""
     # Validate category exists
     category = db.query(Category).filter(Category.id == question.category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Validate correct answer format
-    if question.correct_answer not in ['A', 'B', 'C', 'D']:
+    if question.correct_answer not in VALID_ANSWERS:
         raise HTTPException(status_code=400, detail="Correct answer must be A, B, C, or D")
     
+    signatures = question_signatures([question.dict()])
+    matches = find_near_duplicates(db, signatures, settings.near_duplicate_threshold)[0]
+    
     db_question = Question(**question.dict())
     db.add(db_question)
+    db.flush()
+    index_questions(db, [db_question.id], signatures)
+    _touch_category(db, question.category_id, 1)
     db.commit()
     db.refresh(db_question)
-    return db_question
+    return QuestionCreateResult(
+        **QuestionSchema.model_validate(db_question).model_dump(),
+        near_duplicates=_near_duplicates(matches)
+    )
+
+
+# Bulk question import
+IMPORT_COLUMNS = [
+    "question_text", "option_a", "option_b", "option_c", "option_d",
+    "correct_answer", "explanation", "category_id"
+]
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+
+class _ImportStopped(Exception):
+    def __init__(self, row: int, reason: str):
+        super().__init__(reason)
+        self.row = row
+        self.reason = reason
+
+
+def _decoded_lines(upload: UploadFile):
+    # The upload is spooled to disk by the form parser; reading it a line at
+    # a time keeps the file from being held in memory as a whole
+    for line, raw in enumerate(upload.file, start=1):
+        try:
+            yield raw.decode("utf-8-sig" if line == 1 else "utf-8")
+        except UnicodeDecodeError:
+            raise _ImportStopped(line, "File must be UTF-8 encoded")
+
+
+def _read_import_records(upload: UploadFile, file_format: str):
+    """Yield (row, record, parse_error) from the upload one record at a time.
+    
+    row is the line of the file the record starts on. Raises _ImportStopped
+    at the first line that is not valid UTF-8.
+    """
+    lines = _decoded_lines(upload)
+    if file_format == "csv":
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        line = reader.line_num
+        for values in reader:
+            # Quoted fields may span lines, so a record starts after the previous one ends
+            row, line = line + 1, reader.line_num
+            if values:
+                yield row, dict(zip(header, values)), None
+        return
+    
+    for row, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Each line must be a JSON object"
+            continue
+        yield row, record, None
+
+
+def _validation_errors(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()]
+
+
+def _validate_import_record(record: dict, category_ids: set):
+    """Apply the QuestionCreate rules to one record; return (values, errors)"""
+    try:
+        question = QuestionCreate(**{column: record.get(column) for column in IMPORT_COLUMNS})
+    except ValidationError as e:
+        return None, _validation_errors(e)
+    
+    errors = []
+    if question.correct_answer not in VALID_ANSWERS:
+        errors.append("Correct answer must be A, B, C, or D")
+    if question.category_id not in category_ids:
+        errors.append("Category not found")
+    if errors:
+        return None, errors
+    
+    values = question.dict()
+    values["explanation"] = values["explanation"] or None
+    return values, []
+
+
+def _write_question_batch(db: Session, rows: List[dict], signatures) -> List[int]:
+    """Insert a validated batch with its near-duplicate signatures and bump the
+    category counters in one transaction; return the new question IDs"""
+    if db.get_bind().dialect.driver == "psycopg2":
+        # COPY cannot return the IDs it assigns, so reserve them first
+        question_ids = db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('questions', 'id')) FROM generate_series(1, :count)"),
+            {"count": len(rows)}
+        ).scalars().all()
+        # COPY is the fastest way into Postgres. csv.writer writes None as an
+        # empty field, which COPY reads as NULL; only explanation may be NULL
+        # (an empty explanation is already stored as NULL), so every other
+        # text column is forced to keep empty strings as they are
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for question_id, values in zip(question_ids, rows):
+            writer.writerow([question_id] + [values[c] for c in IMPORT_COLUMNS])
+        buffer.seek(0)
+        not_null = ", ".join(c for c in IMPORT_COLUMNS if c not in ("explanation", "category_id"))
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY questions (id, {', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({not_null}))",
+            buffer
+        )
+    else:
+        question_ids = db.execute(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+    
+    index_questions(db, question_ids, signatures)
+    for category_id, count in Counter(values["category_id"] for values in rows).items():
+        _touch_category(db, category_id, count)
+    db.commit()
+    return question_ids
+
+
+@router.post("/questions/import", response_model=QuestionImportResult)
+def import_questions(
+    response: Response,
+    file: UploadFile = File(...),
+    file_format: Optional[str] = None,
+    batch_size: int = 5000,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    """Bulk import questions from a CSV (with header row) or JSONL upload.
+    
+    Rows are validated like POST /admin/questions/ and written in batches;
+    invalid rows are skipped and listed in the report, as are imported rows
+    that look like near duplicates of existing or earlier imported
+    questions. The format is taken from file_format or the file extension.
+    
+    Each batch commits on its own. If the import stops early (a decoding or
+    database error), earlier batches stay imported and the report is returned
+    with an error status and stopped_at_row set.
+    """
+    file_format = (file_format or (file.filename or "").rsplit(".", 1)[-1]).lower()
+    if file_format in ("ndjson", "json"):
+        file_format = "jsonl"
+    if file_format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="file_format must be csv or jsonl")
+    batch_size = max(1, min(batch_size, 50000))
+    
+    category_ids = {category_id for (category_id,) in db.query(Category.id).all()}
+    result = QuestionImportResult(imported=0, failed=0, errors=[])
+    batch = []
+    batch_rows = []
+    threshold = settings.near_duplicate_threshold
+    
+    def flush():
+        signatures = question_signatures(batch)
+        matches = find_near_duplicates(db, signatures, threshold)
+        within_batch = find_within(signatures, threshold)
+        question_ids = _write_question_batch(db, batch, signatures)
+        
+        for position, question_id in enumerate(question_ids):
+            found = matches[position] + [
+                (question_ids[earlier], score) for earlier, score in within_batch.get(position, ())
+            ]
+            if not found:
+                continue
+            if len(result.near_duplicates) >= MAX_REPORTED_IMPORT_ERRORS:
+                result.near_duplicates_truncated = True
+                break
+            found.sort(key=lambda match: (-match[1], match[0]))
+            result.near_duplicates.append(ImportNearDuplicate(
+                row=batch_rows[position],
+                question_id=question_id,
+                near_duplicates=_near_duplicates(found[:MAX_NEAR_DUPLICATES])
+            ))
+        
+        result.imported += len(batch)
+        batch.clear()
+        batch_rows.clear()
+    
+    # COPY goes through the raw DBAPI cursor, so its errors are not wrapped
+    database_errors = (SQLAlchemyError, db.get_bind().dialect.dbapi.Error)
+    stopped = None
+    try:
+        try:
+            for row, record, parse_error in _read_import_records(file, file_format):
+                if parse_error:
+                    values, errors = None, [parse_error]
+                else:
+                    values, errors = _validate_import_record(record, category_ids)
+                if errors:
+                    result.failed += 1
+                    if len(result.errors) < MAX_REPORTED_IMPORT_ERRORS:
+                        result.errors.append(QuestionImportError(row=row, errors=errors))
+                    else:
+                        result.errors_truncated = True
+                    continue
+                
+                batch.append(values)
+                batch_rows.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+        except _ImportStopped as e:
+            # The rows read before the file became unreadable are still written
+            stopped = e
+        if batch:
+            flush()
+    except database_errors as e:
+        db.rollback()
+        result.stopped_at_row = batch_rows[0]
+        result.stop_reason = f"Database error: {type(e).__name__}"
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return result
+    
+    if stopped:
+        result.stopped_at_row = stopped.row
+        result.stop_reason = stopped.reason
+        response.status_code = status.HTTP_400_BAD_REQUEST
+    return result
+
+
+# Streaming question export
+EXPORT_COLUMNS = ["id"] + IMPORT_COLUMNS + ["created_at", "updated_at"]
+EXPORT_MEDIA_TYPES = {
+    "jsonl": "application/jsonl",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_question_export(session_factory, file_format: str, category_id: Optional[int] = None, batch_size: int = 1000):
+    """Yield the question bank as encoded lines, reading through a server-side cursor.
+    
+    The generator owns its session so it outlives the request dependencies,
+    and only one batch of rows is ever held in memory.
+    """
+    columns = [getattr(Question, column) for column in EXPORT_COLUMNS]
+    statement = select(*columns).order_by(Question.category_id, Question.id)
+    if category_id:
+        statement = statement.where(Question.category_id == category_id)
+    
+    db = session_factory()
+    try:
+        rows = db.execute(statement.execution_options(yield_per=batch_size))
+        if file_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for partition in rows.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            for partition in rows.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=datetime.isoformat) + "\n"
+                    for row in partition
+                ).encode()
+    finally:
+        db.close()
+
+
+@router.get("/questions/export")
+def export_questions(
+    file_format: str = "jsonl",
+    category_id: Optional[int] = None,
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    """Stream the question bank as JSONL, NDJSON or CSV (importable again)"""
+    file_format = file_format.lower()
+    if file_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="file_format must be jsonl, ndjson or csv")
+    
+    filename = f"questions-{category_id}" if category_id else "questions"
+    return StreamingResponse(
+        iter_question_export(SessionLocal, file_format, category_id),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{file_format}"'}
+    )
+
+
+@router.get("/questions/search", response_model=List[QuestionSearchResult])
+def search_questions(
+    q: str,
+    category_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    """Search question text, options and explanations, best matches first.
+    
+    Every word of q must match the start of a word in the question.
+    """
+    limit = max(1, min(limit, 100))
+    hits = question_search.search(db, q, category_id, max(skip, 0), limit)
+    if not hits:
+        return []
+    
+    questions = {
+        question.id: question
+        for question in db.query(Question).filter(Question.id.in_([question_id for question_id, _ in hits]))
+    }
+    return [
+        QuestionSearchResult(**QuestionSchema.model_validate(questions[question_id]).model_dump(), rank=rank)
+        for question_id, rank in hits
+        if question_id in questions
+    ]
+
+
+# Per-question answer statistics
+EASY_ACCURACY = 0.95
+HARD_ACCURACY = 0.25  # no better than guessing among four options
+STATS_FLAGS = ("too_easy", "too_hard", "suspect_key")
+STATS_RESET_FIELDS = ("option_a", "option_b", "option_c", "option_d", "correct_answer")
+
+
+def _reset_question_stats(db: Session, question_ids: List[int]):
+    """Delete the stored statistics of questions inside the caller's transaction.
+    
+    Every worker drops its buffered counters of the questions once the write
+    commits, so the next flush does not add the old tallies back.
+    """
+    db.query(QuestionStat).filter(QuestionStat.question_id.in_(question_ids)).delete(synchronize_session=False)
+    invalidation_bus.publish(db, QUESTION_STATS, question_ids)
+
+
+def _stats_flag_filter(flag: str):
+    if flag == "too_easy":
+        return QuestionStat.correct >= EASY_ACCURACY * QuestionStat.attempts
+    if flag == "too_hard":
+        return QuestionStat.correct <= HARD_ACCURACY * QuestionStat.attempts
+    # A wrong option is picked more often than the keyed one
+    return or_(*(
+        (Question.correct_answer != letter) & (getattr(QuestionStat, f"picked_{letter.lower()}") > QuestionStat.correct)
+        for letter in VALID_ANSWERS
+    ))
+
+
+def _question_stats(question: Question, stat: Optional[QuestionStat], min_attempts: int) -> QuestionStatsSchema:
+    attempts = stat.attempts if stat else 0
+    correct = stat.correct if stat else 0
+    option_counts = {letter: getattr(stat, f"picked_{letter.lower()}") if stat else 0 for letter in VALID_ANSWERS}
+    accuracy = correct / attempts if attempts else None
+    
+    flags = []
+    if attempts and attempts >= min_attempts:
+        if accuracy >= EASY_ACCURACY:
+            flags.append("too_easy")
+        if accuracy <= HARD_ACCURACY:
+            flags.append("too_hard")
+        if any(count > correct for letter, count in option_counts.items() if letter != question.correct_answer):
+            flags.append("suspect_key")
+    
+    return QuestionStatsSchema(
+        question_id=question.id,
+        category_id=question.category_id,
+        question_text=question.question_text,
+        correct_answer=question.correct_answer,
+        attempts=attempts,
+        correct=correct,
+        accuracy=round(accuracy, 4) if accuracy is not None else None,
+        option_counts=option_counts,
+        flags=flags
+    )
+
+
+@router.get("/questions/stats", response_model=List[QuestionStatsSchema])
+def get_question_stats(
+    category_id: Optional[int] = None,
+    flag: Optional[str] = None,
+    min_attempts: int = 20,
+    sort: str = "accuracy",
+    order: str = "asc",
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    """Answer statistics of questions with at least min_attempts answers.
+    
+    flag narrows the list to questions that look too_easy, too_hard or have
+    a suspect_key (a wrong option is chosen more often than the correct one).
+    """
+    if flag is not None and flag not in STATS_FLAGS:
+        raise HTTPException(status_code=400, detail=f"flag must be one of: {', '.join(STATS_FLAGS)}")
+    if sort not in ("accuracy", "attempts"):
+        raise HTTPException(status_code=400, detail="sort must be accuracy or attempts")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
+    query = db.query(Question, QuestionStat).join(
+        QuestionStat, QuestionStat.question_id == Question.id
+    ).filter(QuestionStat.attempts >= max(min_attempts, 1))
+    if category_id is not None:
+        query = query.filter(Question.category_id == category_id)
+    if flag is not None:
+        query = query.filter(_stats_flag_filter(flag))
+    
+    sort_column = (
+        QuestionStat.correct * 1.0 / QuestionStat.attempts if sort == "accuracy" else QuestionStat.attempts
+    )
+    if order == "desc":
+        sort_column = sort_column.desc()
+    rows = query.order_by(sort_column, Question.id).offset(skip).limit(limit).all()
+    return [_question_stats(question, stat, min_attempts) for question, stat in rows]
 
 
 @router.get("/questions/", response_model=List[QuestionSchema])
 def get_questions(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
     category_id: int = None,
+    correct_answer: Optional[str] = None,
+    sort: str = "category",
+    order: str = "asc",
+    include_total: bool = False,
+    skip: int = 0,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
+    """List questions a page at a time.
+    
+    Pages are ordered by (category_id, id), or by id with sort=id, and
+    continued by passing the X-Next-Cursor response header back as cursor.
+    include_total adds an X-Total-Estimate header. skip is kept for old
+    clients but gets slower the deeper it pages.
+    """
+    if sort not in ("category", "id"):
+        raise HTTPException(status_code=400, detail="sort must be category or id")
+    if correct_answer and correct_answer.upper() not in VALID_ANSWERS:
+        raise HTTPException(status_code=400, detail="Correct answer must be A, B, C, or D")
+    limit = max(1, min(limit, 1000))
+    
     query = db.query(Question)
     if category_id:
         query = query.filter(Question.category_id == category_id)
-    return query.offset(skip).limit(limit).all()
+    if correct_answer:
+        query = query.filter(Question.correct_answer == correct_answer.upper())
+    
+    total_estimate = None
+    if include_total:
+        if correct_answer:
+            total_estimate = _estimate_total(db, query)
+        else:
+            # The per-category counters give an exact total for free
+            counters = db.query(func.coalesce(func.sum(Category.question_count), 0))
+            if category_id:
+                counters = counters.filter(Category.id == category_id)
+            total_estimate = counters.scalar()
+    
+    sort_columns = [Question.category_id, Question.id] if sort == "category" else [Question.id]
+    questions, next_cursor = _paginate(query, sort_columns, cursor, order, limit, skip)
+    _set_page_headers(response, next_cursor, total_estimate)
+    return questions
 
 
 @router.get("/questions/{question_id}", response_model=QuestionSchema)
 def get_question(
     question_id: int,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     question = db.query(Question).filter(Question.id == question_id).first()
     if not question:
@@ -131,12 +753,42 @@ def get_question(
     return question
 
 
+@router.get("/questions/{question_id}/stats", response_model=QuestionStatsSchema)
+def get_single_question_stats(
+    question_id: int,
+    min_attempts: int = 20,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    stat = db.query(QuestionStat).filter(QuestionStat.question_id == question_id).first()
+    return _question_stats(question, stat, min_attempts)
+
+
+@router.get("/questions/{question_id}/near-duplicates", response_model=List[NearDuplicate])
+def get_near_duplicates(
+    question_id: int,
+    threshold: Optional[float] = None,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    """Existing questions whose text and options look like this question's"""
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    threshold = settings.near_duplicate_threshold if threshold is None else threshold
+    matches = find_near_duplicates(db, question_signatures([question]), threshold, exclude=[question_id])[0]
+    return _near_duplicates(matches)
+
+
 @router.put("/questions/{question_id}", response_model=QuestionSchema)
 def update_question(
     question_id: int,
     question_update: QuestionUpdate,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     db_question = db.query(Question).filter(Question.id == question_id).first()
     if not db_question:
@@ -145,7 +797,7 @@ def update_question(
     update_data = question_update.dict(exclude_unset=True)
     
     # Validate correct answer if provided
-    if 'correct_answer' in update_data and update_data['correct_answer'] not in ['A', 'B', 'C', 'D']:
+    if 'correct_answer' in update_data and update_data['correct_answer'] not in VALID_ANSWERS:
         raise HTTPException(status_code=400, detail="Correct answer must be A, B, C, or D")
     
     # Validate category if provided
@@ -154,9 +806,27 @@ def update_question(
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
     
+    old_category_id = db_question.category_id
+    new_category_id = update_data.get('category_id', old_category_id)
+    if new_category_id != old_category_id:
+        # Move the question between category counters
+        _touch_category(db, old_category_id, -1)
+        _touch_category(db, new_category_id, 1)
+    else:
+        _touch_category(db, old_category_id)
+    
+    # Answer statistics describe the old options, so start them over
+    if any(field in update_data and update_data[field] != getattr(db_question, field) for field in STATS_RESET_FIELDS):
+        _reset_question_stats(db, [question_id])
+    reindex = any(field in update_data and update_data[field] != getattr(db_question, field) for field in SIGNATURE_FIELDS)
+    
     for field, value in update_data.items():
         setattr(db_question, field, value)
     
+    if reindex:
+        remove_questions(db, [question_id])
+        index_questions(db, [question_id], question_signatures([db_question]))
+    
     db.commit()
     db.refresh(db_question)
     return db_question
@@ -166,23 +836,263 @@ def update_question(
 def delete_question(
     question_id: int,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     db_question = db.query(Question).filter(Question.id == question_id).first()
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
     
     db.delete(db_question)
+    _reset_question_stats(db, [question_id])
+    remove_questions(db, [question_id])
+    _touch_category(db, db_question.category_id, -1)
     db.commit()
     return {"message": "Question deleted successfully"}
 
 
+
+# Batch operations
+MAX_BATCH_OPERATIONS = 1000
+BATCH_SCHEMAS = {
+    ("category", "create"): CategoryCreate,
+    ("category", "update"): CategoryUpdate,
+    ("question", "create"): QuestionCreate,
+    ("question", "update"): QuestionUpdate,
+}
+NULLABLE_FIELDS = ("description", "explanation")
+
+
+def _touch_categories(db: Session, question_deltas: dict):
+    """_touch_category for many categories, with one UPDATE per distinct delta"""
+    by_delta = defaultdict(list)
+    for category_id, delta in question_deltas.items():
+        by_delta[delta].append(category_id)
+    for delta, category_ids in by_delta.items():
+        db.query(Category).filter(Category.id.in_(category_ids)).update(
+            {
+                Category.question_count: Category.question_count + delta,
+                Category.content_version: Category.content_version + 1
+            },
+            synchronize_session=False
+        )
+    invalidation_bus.publish(db, CATEGORY, question_deltas)
+
+
+def _bulk_update(db: Session, model, updates: dict):
+    """Apply {id: values} with one UPDATE ... WHERE id IN per distinct set of values"""
+    by_values = defaultdict(list)
+    for row_id, values in updates.items():
+        by_values[tuple(sorted(values.items()))].append(row_id)
+    for values, row_ids in by_values.items():
+        db.query(model).filter(model.id.in_(row_ids)).update(dict(values), synchronize_session=False)
+
+
+def _validate_batch_operation(operation, categories: dict, questions: dict) -> Tuple[Optional[dict], List[str]]:
+    """Check one operation against the current rows; return (values, errors)"""
+    if (operation.entity, "update") not in BATCH_SCHEMAS:
+        return None, ["entity must be category or question"]
+    if operation.op not in ("create", "update", "delete"):
+        return None, ["op must be create, update or delete"]
+    if operation.op == "create":
+        if operation.id is not None:
+            return None, ["id must not be given for create"]
+    elif operation.id is None:
+        return None, [f"id is required for {operation.op}"]
+    elif operation.id not in (categories if operation.entity == "category" else questions):
+        return None, [f"{operation.entity.capitalize()} not found"]
+    if operation.op == "delete":
+        return None, []
+    
+    try:
+        values = BATCH_SCHEMAS[operation.entity, operation.op](**(operation.data or {})).dict(
+            exclude_unset=operation.op == "update"
+        )
+    except ValidationError as e:
+        return None, _validation_errors(e)
+    errors = [f"{field}: may not be null" for field, value in values.items() if value is None and field not in NULLABLE_FIELDS]
+    if operation.op == "update" and not values:
+        errors.append("data must set at least one field")
+    if operation.entity == "question":
+        if "correct_answer" in values and values["correct_answer"] not in VALID_ANSWERS:
+            errors.append("Correct answer must be A, B, C, or D")
+        if "category_id" in values and values["category_id"] not in categories:
+            errors.append("Category not found")
+    if operation.op == "create" and operation.entity == "question" and not errors:
+        values["explanation"] = values["explanation"] or None
+    return (None, errors) if errors else (values, [])
+
+
+@router.post("/batch", response_model=BatchResult)
+def run_batch(
+    batch: BatchRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    """Create, update and delete categories and questions in one transaction.
+    
+    Every operation is validated before anything is written. If any is
+    invalid, nothing is applied, the status is 400 and each result lists its
+    errors. Otherwise updates run as one UPDATE ... WHERE id IN per distinct
+    change, creates and deletes in bulk, and the batch commits once. A
+    category can only be deleted once the batch leaves it without questions.
+    """
+    operations = batch.operations
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+    results = [
+        BatchOperationResult(index=index, op=operation.op, entity=operation.entity, id=operation.id)
+        for index, operation in enumerate(operations)
+    ]
+    
+    categories = {category.id: category for category in db.query(Category)}
+    question_ids = {operation.id for operation in operations if operation.entity == "question" and operation.id is not None}
+    questions = {question.id: question for question in db.query(Question).filter(Question.id.in_(question_ids))} if question_ids else {}
+    
+    # Validate every operation and sort the valid ones into bulk steps
+    category_creates, category_updates, category_deletes = [], {}, []
+    question_creates, question_updates, question_deletes = [], {}, []
+    seen = set()
+    for operation, result in zip(operations, results):
+        values, result.errors = _validate_batch_operation(operation, categories, questions)
+        if operation.id is not None and operation.op != "create":
+            if (operation.entity, operation.id) in seen:
+                result.errors.append(f"{operation.entity} {operation.id} appears in more than one operation")
+            seen.add((operation.entity, operation.id))
+        if result.errors:
+            continue
+        if operation.entity == "category":
+            if operation.op == "create":
+                category_creates.append((result, values))
+            elif operation.op == "update":
+                category_updates[operation.id] = values
+            else:
+                category_deletes.append(operation.id)
+        elif operation.op == "create":
+            question_creates.append((result, values))
+        elif operation.op == "update":
+            question_updates[operation.id] = values
+        else:
+            question_deletes.append(operation.id)
+    
+    # Question counter changes, which also decide whether deleted categories end up empty
+    question_deltas = defaultdict(int)
+    for question_id in question_deletes:
+        question_deltas[questions[question_id].category_id] -= 1
+    for question_id, values in question_updates.items():
+        old_category_id = questions[question_id].category_id
+        new_category_id = values.get("category_id", old_category_id)
+        if new_category_id != old_category_id:
+            question_deltas[old_category_id] -= 1
+            question_deltas[new_category_id] += 1
+        else:
+            question_deltas[old_category_id] += 0
+    for _, values in question_creates:
+        question_deltas[values["category_id"]] += 1
+    for category_id in category_updates:
+        question_deltas[category_id] += 0
+    
+    # Category names must stay unique once the batch is applied
+    names = {category_id: category.name for category_id, category in categories.items() if category_id not in category_deletes}
+    names.update({category_id: values["name"] for category_id, values in category_updates.items() if "name" in values})
+    final_names = Counter(names.values()) + Counter(values["name"] for _, values in category_creates)
+    for operation, result in zip(operations, results):
+        if result.errors or operation.entity != "category":
+            continue
+        if operation.op == "delete" and categories[operation.id].question_count + question_deltas[operation.id] > 0:
+            result.errors.append("Category still has questions")
+        elif operation.op != "delete" and final_names[(operation.data or {}).get("name")] > 1:
+            result.errors.append("Category name already exists")
+    
+    if any(result.errors for result in results):
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return BatchResult(committed=False, results=results)
+    
+    try:
+        # Unique names are checked per statement, so names that change hands
+        # (swaps, or a new category taking a renamed or deleted one's name)
+        # are parked on placeholders first
+        freed = category_deletes + [
+            category_id for category_id, values in category_updates.items()
+            if values.get("name", categories[category_id].name) != categories[category_id].name
+        ]
+        if freed:
+            placeholder = literal(f"~batch-{uuid.uuid4().hex}-") + cast(Category.id, String)
+            db.query(Category).filter(Category.id.in_(freed)).update(
+                {Category.name: placeholder}, synchronize_session=False
+            )
+        if category_creates:
+            category_ids = db.execute(
+                insert(Category).returning(Category.id, sort_by_parameter_order=True),
+                [values for _, values in category_creates]
+            ).scalars().all()
+            for (result, _), category_id in zip(category_creates, category_ids):
+                result.id = category_id
+            invalidation_bus.publish(db, CATEGORY, category_ids)
+        _bulk_update(db, Category, category_updates)
+        
+        if question_deletes:
+            db.query(Question).filter(Question.id.in_(question_deletes)).delete(synchronize_session=False)
+            _reset_question_stats(db, question_deletes)
+            remove_questions(db, question_deletes)
+        
+        if question_updates:
+            _bulk_update(db, Question, question_updates)
+            # Answer statistics describe the old options, so start them over
+            reset_stats = [
+                question_id for question_id, values in question_updates.items()
+                if any(field in values and values[field] != getattr(questions[question_id], field) for field in STATS_RESET_FIELDS)
+            ]
+            if reset_stats:
+                _reset_question_stats(db, reset_stats)
+            reindex = [
+                question_id for question_id, values in question_updates.items()
+                if any(field in values and values[field] != getattr(questions[question_id], field) for field in SIGNATURE_FIELDS)
+            ]
+            if reindex:
+                remove_questions(db, reindex)
+                index_questions(db, reindex, question_signatures([
+                    {**{field: getattr(questions[question_id], field) for field in SIGNATURE_FIELDS}, **question_updates[question_id]}
+                    for question_id in reindex
+                ]))
+        
+        if question_creates:
+            rows = [values for _, values in question_creates]
+            signatures = question_signatures(rows)
+            matches = find_near_duplicates(db, signatures, settings.near_duplicate_threshold)
+            within_batch = find_within(signatures, settings.near_duplicate_threshold)
+            new_question_ids = db.execute(
+                insert(Question).returning(Question.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            index_questions(db, new_question_ids, signatures)
+            for position, ((result, _), question_id) in enumerate(zip(question_creates, new_question_ids)):
+                result.id = question_id
+                found = matches[position] + [
+                    (new_question_ids[earlier], score) for earlier, score in within_batch.get(position, ())
+                ]
+                found.sort(key=lambda match: (-match[1], match[0]))
+                result.near_duplicates = _near_duplicates(found[:MAX_NEAR_DUPLICATES])
+        
+        if category_deletes:
+            db.query(Category).filter(Category.id.in_(category_deletes)).delete(synchronize_session=False)
+            invalidation_bus.publish(db, CATEGORY, category_deletes)
+        _touch_categories(db, {
+            category_id: delta for category_id, delta in question_deltas.items() if category_id not in category_deletes
+        })
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Batch conflicts with a concurrent change; nothing was applied")
+    
+    return BatchResult(committed=True, results=results)
+
+
 # Admin user endpoints
 @router.post("/users/", response_model=AdminUserSchema)
 def create_admin_user(
     user: AdminUserCreate,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
     # Check if username already exists
     existing_user = db.query(AdminUser).filter(AdminUser.username == user.username).first()
@@ -208,7 +1118,90 @@ def create_admin_user(
 
 @router.get("/users/", response_model=List[AdminUserSchema])
 def get_admin_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+    order: str = "asc",
+    include_total: bool = False,
     db: Session = Depends(get_db),
-    current_user: AdminUser = Depends(get_current_active_user)
+    current_user: AdminUser = Depends(get_current_active_user_sync)
 ):
-    return db.query(AdminUser).all() 
\ No newline at end of file
+    """List admin users by id, paginated like GET /admin/questions/"""
+    if role and role not in VALID_ROLES:
+        raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {', '.join(VALID_ROLES)}")
+    limit = max(1, min(limit, 1000))
+    
+    query = db.query(AdminUser)
+    if is_active is not None:
+        query = query.filter(AdminUser.is_active.is_(is_active))
+    if role:
+        query = query.filter(AdminUser.role == role)
+    
+    total_estimate = _estimate_total(db, query) if include_total else None
+    users, next_cursor = _paginate(query, [AdminUser.id], cursor, order, limit)
+    _set_page_headers(response, next_cursor, total_estimate)
+    return users 
+
+
+@router.put("/users/{user_id}", response_model=AdminUserSchema)
+def update_admin_user(
+    user_id: int,
+    user_update: AdminUserUpdate,
+    db: Session = Depends(get_db),
+    current_user: AdminUser = Depends(get_current_active_user_sync)
+):
+    if current_user.role not in ["super_admin", "admin"]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    db_user = db.query(AdminUser).filter(AdminUser.id == user_id).first()
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    update_data = user_update.dict(exclude_unset=True)
+    
+    # Validate role if provided
+    if 'role' in update_data and update_data['role'] not in VALID_ROLES:
+        raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {', '.join(VALID_ROLES)}")
+    
+    # Admins may edit their own account; roles, status and other accounts are for super admins
+    is_self = db_user.id == current_user.id
+    if current_user.role != "super_admin" and (not is_self or 'role' in update_data or 'is_active' in update_data):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    if is_self and (
+        update_data.get('role', db_user.role) != db_user.role
+        or update_data.get('is_active', db_user.is_active) != db_user.is_active
+    ):
+        raise HTTPException(status_code=400, detail="You cannot change your own role or active status")
+    
+    # There must always be an active super admin left
+    if db_user.role == "super_admin" and db_user.is_active and (
+        update_data.get('role', db_user.role) != "super_admin" or not update_data.get('is_active', True)
+    ):
+        active_super_admins = db.query(AdminUser.id).filter(
+            AdminUser.role == "super_admin", AdminUser.is_active.is_(True)
+        ).with_for_update().all()
+        if len(active_super_admins) <= 1:
+            raise HTTPException(status_code=400, detail="Cannot demote or deactivate the last active super admin")
+    
+    # Check username and email uniqueness if they change
+    if 'username' in update_data and update_data['username'] != db_user.username:
+        if db.query(AdminUser).filter(AdminUser.username == update_data['username']).first():
+            raise HTTPException(status_code=400, detail="Username already registered")
+    if 'email' in update_data and update_data['email'] != db_user.email:
+        if db.query(AdminUser).filter(AdminUser.email == update_data['email']).first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+    
+    if 'password' in update_data:
+        db_user.hashed_password = get_password_hash(update_data.pop('password'))
+    
+    previous_username = db_user.username
+    for field, value in update_data.items():
+        setattr(db_user, field, value)
+    
+    # Cached principals of this user must not outlive a role, status or password change
+    invalidation_bus.publish(db, ADMIN_USER, [previous_username])
+    db.commit()
+    db.refresh(db_user)
+    return db_user
@@ -1,12 +1,13 @@
 from datetime import timedelta, datetime
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Body, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 import secrets
 import re
 from typing import Optional
-from database import get_db
+from database import get_async_db
 from models import AdminUser, AdminInvitation
 from schemas import (
     Token, AdminUserCreate, AdminUser as AdminUserSchema,
@@ -14,8 +15,9 @@ from schemas import (
     AdminInvitationResponse, PasswordResetRequest, PasswordReset,
     EmailVerification, AdminRegistrationResponse, AdminUserProfile
 )
-from auth import authenticate_user, create_access_token, get_password_hash, get_current_active_user, verify_password, create_refresh_token, verify_refresh_token
+from auth import authenticate_user, create_access_token, get_password_hash_async, get_current_active_user, create_refresh_token, verify_refresh_token
 from config import settings
+from invalidation import ADMIN_USER, invalidation_bus
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -59,10 +61,10 @@ def generate_secure_token() -> str:
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     response: Response = None
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,7 +72,8 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     user.last_login = datetime.utcnow()
-    db.commit()
+    invalidation_bus.publish(db, ADMIN_USER, [user.username])
+    await db.commit()
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -130,7 +133,7 @@ async def logout(response: Response):
 @router.post("/register", response_model=AdminRegistrationResponse)
 async def register_admin_user(
     user: AdminUserCreateEnhanced,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Enhanced admin user registration with validation"""
     
@@ -158,12 +161,12 @@ async def register_admin_user(
         )
     
     # Check if username already exists
-    existing_user = db.query(AdminUser).filter(AdminUser.username == user.username).first()
+    existing_user = await db.scalar(select(AdminUser).where(AdminUser.username == user.username))
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check if email already exists
-    existing_email = db.query(AdminUser).filter(AdminUser.email == user.email).first()
+    existing_email = await db.scalar(select(AdminUser).where(AdminUser.email == user.email))
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -172,7 +175,7 @@ async def register_admin_user(
     if user.role not in valid_roles:
         raise HTTPException(status_code=400, detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     email_verification_token = generate_secure_token()
     
     db_user = AdminUser(
@@ -185,8 +188,8 @@ async def register_admin_user(
         email_verification_token=email_verification_token
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # TODO: Send email verification (implement email service)
     # send_verification_email(db_user.email, email_verification_token)
@@ -202,18 +205,18 @@ async def register_admin_user(
 async def register_with_invitation(
     invitation_id: str,
     user: AdminUserCreateEnhanced,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register admin user with invitation"""
     
     # Find and validate invitation
-    invitation = db.query(AdminInvitation).filter(
+    invitation = await db.scalar(select(AdminInvitation).where(
         and_(
             AdminInvitation.invitation_id == invitation_id,
             AdminInvitation.is_used.is_(False),
             AdminInvitation.expires_at > datetime.utcnow()
         )
-    ).first()
+    ))
     
     if not invitation:
         raise HTTPException(status_code=400, detail="Invalid or expired invitation")
@@ -234,11 +237,11 @@ async def register_with_invitation(
         )
     
     # Check if username already exists
-    existing_user = db.query(AdminUser).filter(AdminUser.username == user.username).first()
+    existing_user = await db.scalar(select(AdminUser).where(AdminUser.username == user.username))
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     
     db_user = AdminUser(
         username=user.username,
@@ -254,8 +257,8 @@ async def register_with_invitation(
     # Mark invitation as used
     invitation.is_used = True
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return AdminRegistrationResponse(
         user=db_user,
@@ -267,7 +270,7 @@ async def register_with_invitation(
 @router.post("/invite", response_model=AdminInvitationResponse)
 async def invite_admin_user(
     invitation: AdminInvitationSchema,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: AdminUser = Depends(get_current_active_user)
 ):
     """Invite a new admin user (requires existing admin privileges)"""
@@ -281,7 +284,7 @@ async def invite_admin_user(
         raise HTTPException(status_code=400, detail="Invalid email format")
     
     # Check if email already exists
-    existing_user = db.query(AdminUser).filter(AdminUser.email == invitation.email).first()
+    existing_user = await db.scalar(select(AdminUser).where(AdminUser.email == invitation.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -302,8 +305,8 @@ async def invite_admin_user(
         expires_at=expires_at
     )
     db.add(db_invitation)
-    db.commit()
-    db.refresh(db_invitation)
+    await db.commit()
+    await db.refresh(db_invitation)
     
     # TODO: Send invitation email (implement email service)
     # send_invitation_email(invitation.email, invitation_id, current_user.username)
@@ -320,11 +323,11 @@ async def invite_admin_user(
 @router.post("/password-reset-request")
 async def request_password_reset(
     request: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Request password reset"""
     
-    user = db.query(AdminUser).filter(AdminUser.email == request.email).first()
+    user = await db.scalar(select(AdminUser).where(AdminUser.email == request.email))
     if not user:
         # Don't reveal if email exists or not
         return {"message": "If the email exists, a password reset link has been sent"}
@@ -335,7 +338,7 @@ async def request_password_reset(
     
     user.password_reset_token = reset_token
     user.password_reset_expires = expires_at
-    db.commit()
+    await db.commit()
     
     # TODO: Send password reset email (implement email service)
     # send_password_reset_email(user.email, reset_token)
@@ -346,7 +349,7 @@ async def request_password_reset(
 @router.post("/password-reset")
 async def reset_password(
     reset_data: PasswordReset,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reset password with token"""
     
@@ -362,21 +365,22 @@ async def reset_password(
         )
     
     # Find user with valid reset token
-    user = db.query(AdminUser).filter(
+    user = await db.scalar(select(AdminUser).where(
         and_(
             AdminUser.password_reset_token == reset_data.token,
             AdminUser.password_reset_expires > datetime.utcnow()
         )
-    ).first()
+    ))
     
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
     # Update password and clear reset token
-    user.hashed_password = get_password_hash(reset_data.new_password)
+    user.hashed_password = await get_password_hash_async(reset_data.new_password)
     user.password_reset_token = None
     user.password_reset_expires = None
-    db.commit()
+    invalidation_bus.publish(db, ADMIN_USER, [user.username])
+    await db.commit()
     
     return {"message": "Password reset successfully"}
 
@@ -384,20 +388,21 @@ async def reset_password(
 @router.post("/verify-email")
 async def verify_email(
     verification: EmailVerification,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify email address"""
     
-    user = db.query(AdminUser).filter(
+    user = await db.scalar(select(AdminUser).where(
         AdminUser.email_verification_token == verification.token
-    ).first()
+    ))
     
     if not user:
         raise HTTPException(status_code=400, detail="Invalid verification token")
     
     user.is_email_verified = True
     user.email_verification_token = None
-    db.commit()
+    invalidation_bus.publish(db, ADMIN_USER, [user.username])
+    await db.commit()
     
     return {"message": "Email verified successfully"}
 
@@ -410,7 +415,7 @@ async def read_users_me(current_user: AdminUser = Depends(get_current_active_use
 
 @router.get("/invitations", response_model=list[AdminInvitationResponse])
 async def get_invitations(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: AdminUser = Depends(get_current_active_user)
 ):
     """Get all invitations (admin only)"""
@@ -418,10 +423,15 @@ async def get_invitations(
     if current_user.role not in ["super_admin", "admin"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
-    invitations = db.query(AdminInvitation).filter(
-        AdminInvitation.is_used.is_(False),
-        AdminInvitation.expires_at > datetime.utcnow()
-    ).all()
+    result = await db.scalars(
+        select(AdminInvitation)
+        .options(selectinload(AdminInvitation.inviter))
+        .where(
+            AdminInvitation.is_used.is_(False),
+            AdminInvitation.expires_at > datetime.utcnow()
+        )
+    )
+    invitations = result.all()
     
     return [
         AdminInvitationResponse(
@@ -1,133 +1,426 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Category, Question
-from schemas import QuizQuestion, QuizAnswer, QuizResult
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from cache import Cache
+from config import settings
+from database import get_async_db
+from invalidation import CATEGORY, invalidation_bus
+from models import Category, Question, QuizAttempt
+from schemas import QuizQuestion, QuizAnswer, QuizResult, AdaptiveQuestion, Leaderboard, AttemptRank
+from adaptive import estimate_ability, pick_question
+from attempt_writer import attempt_writer
+from leaderboard import leaderboards
+from question_stats import question_stats
+from quiz_index import question_index
+from replica import get_read_db, read_session, replica_router
+from quiz_payloads import (
+    GZIP_MIN_BYTES, gzipped_payload, join_fragments, load_question_fragments, public_questions_select
+)
 
 router = APIRouter(prefix="/quiz", tags=["quiz"])
 
 
+# Conditional GET helpers
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps; they are stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _cache_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.quiz_cache_max_age_seconds}, must-revalidate",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def _gzip_etag(etag: str) -> str:
+    # Each encoding of a body is its own representation and needs its own strong ETag
+    return etag[:-1] + '-gz"'
+
+
+def _accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip, honouring q-values (gzip;q=0 refuses it)"""
+    qualities = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, parameters = item.partition(";")
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+def _not_modified(request: Request, etags: List[str], last_modified: Optional[datetime]) -> Optional[str]:
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent.
+    
+    etags are the ETags of the representations the client accepts, the
+    preferred one first. Returns the ETag for the 304 response, or None when
+    the client's copy is out of date.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return etags[0]
+        # If-None-Match uses the weak comparison
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        tags = {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+        return next((etag for etag in etags if etag in tags), None)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if _as_utc(last_modified).replace(microsecond=0) <= since:
+            return etags[0]
+    return None
+
+
+# The whole catalog is one cache entry; any category change replaces it
+CATALOG_KEY = "all"
+catalog_cache = Cache("quiz_catalog", settings.catalog_cache_seconds, settings.catalog_stale_seconds, max_entries=1)
+invalidation_bus.subscribe(CATEGORY, lambda category_id: catalog_cache.invalidate(CATALOG_KEY), catalog_cache.clear)
+
+# The catalog ETag this worker loaded last, and when it first loaded it
+_catalog_seen = {"etag": None, "since": None}
+
+
+def _catalog_last_modified(etag: str) -> datetime:
+    """Last-Modified of the catalog with this ETag.
+    
+    Category timestamps cannot serve: deleting a category moves none of the
+    remaining ones. The time this worker first loaded the current catalog
+    is never before the change that produced it, so an
+    If-Modified-Since date from an older copy always compares as modified.
+    An ETag that comes back (a category added and deleted again) starts
+    over rather than reusing its old time.
+    """
+    if _catalog_seen["etag"] != etag:
+        _catalog_seen.update(etag=etag, since=datetime.now(timezone.utc))
+    return _catalog_seen["since"]
+
+
+async def _load_catalog(request: Optional[Request] = None) -> dict:
+    async with read_session(request) as db:
+        result = await db.execute(
+            select(
+                Category.id, Category.name, Category.description, Category.question_count,
+                Category.content_version
+            )
+            .order_by(Category.id)
+        )
+        rows = result.all()
+    
+    # The ETag covers every category's content version, so it changes on any
+    # category edit, question write or category add/delete
+    fingerprint = ",".join(f"{row.id}:{row.content_version}" for row in rows)
+    etag = f'"categories-{hashlib.sha1(fingerprint.encode()).hexdigest()[:20]}"'
+    return {
+        "etag": etag,
+        "last_modified": _catalog_last_modified(etag).isoformat(),
+        # question_count is maintained by the admin question endpoints, so
+        # this needs no per-category query
+        "categories": [
+            {
+                "id": row.id,
+                "name": row.name,
+                "description": row.description,
+                "question_count": row.question_count
+            }
+            for row in rows
+        ]
+    }
+
+
 @router.get("/categories/", response_model=List[dict])
-def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, response: Response):
     """Get all available quiz categories"""
-    categories = db.query(Category).all()
-    return [
-        {
-            "id": category.id,
-            "name": category.name,
-            "description": category.description,
-            "question_count": len(category.questions)
-        }
-        for category in categories
-    ]
+    if replica_router.in_write_window(request):
+        # Recent admin writes may not have reached the cache of this worker yet
+        catalog = await _load_catalog(request)
+    else:
+        catalog = await catalog_cache.get_or_load_async(CATALOG_KEY, _load_catalog)
+    last_modified = datetime.fromisoformat(catalog["last_modified"])
+    
+    headers = _cache_headers(catalog["etag"], last_modified)
+    if _not_modified(request, [catalog["etag"]], last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return catalog["categories"]
 
 
 @router.get("/questions/{category_id}", response_model=List[QuizQuestion])
-def get_quiz_questions(
+async def get_quiz_questions(
     category_id: int,
+    request: Request,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get quiz questions for a specific category"""
-    # Verify category exists
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if not category:
+    # Answer conditional requests from the category's content version alone
+    result = await db.execute(
+        select(Category.content_version, Category.created_at, Category.updated_at)
+        .where(Category.id == category_id)
+    )
+    version = result.first()
+    if version is None:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    # Get questions for the category
-    questions = db.query(Question).filter(Question.category_id == category_id).limit(limit).all()
+    etag = f'"questions-{category_id}-v{version.content_version}-l{limit}"'
+    use_gzip = settings.quiz_payload_gzip and _accepts_gzip(request)
+    last_modified = version.updated_at or version.created_at
+    headers = _cache_headers(etag, last_modified)
+    headers["Vary"] = "Accept-Encoding"
+    etags = [_gzip_etag(etag), etag] if use_gzip else [etag]
+    not_modified_etag = _not_modified(request, etags, last_modified)
+    if not_modified_etag:
+        headers["ETag"] = not_modified_etag
+        return Response(status_code=304, headers=headers)
     
-    if not questions:
+    # The first `limit` IDs of the index are the page; their encoded JSON
+    # comes from the payload cache and only misses are selected
+    content_version = version.content_version
+    answer_key = await question_index.get_answer_key_async(db, category_id, min_version=content_version)
+    fragments = await load_question_fragments(db, category_id, content_version, answer_key.ids[:max(limit, 0)])
+    
+    if not fragments:
         raise HTTPException(status_code=404, detail="No questions found for this category")
     
-    # Convert to quiz format (without correct answer)
-    quiz_questions = []
-    for question in questions:
-        quiz_questions.append(QuizQuestion(
-            id=question.id,
-            question_text=question.question_text,
-            option_a=question.option_a,
-            option_b=question.option_b,
-            option_c=question.option_c,
-            option_d=question.option_d,
-            category_name=category.name
-        ))
+    body = join_fragments(fragments)
+    if use_gzip and len(body) >= GZIP_MIN_BYTES:
+        body = gzipped_payload(("gzip", category_id, content_version, limit), body)
+        headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = _gzip_etag(etag)
     
-    return quiz_questions
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/submit/{category_id}", response_model=QuizResult)
-def submit_quiz(
+async def submit_quiz(
     category_id: int,
     answers: List[QuizAnswer],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Submit quiz answers and get results"""
     # Verify category exists
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    # Get all questions for the category
-    questions = db.query(Question).filter(Question.category_id == category_id).all()
-    question_dict = {q.id: q for q in questions}
+    # Grade against the cached answer key instead of loading the questions
+    answer_key = await question_index.get_answer_key_async(
+        db, category_id, min_version=category.content_version
+    )
     
-    if not questions:
+    if not len(answer_key):
         raise HTTPException(status_code=404, detail="No questions found for this category")
+    if not answers:
+        raise HTTPException(status_code=400, detail="No answers submitted")
     
-    # Calculate score
-    correct_answers = 0
-    total_questions = len(answers)
+    # Pair each answer with its correct letter (None if the question is not
+    # in this category)
+    keyed_answers = []
+    unknown_answers = []
     
     for answer in answers:
-        question = question_dict.get(answer.question_id)
-        if question and answer.selected_answer.upper() == question.correct_answer:
-            correct_answers += 1
+        correct_answer = answer_key.get(answer.question_id)
+        if correct_answer is None:
+            unknown_answers.append(answer)
+        else:
+            keyed_answers.append((answer, correct_answer))
+    
+    # Questions added since the key was built are looked up in one query
+    if unknown_answers:
+        result = await db.execute(
+            select(Question.id, Question.correct_answer).where(
+                Question.category_id == category_id,
+                Question.id.in_({answer.question_id for answer in unknown_answers})
+            )
+        )
+        fallback_key = dict(result.all())
+        for answer in unknown_answers:
+            keyed_answers.append((answer, fallback_key.get(answer.question_id)))
     
+    graded = [
+        (answer, answer.selected_answer == correct_answer, correct_answer)
+        for answer, correct_answer in keyed_answers
+    ]
+    # Nothing is recorded or ranked for a submission with nothing to grade
+    if all(correct_answer is None for _, _, correct_answer in graded):
+        raise HTTPException(status_code=400, detail="No answers to questions in this category")
+    total_questions = len(answers)
+    correct_answers = sum(1 for _, is_correct, _ in graded if is_correct)
     score_percentage = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
     
+    # Record the attempt through the write-behind buffer instead of
+    # committing on the request path
+    attempt_id = str(uuid.uuid4())
+    submitted_at = datetime.now(timezone.utc)
+    await attempt_writer.submit(
+        {
+            "id": attempt_id,
+            "category_id": category_id,
+            "total_questions": total_questions,
+            "correct_answers": correct_answers,
+            "score_percentage": score_percentage,
+            "submitted_at": submitted_at,
+        },
+        [
+            {
+                "attempt_id": attempt_id,
+                "question_id": answer.question_id,
+                "selected_answer": answer.selected_answer,
+                "is_correct": is_correct,
+            }
+            for answer, is_correct, _ in graded
+        ]
+    )
+    rank = leaderboards.record(category_id, attempt_id, score_percentage, submitted_at)
+    # A question answered more than once in a submission counts once
+    counted = set()
+    for answer, is_correct, correct_answer in graded:
+        if correct_answer is not None and answer.question_id not in counted:
+            counted.add(answer.question_id)
+            question_stats.record(answer.question_id, answer.selected_answer, is_correct)
+    
     return QuizResult(
         total_questions=total_questions,
         correct_answers=correct_answers,
         score_percentage=round(score_percentage, 2),
-        category_name=category.name
+        category_name=category.name,
+        attempt_id=attempt_id,
+        rank=rank
     )
 
 
 @router.get("/random/{category_id}", response_model=List[QuizQuestion])
-def get_random_questions(
+async def get_random_questions(
     category_id: int,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get random questions for a specific category"""
-    from sqlalchemy import func
-    
     # Verify category exists
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if not category:
+    version = await db.scalar(select(Category.content_version).where(Category.id == category_id))
+    if version is None:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    # Get random questions for the category
-    questions = db.query(Question).filter(
-        Question.category_id == category_id
-    ).order_by(func.random()).limit(limit).all()
+    # Sample IDs from the in-memory index and assemble the response from
+    # cached fragments, fetching only the misses by primary key
+    question_ids = await question_index.sample_async(db, category_id, limit, min_version=version)
+    fragments = await load_question_fragments(db, category_id, version, question_ids)
     
-    if not questions:
+    if not fragments:
         raise HTTPException(status_code=404, detail="No questions found for this category")
     
-    # Convert to quiz format
-    quiz_questions = []
-    for question in questions:
-        quiz_questions.append(QuizQuestion(
-            id=question.id,
-            question_text=question.question_text,
-            option_a=question.option_a,
-            option_b=question.option_b,
-            option_c=question.option_c,
-            option_d=question.option_d,
-            category_name=category.name
-        ))
-    
-    return quiz_questions 
\ No newline at end of file
+    return Response(content=join_fragments(fragments), media_type="application/json")
+
+
+@router.post("/adaptive/{category_id}", response_model=AdaptiveQuestion)
+async def get_adaptive_question(
+    category_id: int,
+    answers: Optional[List[QuizAnswer]] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the next question matched to the player's answers so far"""
+    answers = answers or []
+    version = await db.scalar(select(Category.content_version).where(Category.id == category_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    answer_key = await question_index.get_answer_key_async(db, category_id, min_version=version)
+    if not len(answer_key):
+        raise HTTPException(status_code=404, detail="No questions found for this category")
+    
+    # Grade the answers so far against the key and estimate the player's
+    # ability from the difficulties of the questions they got right or wrong
+    responses = []
+    for answer in answers:
+        correct_answer = answer_key.get(answer.question_id)
+        if correct_answer is not None:
+            responses.append((answer_key.difficulty(answer.question_id), answer.selected_answer == correct_answer))
+    ability = estimate_ability(responses)
+    
+    question_id = pick_question(answer_key, ability, {answer.question_id for answer in answers})
+    if question_id is None:
+        raise HTTPException(status_code=404, detail="No more questions in this category")
+    
+    result = await db.execute(public_questions_select().where(Question.id == question_id))
+    question = result.first()
+    if question is None:
+        raise HTTPException(status_code=404, detail="No more questions in this category")
+    
+    return AdaptiveQuestion(
+        question=QuizQuestion(**question._mapping),
+        ability=round(ability, 3),
+        questions_answered=len(responses),
+        correct_answers=sum(1 for _, correct in responses if correct)
+    )
+
+
+@router.get("/leaderboard/{category_id}", response_model=Leaderboard)
+async def get_leaderboard(
+    category_id: int,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the best attempts in a category"""
+    category_name = await db.scalar(select(Category.name).where(Category.id == category_id))
+    if category_name is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    # Served from the in-memory board; no query over the attempts table
+    entries, total_attempts = leaderboards.top(category_id, max(0, min(limit, settings.leaderboard_size)))
+    return Leaderboard(
+        category_id=category_id,
+        category_name=category_name,
+        total_attempts=total_attempts,
+        entries=entries
+    )
+
+
+@router.get("/leaderboard/{category_id}/attempts/{attempt_id}", response_model=AttemptRank)
+async def get_attempt_rank(
+    category_id: int,
+    attempt_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the current rank of an attempt in its category"""
+    # Reads the primary: players look up an attempt right after submitting it
+    # Recent attempts may still be in the write-behind buffer
+    score_percentage = leaderboards.pending_score(category_id, attempt_id)
+    if score_percentage is None:
+        score_percentage = await db.scalar(
+            select(QuizAttempt.score_percentage).where(
+                QuizAttempt.id == attempt_id,
+                QuizAttempt.category_id == category_id
+            )
+        )
+        if score_percentage is None:
+            raise HTTPException(status_code=404, detail="Attempt not found")
+    
+    rank, total_attempts = leaderboards.rank(category_id, score_percentage)
+    return AttemptRank(
+        attempt_id=attempt_id,
+        category_id=category_id,
+        score_percentage=round(score_percentage, 2),
+        rank=rank,
+        total_attempts=total_attempts
+    )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, field_validator
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 
@@ -19,6 +19,7 @@ class CategoryUpdate(CategoryBase):
 
 class Category(CategoryBase):
     id: int
+    question_count: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -55,6 +56,7 @@ class QuestionUpdate(BaseModel):
 
 class Question(QuestionBase):
     id: int
+    difficulty: float = 0.0
     created_at: datetime
     updated_at: Optional[datetime] = None
     category: Category
@@ -63,6 +65,69 @@ class Question(QuestionBase):
         from_attributes = True
 
 
+class QuestionSearchResult(Question):
+    rank: float
+
+
+class NearDuplicate(BaseModel):
+    question_id: int
+    similarity: float  # estimated Jaccard similarity of text and options
+
+
+class QuestionCreateResult(Question):
+    near_duplicates: List[NearDuplicate] = []
+
+
+class QuestionImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ImportNearDuplicate(BaseModel):
+    row: int
+    question_id: int  # the imported question
+    near_duplicates: List[NearDuplicate]
+
+
+class QuestionImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[QuestionImportError]
+    errors_truncated: bool = False
+    near_duplicates: List[ImportNearDuplicate] = []
+    near_duplicates_truncated: bool = False
+    # Set when the import stopped early: this row and every later one were not imported
+    stopped_at_row: Optional[int] = None
+    stop_reason: Optional[str] = None
+
+
+
+# Batch admin operations
+class BatchOperation(BaseModel):
+    op: str  # create, update or delete
+    entity: str  # category or question
+    id: Optional[int] = None  # required for update and delete
+    data: Optional[Dict[str, Any]] = None  # fields as for the single-item endpoints
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    entity: str
+    id: Optional[int] = None  # assigned ID for creates
+    errors: List[str] = []
+    near_duplicates: List[NearDuplicate] = []
+
+
+class BatchResult(BaseModel):
+    committed: bool
+    results: List[BatchOperationResult]
+
+
 # Admin User schemas
 class AdminUserBase(BaseModel):
     username: str
@@ -77,6 +142,8 @@ class AdminUserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[str] = None
     password: Optional[str] = None
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
 
 
 class AdminUser(AdminUserBase):
@@ -158,6 +225,22 @@ class AdminUserProfile(BaseModel):
         from_attributes = True
 
 
+# Dashboard statistics schemas
+class CategoryStats(BaseModel):
+    id: int
+    name: str
+    question_count: int
+
+
+class AdminStats(BaseModel):
+    total_categories: int
+    total_questions: int
+    total_users: int
+    active_users: int
+    categories: List[CategoryStats]
+    generated_at: datetime
+
+
 # Quiz schemas
 class QuizQuestion(BaseModel):
     id: int
@@ -176,9 +259,60 @@ class QuizAnswer(BaseModel):
     question_id: int
     selected_answer: str
 
+    @field_validator("selected_answer")
+    @classmethod
+    def single_option(cls, value: str) -> str:
+        value = value.upper()
+        if value not in ("A", "B", "C", "D"):
+            raise ValueError("selected_answer must be A, B, C or D")
+        return value
+
+
+class AdaptiveQuestion(BaseModel):
+    question: QuizQuestion
+    ability: float
+    questions_answered: int
+    correct_answers: int
+
 
 class QuizResult(BaseModel):
     total_questions: int
     correct_answers: int
     score_percentage: float
-    category_name: str 
\ No newline at end of file
+    category_name: str
+    attempt_id: Optional[str] = None
+    rank: Optional[int] = None
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    attempt_id: str
+    score_percentage: float
+    submitted_at: datetime
+
+
+class Leaderboard(BaseModel):
+    category_id: int
+    category_name: str
+    total_attempts: int
+    entries: List[LeaderboardEntry]
+
+
+class AttemptRank(BaseModel):
+    attempt_id: str
+    category_id: int
+    score_percentage: float
+    rank: int
+    total_attempts: int
+
+
+class QuestionStats(BaseModel):
+    question_id: int
+    category_id: int
+    question_text: str
+    correct_answer: str
+    attempts: int
+    correct: int
+    accuracy: Optional[float] = None
+    option_counts: Dict[str, int]
+    flags: List[str] = []
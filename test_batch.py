@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Admin batch endpoint tests
+
+Runs POST /admin/batch against the SQLite test database. Every test creates
+its own categories and questions under unique names, so the tests do not
+depend on each other or on the sample data.
+
+Usage:
+    python -m pytest test_batch.py
+    python test_batch.py
+"""
+
+import itertools
+import pytest
+# Configures the test databases, so it is imported before the app
+import conftest  # noqa: F401
+from fastapi.testclient import TestClient
+import init_db
+import main
+from question_stats import question_stats
+from replica import replica_router
+from routers.quiz import catalog_cache
+
+_names = itertools.count()
+
+
+def unique_name(prefix: str = "Batch") -> str:
+    return f"{prefix} {next(_names)}"
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db.init_db()
+    with TestClient(main.app) as client:
+        token = client.post("/auth/token", data={"username": "admin", "password": "admin123"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def make_category(client, name: str = None) -> dict:
+    response = client.post("/admin/categories/", json={"name": name or unique_name()})
+    assert response.status_code == 200
+    return response.json()
+
+
+def make_question(client, category_id: int, text: str = None) -> dict:
+    response = client.post("/admin/questions/", json={
+        "question_text": text or f"Question {next(_names)} about something else entirely?",
+        "option_a": "First", "option_b": "Second", "option_c": "Third", "option_d": "Fourth",
+        "correct_answer": "A",
+        "category_id": category_id,
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def category(client, category_id: int):
+    response = client.get(f"/admin/categories/{category_id}")
+    return response.json() if response.status_code == 200 else None
+
+
+def run_batch(client, *operations):
+    return client.post("/admin/batch", json={"operations": list(operations)})
+
+
+def test_swapping_category_names(client):
+    first, second = make_category(client), make_category(client)
+    response = run_batch(
+        client,
+        {"op": "update", "entity": "category", "id": first["id"], "data": {"name": second["name"]}},
+        {"op": "update", "entity": "category", "id": second["id"], "data": {"name": first["name"]}},
+    )
+    assert response.status_code == 200, response.json()
+    assert response.json()["committed"]
+    assert category(client, first["id"])["name"] == second["name"]
+    assert category(client, second["id"])["name"] == first["name"]
+
+
+def test_reusing_names_of_renamed_and_deleted_categories(client):
+    renamed, deleted = make_category(client), make_category(client)
+    response = run_batch(
+        client,
+        {"op": "update", "entity": "category", "id": renamed["id"], "data": {"name": unique_name()}},
+        {"op": "delete", "entity": "category", "id": deleted["id"]},
+        {"op": "create", "entity": "category", "data": {"name": renamed["name"]}},
+        {"op": "create", "entity": "category", "data": {"name": deleted["name"]}},
+    )
+    assert response.status_code == 200, response.json()
+    created = [result["id"] for result in response.json()["results"][2:]]
+    assert [category(client, category_id)["name"] for category_id in created] == [renamed["name"], deleted["name"]]
+    assert category(client, deleted["id"]) is None
+
+
+def test_duplicate_final_names_are_rejected(client):
+    first, second = make_category(client), make_category(client)
+    name = unique_name()
+    response = run_batch(
+        client,
+        {"op": "update", "entity": "category", "id": first["id"], "data": {"name": name}},
+        {"op": "create", "entity": "category", "data": {"name": name}},
+        {"op": "create", "entity": "category", "data": {"name": second["name"]}},
+    )
+    assert response.status_code == 400
+    assert [result["errors"] for result in response.json()["results"]] == [["Category name already exists"]] * 3
+    assert category(client, first["id"])["name"] == first["name"]
+
+
+def test_deleting_a_category_emptied_in_the_same_batch(client):
+    emptied, target = make_category(client), make_category(client)
+    moved, deleted = make_question(client, emptied["id"]), make_question(client, emptied["id"])
+    response = run_batch(
+        client,
+        {"op": "delete", "entity": "category", "id": emptied["id"]},
+        {"op": "update", "entity": "question", "id": moved["id"], "data": {"category_id": target["id"]}},
+        {"op": "delete", "entity": "question", "id": deleted["id"]},
+    )
+    assert response.status_code == 200, response.json()
+    assert category(client, emptied["id"]) is None
+    assert category(client, target["id"])["question_count"] == 1
+    assert client.get(f"/admin/questions/{moved['id']}").json()["category_id"] == target["id"]
+    assert client.get(f"/admin/questions/{deleted['id']}").status_code == 404
+
+
+def test_deleting_a_category_that_keeps_questions_is_rejected(client):
+    kept, target = make_category(client), make_category(client)
+    moved, staying = make_question(client, kept["id"]), make_question(client, kept["id"])
+    response = run_batch(
+        client,
+        {"op": "update", "entity": "question", "id": moved["id"], "data": {"category_id": target["id"]}},
+        {"op": "delete", "entity": "category", "id": kept["id"]},
+    )
+    assert response.status_code == 400
+    results = response.json()["results"]
+    assert results[0]["errors"] == []
+    assert results[1]["errors"] == ["Category still has questions"]
+    # Nothing was applied, including the valid move
+    assert client.get(f"/admin/questions/{moved['id']}").json()["category_id"] == kept["id"]
+    assert category(client, kept["id"])["question_count"] == 2
+
+
+def test_duplicate_ids_are_rejected(client):
+    question = make_question(client, make_category(client)["id"])
+    response = run_batch(
+        client,
+        {"op": "update", "entity": "question", "id": question["id"], "data": {"option_a": "One"}},
+        {"op": "delete", "entity": "question", "id": question["id"]},
+    )
+    assert response.status_code == 400
+    assert response.json()["results"][1]["errors"] == [f"question {question['id']} appears in more than one operation"]
+    assert client.get(f"/admin/questions/{question['id']}").json()["option_a"] == "First"
+
+
+def test_one_invalid_operation_applies_nothing(client):
+    parent = make_category(client)
+    question = make_question(client, parent["id"])
+    name = unique_name()
+    response = run_batch(
+        client,
+        {"op": "create", "entity": "category", "data": {"name": name}},
+        {"op": "create", "entity": "question", "data": {**{k: question[k] for k in (
+            "option_a", "option_b", "option_c", "option_d", "category_id")},
+            "question_text": "A valid new question?", "correct_answer": "B"}},
+        {"op": "update", "entity": "question", "id": question["id"], "data": {"correct_answer": "Z"}},
+        {"op": "delete", "entity": "question", "id": 10 ** 9},
+        {"op": "rename", "entity": "category", "id": parent["id"]},
+    )
+    assert response.status_code == 400
+    body = response.json()
+    assert not body["committed"]
+    assert [bool(result["errors"]) for result in body["results"]] == [False, False, True, True, True]
+    assert body["results"][2]["errors"] == ["Correct answer must be A, B, C, or D"]
+    assert body["results"][3]["errors"] == ["Question not found"]
+    assert name not in [category["name"] for category in client.get("/admin/categories/").json()]
+    assert category(client, parent["id"])["question_count"] == 1
+
+
+def test_too_many_operations(client):
+    operations = [{"op": "delete", "entity": "question", "id": 10 ** 9}] * 1001
+    assert run_batch(client, *operations).status_code == 400
+
+
+def test_creates_report_ids_and_update_counters(client):
+    parent = make_category(client)
+    response = run_batch(
+        client,
+        *[{"op": "create", "entity": "question", "data": {
+            "question_text": f"Batch created question number {index} on a distinct topic?",
+            "option_a": "a", "option_b": "b", "option_c": "c", "option_d": "d",
+            "correct_answer": "C", "category_id": parent["id"],
+        }} for index in range(3)],
+    )
+    assert response.status_code == 200, response.json()
+    ids = [result["id"] for result in response.json()["results"]]
+    assert all(ids) and len(set(ids)) == 3
+    assert category(client, parent["id"])["question_count"] == 3
+
+
+def test_answer_changes_drop_buffered_statistics(client):
+    parent = make_category(client)
+    changed, unchanged = make_question(client, parent["id"]), make_question(client, parent["id"])
+    response = client.post(f"/quiz/submit/{parent['id']}", json=[
+        {"question_id": changed["id"], "selected_answer": "A"},
+        {"question_id": unchanged["id"], "selected_answer": "B"},
+    ])
+    assert response.status_code == 200
+    assert {changed["id"], unchanged["id"]} <= set(question_stats._counters)
+
+    response = run_batch(
+        client,
+        {"op": "update", "entity": "question", "id": changed["id"], "data": {"correct_answer": "D"}},
+        {"op": "update", "entity": "question", "id": unchanged["id"], "data": {"explanation": "Because"}},
+    )
+    assert response.status_code == 200, response.json()
+    # The next flush must not write the tallies of the old answer key back
+    assert changed["id"] not in question_stats._counters
+    assert unchanged["id"] in question_stats._counters
+
+
+
+@pytest.fixture
+def cached_catalog(monkeypatch):
+    """Serve /quiz/categories/ from the catalog cache, as workers do outside a write window"""
+    monkeypatch.setattr(catalog_cache, "ttl_seconds", 60)
+    monkeypatch.setattr(replica_router, "replica_factory", None)
+    monkeypatch.setattr(replica_router, "note_write", lambda: 0.0)
+    monkeypatch.setattr(replica_router, "_primary_until", 0.0)
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+
+
+def catalog(client, etag: str = None):
+    headers = {"If-None-Match": etag} if etag else {}
+    response = client.get("/quiz/categories/", headers=headers)
+    names = [category["name"] for category in response.json()] if response.status_code == 200 else None
+    return response.status_code, names, response.headers["ETag"]
+
+
+def test_new_categories_replace_the_cached_catalog(client, cached_catalog):
+    _, names, etag = catalog(client)
+    created = make_category(client)
+    status, names, new_etag = catalog(client, etag)
+    assert status == 200 and created["name"] in names
+    assert new_etag != etag
+
+    name = unique_name()
+    assert run_batch(client, {"op": "create", "entity": "category", "data": {"name": name}}).status_code == 200
+    status, names, newest_etag = catalog(client, new_etag)
+    assert status == 200 and name in names
+    assert newest_etag != new_etag
+
+
+if __name__ == "__main__":
+    print("📦 Testing the admin batch endpoint")
+    print("=" * 50)
+    exit_code = pytest.main(["-q", __file__])
+    print("✅ All batch tests passed" if exit_code == 0 else "❌ Some batch tests failed")
+    raise SystemExit(exit_code)
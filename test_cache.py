@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Two-tier cache tests
+
+Exercises cache.Cache without a database: loaders are plain functions that
+count their calls. The shared tier is the memory:// stand-in, or a small
+Redis-protocol server started in a thread for the RESP tier tests.
+
+Usage:
+    python -m pytest test_cache.py
+    python test_cache.py
+"""
+
+import asyncio
+import fnmatch
+import itertools
+import socketserver
+import threading
+import time
+import pytest
+from cache import Cache, MemoryTier, RespTier
+
+_namespaces = itertools.count()
+
+
+def make_cache(ttl_seconds: float = 60, stale_seconds: float = 0, shared=None, namespace: str = None) -> Cache:
+    cache = Cache(namespace or f"test{next(_namespaces)}", ttl_seconds, stale_seconds, shared=False)
+    cache.shared = shared
+    return cache
+
+
+class CountingLoader:
+    """Async loader returning value-1, value-2, ... that can be held until released"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        if self.release is not None:
+            await self.release.wait()
+        await asyncio.sleep(self.delay)
+        return f"value-{call}"
+
+
+def test_concurrent_cold_misses_load_once():
+    cache = make_cache()
+    loader = CountingLoader(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load_async("key", loader) for _ in range(100)))
+
+    assert asyncio.run(run()) == ["value-1"] * 100
+    assert loader.calls == 1
+    stats = cache.stats()
+    assert stats["loads"] == 1
+    assert stats["coalesced"] == 99
+
+
+def test_concurrent_cold_misses_load_once_in_threads():
+    cache = make_cache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("key", loader))) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 50
+    assert len(calls) == 1
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = make_cache(ttl_seconds=0.05, stale_seconds=60)
+    loader = CountingLoader(delay=0.05)
+
+    async def run():
+        assert await cache.get_or_load_async("key", loader) == "value-1"
+        await asyncio.sleep(0.1)
+        # Stale: every caller gets the old value at once, one refresh reloads it
+        stale = await asyncio.gather(*(cache.get_or_load_async("key", loader) for _ in range(20)))
+        assert stale == ["value-1"] * 20
+        await asyncio.gather(*cache._tasks)
+        return await cache.get_or_load_async("key", loader)
+
+    assert asyncio.run(run()) == "value-2"
+    assert loader.calls == 2
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_invalidation_during_load_keeps_result_out_of_cache():
+    cache = make_cache()
+    loader = CountingLoader()
+
+    async def run():
+        loader.release = asyncio.Event()
+        load = asyncio.ensure_future(cache.get_or_load_async("key", loader))
+        await asyncio.sleep(0.01)
+        # The write lands while the load is reading the old data
+        cache.invalidate("key")
+        loader.release.set()
+        assert await load == "value-1"
+        return await cache.get_or_load_async("key", loader)
+
+    assert asyncio.run(run()) == "value-2"
+    assert loader.calls == 2
+
+
+def test_clear_during_load_keeps_result_out_of_cache():
+    cache = make_cache()
+    loader = CountingLoader()
+
+    async def run():
+        loader.release = asyncio.Event()
+        load = asyncio.ensure_future(cache.get_or_load_async("key", loader))
+        await asyncio.sleep(0.01)
+        cache.clear()
+        loader.release.set()
+        await load
+        return await cache.get_or_load_async("key", loader)
+
+    assert asyncio.run(run()) == "value-2"
+
+
+def test_memory_shared_tier_is_shared_between_workers():
+    shared = MemoryTier()
+    namespace = f"test{next(_namespaces)}"
+    first = make_cache(shared=shared, namespace=namespace)
+    second = make_cache(shared=shared, namespace=namespace)
+    loader = CountingLoader()
+
+    async def run():
+        assert await first.get_or_load_async("key", loader) == "value-1"
+        # The other worker finds the value without loading it
+        assert await second.get_or_load_async("key", loader) == "value-1"
+        assert second.stats()["shared_hits"] == 1
+        # An invalidation on one worker removes the shared copy too
+        first.invalidate("key")
+        third = make_cache(shared=shared, namespace=namespace)
+        return await third.get_or_load_async("key", loader)
+
+    assert asyncio.run(run()) == "value-2"
+    assert loader.calls == 2
+
+
+def test_memory_shared_tier_clear_drops_namespace_only():
+    shared = MemoryTier()
+    cache = make_cache(shared=shared)
+    other = make_cache(shared=shared)
+    cache.get_or_load("a", lambda: 1)
+    other.get_or_load("a", lambda: 2)
+    cache.clear()
+    assert shared.get(cache._shared_key("a")) is None
+    assert shared.get(other._shared_key("a")) is not None
+
+
+# A minimal Redis-protocol server: GET, SET ... PX, DEL and SCAN
+class RespStandIn(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, delete_delay: float = 0.0):
+        self.values = {}
+        self.delete_delay = delete_delay
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}"
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def _bulk(self, value: bytes) -> bytes:
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        values = self.server.values
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            command = args[0].upper()
+            if command == b"GET":
+                item = values.get(args[1])
+                found = item is not None and item[1] > time.time()
+                self.wfile.write(self._bulk(item[0]) if found else b"$-1\r\n")
+            elif command == b"SET":
+                values[args[1]] = (args[2], time.time() + int(args[4]) / 1000)
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"DEL":
+                time.sleep(self.server.delete_delay)
+                deleted = sum(values.pop(key, None) is not None for key in args[1:])
+                self.wfile.write(b":%d\r\n" % deleted)
+            elif command == b"SCAN":
+                time.sleep(self.server.delete_delay)
+                keys = [key for key in values if fnmatch.fnmatchcase(key.decode(), args[3].decode())]
+                self.wfile.write(b"*2\r\n" + self._bulk(b"0") + b"*%d\r\n" % len(keys) + b"".join(map(self._bulk, keys)))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    server = RespStandIn()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_resp_tier_shares_and_invalidates(resp_server):
+    shared = RespTier(resp_server.url, timeout=1.0)
+    namespace = f"test{next(_namespaces)}"
+    first = make_cache(shared=shared, namespace=namespace)
+    second = make_cache(shared=shared, namespace=namespace)
+
+    assert first.get_or_load("key", lambda: {"n": 1}) == {"n": 1}
+    assert second.get_or_load("key", lambda: pytest.fail("loaded despite the shared copy")) == {"n": 1}
+
+    first.invalidate("other")
+    first.clear()
+    wait_for(lambda: not resp_server.values)
+    assert make_cache(shared=shared, namespace=namespace).get_or_load("key", lambda: {"n": 2}) == {"n": 2}
+
+
+def test_shared_tier_deletes_do_not_block_invalidation(resp_server):
+    shared = RespTier(resp_server.url, timeout=5.0)
+    cache = make_cache(shared=shared)
+    cache.get_or_load("key", lambda: "old")
+    resp_server.delete_delay = 0.5
+
+    started = time.monotonic()
+    cache.invalidate("key")
+    cache.clear()
+    assert time.monotonic() - started < 0.1
+
+    # Until the delete has run, the old shared copy is not read back
+    assert cache.get_or_load("key", lambda: "new") == "new"
+    wait_for(lambda: cache._shared_readable("key"))
+    assert cache.stats()["shared_errors"] == 0
+
+
+def test_unreachable_shared_tier_counts_errors_not_failures():
+    server = RespStandIn()
+    url = server.url
+    server.shutdown()
+    server.server_close()
+    cache = make_cache(shared=RespTier(url, timeout=0.2))
+
+    assert cache.get_or_load("key", lambda: "value") == "value"
+    cache.invalidate("key")
+    wait_for(lambda: cache._shared_readable("key"))
+    assert cache.stats()["shared_errors"] >= 1
+
+
+if __name__ == "__main__":
+    print("🗄️  Testing the two-tier cache")
+    print("=" * 50)
+    exit_code = pytest.main(["-q", __file__])
+    print("✅ All cache tests passed" if exit_code == 0 else "❌ Some cache tests failed")
+    raise SystemExit(exit_code)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Answer statistics buffer tests
+
+Flushes a QuestionStatsBuffer into the SQLite test database and reads the
+question_stats rows back.
+
+Usage:
+    python -m pytest test_question_stats.py
+    python test_question_stats.py
+"""
+
+import asyncio
+import pytest
+# Configures the test databases, so it is imported before the app
+import conftest  # noqa: F401
+import init_db
+from database import SessionLocal
+from models import Question, QuestionStat
+from question_stats import QuestionStatsBuffer
+
+
+@pytest.fixture(scope="module")
+def question_ids():
+    init_db.init_db()
+    with SessionLocal() as db:
+        return [question_id for (question_id,) in db.query(Question.id).order_by(Question.id).limit(2)]
+
+
+@pytest.fixture(autouse=True)
+def no_stored_stats(question_ids):
+    with SessionLocal() as db:
+        db.query(QuestionStat).filter(QuestionStat.question_id.in_(question_ids)).delete(synchronize_session=False)
+        db.commit()
+
+
+def stored(question_id: int):
+    with SessionLocal() as db:
+        row = db.get(QuestionStat, question_id)
+        return None if row is None else (row.attempts, row.correct, row.picked_a, row.picked_b)
+
+
+def test_flush_adds_to_stored_counters(question_ids):
+    first, second = question_ids
+    buffer = QuestionStatsBuffer()
+    buffer.record(first, "A", True)
+    buffer.record(second, "B", False)
+    asyncio.run(buffer.flush())
+    buffer.record(first, "B", False)
+    asyncio.run(buffer.flush())
+    assert stored(first) == (2, 1, 1, 1)
+    assert stored(second) == (1, 0, 0, 1)
+    assert buffer.stats()["buffered_questions"] == 0
+
+
+def test_discard_during_a_successful_flush(question_ids):
+    reset, kept = question_ids
+    buffer = QuestionStatsBuffer()
+    buffer.record(reset, "A", True)
+    buffer.record(kept, "B", False)
+
+    async def run():
+        flush = asyncio.ensure_future(buffer.flush())
+        # The flush is waiting for its connection when the reset lands
+        await asyncio.sleep(0)
+        assert reset in buffer._flushing
+        buffer.discard([reset])
+        await flush
+
+    asyncio.run(run())
+    assert stored(reset) is None
+    assert stored(kept) == (1, 0, 0, 1)
+
+
+def test_failed_flush_keeps_counters(question_ids):
+    question_id = question_ids[0]
+
+    class FailingSession:
+        async def __aenter__(self):
+            raise RuntimeError("database unavailable")
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    buffer = QuestionStatsBuffer(session_factory=FailingSession)
+    buffer.record(question_id, "A", True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(buffer.flush())
+    buffer.record(question_id, "A", True)
+    assert buffer._counters[question_id]["attempts"] == 2
+    assert buffer.stats()["last_error"] == "RuntimeError: database unavailable"
+
+
+if __name__ == "__main__":
+    print("📊 Testing the answer statistics buffer")
+    print("=" * 50)
+    exit_code = pytest.main(["-q", __file__])
+    print("✅ All statistics tests passed" if exit_code == 0 else "❌ Some statistics tests failed")
+    raise SystemExit(exit_code)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Read-replica routing tests
+
+Runs the app against two SQLite files standing in for the primary and the
+replica. The replica is a copy of the primary that only changes when a test
+copies it again, so the category names a read returns show which database
+served it.
+
+Usage:
+    python -m pytest test_read_replica.py
+    python test_read_replica.py
+"""
+
+import asyncio
+import shutil
+import sqlite3
+import pytest
+# Configures the test databases, so it is imported before the app
+from conftest import PRIMARY, REPLICA
+from fastapi.testclient import TestClient
+import init_db
+import main
+from replica import READ_PRIMARY_COOKIE, replica_router
+
+
+def replicate():
+    """Bring the replica up to date and mark it with a renamed category"""
+    shutil.copyfile(PRIMARY, REPLICA)
+    with sqlite3.connect(REPLICA) as replica:
+        replica.execute("UPDATE categories SET name = 'Replica' WHERE id = 1")
+
+
+def break_replica():
+    with open(REPLICA, "wb") as replica:
+        replica.write(b"this is not a database" * 100)
+
+
+def category_name(client) -> str:
+    response = client.get("/quiz/categories/")
+    assert response.status_code == 200
+    return next(category["name"] for category in response.json() if category["id"] == 1)
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db.init_db()
+    replicate()
+    with TestClient(main.app, raise_server_exceptions=False) as client:
+        token = client.post("/auth/token", data={"username": "admin", "password": "admin123"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_replica(client):
+    replicate()
+    client.cookies.clear()
+    replica_router._primary_until = 0.0
+    assert asyncio.run(replica_router.check())
+
+
+def test_reads_use_replica(client):
+    before = replica_router.stats()["replica_reads"]
+    assert category_name(client) == "Replica"
+    assert replica_router.stats()["replica_reads"] == before + 1
+
+
+def test_admin_write_reads_primary_within_window(client):
+    response = client.put("/admin/categories/1", json={"name": "Nations"})
+    assert response.status_code == 200
+    assert READ_PRIMARY_COOKIE in response.cookies
+    # This process saw the write, so reads without the cookie use the primary too
+    client.cookies.clear()
+    assert category_name(client) == "Nations"
+
+
+def test_cookie_keeps_writer_on_primary(client):
+    response = client.put("/admin/categories/1", json={"name": "Countries"})
+    assert response.status_code == 200
+    # As if the next read reached another worker: only the cookie says to use the primary
+    replica_router._primary_until = 0.0
+    assert category_name(client) == "Countries"
+    client.cookies.clear()
+    assert category_name(client) == "Replica"
+
+
+def test_reads_return_to_replica_after_window(client):
+    client.put("/admin/categories/1", json={"description": "Flags and capitals"})
+    assert category_name(client) == "Countries"
+    client.cookies.clear()
+    replica_router._primary_until = 0.0
+    assert category_name(client) == "Replica"
+
+
+def test_admin_reads_do_not_open_window(client):
+    assert client.get("/admin/categories/").status_code == 200
+    assert READ_PRIMARY_COOKIE not in client.cookies
+    assert category_name(client) == "Replica"
+
+
+def test_unhealthy_replica_falls_back_to_primary(client):
+    break_replica()
+    assert not asyncio.run(replica_router.check())
+    fallbacks = replica_router.stats()["fallbacks"]
+    assert category_name(client) == "Countries"
+    assert replica_router.stats()["fallbacks"] == fallbacks + 1
+
+    replicate()
+    assert asyncio.run(replica_router.check())
+    assert category_name(client) == "Replica"
+
+
+def test_failing_replica_query_marks_replica_unhealthy(client):
+    break_replica()
+    # The health check has not run yet: the first read fails on the replica...
+    assert client.get("/quiz/categories/").status_code == 500
+    assert not replica_router.stats()["healthy"]
+    # ...and the next ones are served by the primary
+    assert category_name(client) == "Countries"
+
+
+def test_metrics_report_replica(client):
+    metrics = client.get("/metrics").json()
+    assert metrics["read_replica"]["configured"]
+    assert "replica" in metrics["database_pools"]
+
+
+if __name__ == "__main__":
+    print("🔀 Testing read-replica routing")
+    print("=" * 50)
+    exit_code = pytest.main(["-q", __file__])
+    print("✅ All replica tests passed" if exit_code == 0 else "❌ Some replica tests failed")
+    raise SystemExit(exit_code)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Quiz submission tests
+
+Submits answers to POST /quiz/submit against the SQLite test database, in a
+category of its own with questions whose answer is always A.
+
+Usage:
+    python -m pytest test_submit.py
+    python test_submit.py
+"""
+
+import pytest
+# Configures the test databases, so it is imported before the app
+import conftest  # noqa: F401
+from fastapi.testclient import TestClient
+import init_db
+import main
+from question_stats import question_stats
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db.init_db()
+    with TestClient(main.app) as client:
+        token = client.post("/auth/token", data={"username": "admin", "password": "admin123"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+@pytest.fixture(scope="module")
+def quiz(client):
+    category = client.post("/admin/categories/", json={"name": "Submission tests"}).json()
+    question_ids = []
+    for index in range(3):
+        response = client.post("/admin/questions/", json={
+            "question_text": f"Submission test question number {index} with its own wording?",
+            "option_a": "Right", "option_b": "Wrong", "option_c": "Wrong", "option_d": "Wrong",
+            "correct_answer": "A",
+            "category_id": category["id"],
+        })
+        assert response.status_code == 200
+        question_ids.append(response.json()["id"])
+    return category["id"], question_ids
+
+
+def submit(client, category_id: int, answers):
+    return client.post(f"/quiz/submit/{category_id}", json=answers)
+
+
+def test_answers_are_graded_case_insensitively(client, quiz):
+    category_id, question_ids = quiz
+    response = submit(client, category_id, [
+        {"question_id": question_ids[0], "selected_answer": "a"},
+        {"question_id": question_ids[1], "selected_answer": "B"},
+    ])
+    assert response.status_code == 200
+    assert response.json()["correct_answers"] == 1
+
+
+@pytest.mark.parametrize("selected_answer", ["AB", "E", ""])
+def test_answers_must_pick_one_option(client, quiz, selected_answer):
+    category_id, question_ids = quiz
+    question_stats._counters.pop(question_ids[2], None)
+    response = submit(client, category_id, [{"question_id": question_ids[2], "selected_answer": selected_answer}])
+    assert response.status_code == 422
+    assert question_ids[2] not in question_stats._counters
+
+
+def test_adaptive_rejects_multi_letter_answers(client, quiz):
+    category_id, question_ids = quiz
+    response = client.post(f"/quiz/adaptive/{category_id}", json=[{"question_id": question_ids[0], "selected_answer": "AB"}])
+    assert response.status_code == 422
+
+
+
+@pytest.mark.parametrize("answers", [[], [{"question_id": 10 ** 9, "selected_answer": "A"}]])
+def test_submissions_with_nothing_to_grade_are_rejected(client, quiz, answers):
+    category_id, _ = quiz
+    before = client.get(f"/quiz/leaderboard/{category_id}").json()
+    response = submit(client, category_id, answers)
+    assert response.status_code == 400
+    assert client.get(f"/quiz/leaderboard/{category_id}").json() == before
+
+
+if __name__ == "__main__":
+    print("📝 Testing quiz submissions")
+    print("=" * 50)
+    exit_code = pytest.main(["-q", __file__])
+    print("✅ All submission tests passed" if exit_code == 0 else "❌ Some submission tests failed")
+    raise SystemExit(exit_code)